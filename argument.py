@@ -21,221 +21,102 @@ You should have received a copy of the GNU General Public License
 along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from copy import deepcopy
-from itertools import product
-from more_itertools import unique_everseen
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
-from PyQt5.QtGui import QFont
-from truth_table import TruthTable, TruthTableWindow
-
-# Unicode for logical operators - "operators" currently used.
-operators1 = [u'\u00ac', u'\u2227', u'\u2228', u'\u2262', u'\u2261', u'\u2283']
-operators = [u'\u00ac', u'\u2227', u'\u2228', u'\u2a01', u'\u21d4', u'\u21d2']
-# html (prefix "&#", postfix ";"): 172, 8743, 8744, 10753, 8660, 8658.
-
-
-# Check if a string character is a letter or a number,
-# i.e. a valid symbol, not a logical operator.
-def is_symbol(c):
-    """Returns True if a string character is a letter or a number, i.e. a
-    valid symbol, not a logical operator; otherwise False.
-
-    is_symbol(str) -> bool
-    Precondition: len(c) == 1
-    """
-    if c.isalpha() or c.isdigit():
-        return True
-    else:
-        return False
-
-
-class PropArg(object):
-    """Stores and determines the validity of propositional arguments.
+import os
+import re
+from html import escape
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QFileDialog, \
+    QGridLayout, QHBoxLayout, QLabel, QLineEdit, QListView, QMenu, \
+    QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QTimer, Qt
+from PyQt5.QtGui import QCursor, QFont
+# The truth table and persistent cache modules aren't needed until a table
+# is shown or a cache is used, so they are imported there, which keeps
+# start-up quick.
+from budget import Budget, Undecided
+from compiled import ArgumentResult, CompiledArgument
+from cost import REFUSE, STREAM, STREAM_ROWS, estimate_table
+import engines
+from expression import operators, operators1, is_symbol
+# PropArg is kept apart from the GUI, so that the evaluation server and
+# batch workers can use it without Qt.
+from proparg import PropArg
+from syntax import SyntaxChecker, find_error
+
+# Limits on evaluation started from the GUI, so that an argument with too
+# many symbols can't hang the application or use up all the memory.
+GUI_SECONDS = 30
+GUI_MAX_BYTES = 1024 ** 3
+
+# A truth value assumed for a symbol in the truth table window, e.g.
+# "P = 1".
+ASSUMPTION = re.compile(r'([^\s,=])\s*=\s*([01])')
+
+# Milliseconds the entry line has to be left alone before it is checked.
+# Each edit restarts the wait, so a burst of typing is checked once, when it
+# pauses; the check itself takes well under a millisecond.
+SYNTAX_DELAY = 40
+
+
+class ExpressionListModel(QAbstractListModel):
+    """Holds the lines displayed in ArgCheck's list of expressions. Lines
+    are added and removed in entries - an expression, or an output message -
+    so that the last entry can be taken back off. Every line is a row of
+    its own, which lets the view treat all rows as the same height.
     """
 
-    def __init__(self, arg):
+    def __init__(self):
         """
         Constructor
+        """
+        super().__init__()
+        self._lines = []
+        # Row at which each entry starts.
+        self._starts = []
 
-        __init__(list<str>)
-        """
-
-        # Store the list of premises/expressions, and conclusion if provided.
-        self._arg = arg
-        # E.g. self._arg = ['Sv((P^Q)->R)', '-S', 'Q'].
-        # Store all symbols representing propositions, as they occur.
-        self._pin = [c for p in arg for c in p if is_symbol(c)]
-
-    def evaluate(self, test=True):
-        """Calculates the truth values of the set of logical expressions
-        stored in self._arg. Generates a TruthTable object used to display
-        the truth values.
-
-        If test == True, returns a string stating if a propositional argument
-        is valid or invalid. If invalid, counter examples are listed in the
-        string.
-
-        evaluate(bool) -> NoneType or str
-        """
-
-        bad_vals = []
-        # Assume the argument is valid and prove invalid by contradiction.
-        valid = True
-        all_truth = []
-
-        # Generate list of all unique proposition symbols contained in arg.
-        psyms = list(unique_everseen(self._pin))
-        # E.g. psyms = ['S', '5', '2', 'R'].
-        n = len(psyms)
-        # Create all permutations of 0's and 1's of length n,
-        # i.e. every possible set of truth values.
-        # This line of code is where the project started!
-        perm = [x for x in product('01', repeat=n)]
-
-        # Evaluate the argument for every set of truth values.
-        for i in range(len(perm)):
-            # Assign truth values to the symbols.
-            vals = {psyms[j]: int(perm[i][j]) for j in range(n)}
-            # E.g. vals = {'S':0, '5':1 '2':0, 'R':1}.
-            # Convert the symbols in self._arg to the truth values.
-            arg = self.convert(psyms, vals)
-            # Determine truth value of the premises.
-            truth = [self.det(premise) for premise in arg]
-            if -1 in truth:  # Unhandled exception - abort
-                return -1
-            # Add this set of truth values to the list of all sets.
-            all_truth.append(truth)
-            # Condition for invalidity: all premises are true (=1) and the
-            # conclusion is false (=0).
-            if test and truth[-1] == 0 and truth[:-1] == (len(arg) - 1) * [1]:
-                valid = False
-                # Construct list of counter examples for the output message.
-                bad_vals.append(vals)
-            else:
-                # The current set of truth values is not a counter example to
-                # argument - move on and test the next set.
-                continue
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._lines)
 
-        # Send all of the information obtained about the set of expressions
-        # to the TruthTable class, which will allow the generation and display
-        # of a truth table.
-        # deepcopy prevents the source objects being modified in the process.
-        self.truth_table = TruthTable(deepcopy(psyms),
-                                      deepcopy(self._arg),
-                                      deepcopy(perm),
-                                      deepcopy(all_truth), conc=test)
-        self._table_data = self.truth_table.get_table_data()
-
-        # Return a statement about the validity of the argument if requested.
-        if test:
-            if valid:
-                output = '\nThe argument is valid.\n'
-            else:
-                output = '\nThe argument is invalid. Counter examples:\n'
-                # List the counter examples, stored in bad_vals.
-                for v in bad_vals:
-                    output += '\n'
-                    for k in psyms:
-                        output += str(k) + ' = ' + str(v[k]) + '  '
-                    output += '\n'
-                output += '\n'
-                # E.g.
-                # The argument is invalid. Counter examples:
-                #
-                # S = 0,  5 = 1,  2 = 1,  R = 0
-                # S = 0,  5 = 0,  2 = 0,  R = 1
-            return output
-
-        # Otherwise return with nothing.
-        return
-
-    def convert(self, psyms, vals):
-        """Converts the propositions (denoted as letters or numbers) in psyms
-        to their corresponding truth values from vals.
-
-        convert(list<str>, dict) -> list<str>
-        """
-
-        # E.g. psyms = ['S', '5', '2', 'R'],
-        # vals = {'S':0, '5':1 '2':0, 'R':1}.
-        # FIXME: allow use of '1' or '0' as a symbol.
-        # E.g. psyms = ['a', '0'], vals = {'a':0, '0':1}.
-        #      The a's have already been replaced with '0' - these then get
-        #      replaced with 1's on the second iteration.
-        # NOTE: could remove digit compatibility entirely. Statements like
-        # "5 = 1" are confusing.
-
-        argx = []
-        for premise in self._arg:
-            for c in psyms:
-                premise = premise.replace(c, str(vals[c]))
-            argx.append(premise)
-        return argx
-        # E.g. argx = ['0->((1^0)v1)', '~0', '0'].
-
-    def det(self, premise):
-        """Determines the truth value of premise based on the proposition
-        truth values in vals.
-
-        det(str, dict) -> int)
-        """
-
-        # Initialise q as a precaution.
-        q = 0
-        # Loop while a bracket is found, i.e. there is a nested expression.
-        while premise.find('(') != -1:
-            # Find the location of the first set of brackets.
-            openb = premise.find('(')
-            close = premise.find(')')
-            while premise.count('(', openb + 1, close) != \
-                    premise.count(')', openb + 1, close):
-                # Check the number of open brackets is not equal to
-                # the number of close brackets between the current
-                # open bracket and the current close bracket.
-                # If so, move "close" to the next position and check again.
-                close = premise.find(')', close + 1)
-            # Replace old premise with truth value of nested expression.
-            premise = premise.replace(premise[openb:close + 1],
-                                      str(self.det(premise[openb + 1:close])))
-
-        # The premise should now be reduced to an expression containing at
-        # most one operator and at least one truth value (0 or 1).
-        digits = [c for c in premise if c.isdigit()]
-        # Removing the digits should leave the operator.
-        op = premise.strip(''.join(digits))
-        # Store the truth value(s) as integer(s).
-        props = [int(c) for c in digits]
-        p = props[0]
-        if len(props) > 1:
-            q = props[1]
-
-        # Perform logical operation according to operator.
-        if op == '':  # No operator - leave as is.
-            v = p
-        elif op == operators[0]:  # NOT
-            v = int(not p)
-        elif op == operators[1]:  # AND
-            v = (p and q)
-        elif op == operators[2]:  # OR
-            v = (p or q)
-        elif op == operators[3]:  # XOR
-            v = int(p != q)
-        elif op == operators[4]:  # IFF
-            v = int(p == q)
-        elif op == operators[5]:  # IF
-            v = int(not (p == 1 and q == 0))
-        else:
-            return -1  # Something went wrong - unhandled exception.
-        # v is the overall truth value, the result required.
-        return v
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return self._lines[index.row()]
+        return None
 
-    def get_table_data(self):
-        """Retrieve the table data created in evaluate().
+    def add_entries(self, entries):
+        """Adds entries (strings, which may span several lines) to the end
+        of the list in one step.
 
-        get_table_data() -> list
+        add_entries(list<str>) -> NoneType
+        """
+        lines = []
+        starts = []
+        for entry in entries:
+            starts.append(len(self._lines) + len(lines))
+            lines.extend(entry.split('\n'))
+        if not lines:
+            return
+        first = len(self._lines)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self._lines.extend(lines)
+        self._starts.extend(starts)
+        self.endInsertRows()
+
+    def remove_last(self):
+        """Removes the last entry from the list.
         """
-        return self._table_data
+        if not self._starts:
+            return
+        start = self._starts.pop()
+        self.beginRemoveRows(QModelIndex(), start, len(self._lines) - 1)
+        del self._lines[start:]
+        self.endRemoveRows()
+
+    def clear(self):
+        """Removes every entry from the list.
+        """
+        self.beginResetModel()
+        self._lines = []
+        self._starts = []
+        self.endResetModel()
 
 
 class ArgCheck(QWidget):
@@ -244,16 +125,21 @@ class ArgCheck(QWidget):
     expressions and truth tables.
     """
 
-    def __init__(self, main_window):
+    def __init__(self, main_window, cache=None, engine=None):
         """
         Constructor
 
-        __init__(QMainWindow)
+        __init__(QMainWindow, PersistentCache, str)
         """
 
         # Inherit from QWidget.
         super().__init__()
         self.parent = main_window
+        # Optional persistent store of results shared with other sessions.
+        self.cache = cache
+        # Name of the engine to evaluate with where it can (see engines.py),
+        # or None to choose the quickest each time.
+        self.engine = engine
 
         # Initialise variables.
         self._arg = []
@@ -261,8 +147,20 @@ class ArgCheck(QWidget):
         self.raw_premises = []
         self.pretty_premises = []
         self._abort = False
-        self.current_premise = None
-        self.premise_labels = []
+        # The truth table window is kept and reused, along with the
+        # expressions it was last made for.
+        self.table_window = None
+        self._table_key = None
+        self._table_pending = False
+        # Truth values assumed for some symbols in the truth table window.
+        self.assumptions = {}
+        # The expressions compiled when the argument was concluded or a
+        # truth table was last made, queried for both (see
+        # compiled.CompiledArgument).
+        self.compiled = None
+        # The results of checking the argument, once it is concluded (see
+        # compiled.ArgumentResult).
+        self.result = None
 
         # Set font.
         font1 = QFont()
@@ -277,17 +175,36 @@ class ArgCheck(QWidget):
         self.input_layout.setAlignment(Qt.AlignTop)
         self.input_layout.addWidget(self.prompt_label, 0, 0)
         self.input_layout.addWidget(self.entry_line, 0, 1)
+        # Preview of the number of symbols and rows of the truth table with
+        # the expression being typed added.
+        self.preview_label = QLabel()
+        self.input_layout.addWidget(self.preview_label, 0, 2)
+        # The expression is checked as it is typed. Only the edited part is
+        # checked again, once typing pauses for SYNTAX_DELAY (see
+        # update_syntax()).
+        self.syntax = SyntaxChecker()
+        self._syntax_message = None
+        self._error_mark = None
+        self._arg_symbols = None
+        self.syntax_timer = QTimer(self)
+        self.syntax_timer.setSingleShot(True)
+        self.syntax_timer.setInterval(SYNTAX_DELAY)
+        self.syntax_timer.timeout.connect(self.update_syntax)
+        self.entry_line.textChanged.connect(self.syntax_timer.start)
         self.input_layout.addWidget(QLabel("Commands:"), 1, 0)
         self.input_layout.addWidget(QLabel("Operators:"), 2, 0)
 
         # Create layout for command buttons.
         # Create command labels, associated methods, and tooltips.
-        commands = ["&Add", "&Conclude", "Cl&ear", "&Back", "&Reset"]
+        commands = ["&Add", "&Conclude", "Cl&ear", "&Back", "&Reset",
+                    "&Import"]
         command_methods = [self.add_prem, self.add_conc, self.clear_entry,
-                           self.undo_prem, self.trans_reset(True)]
+                           self.undo_prem, self.trans_reset(True),
+                           self.import_prems]
         command_tooltips = ["Add expression", "Add concluding expression",
                             "Clear the entry line", "Remove last expression",
-                            "Erase everything"]
+                            "Erase everything",
+                            "Add expressions from a file or the clipboard"]
         self.command_layout = QHBoxLayout()
         # Connect command data to buttons.
         for name, method, tooltip in zip(commands, command_methods,
@@ -323,23 +240,20 @@ class ArgCheck(QWidget):
         # .connect(QShortcut(QKeySequence("Alt+N"), self),
         #              QtCore.SIGNAL("activated()"), self._not)
 
-        # Create layout to display logical expressions.
-        self.arg_layout = QVBoxLayout()
-        self.arg_layout.setAlignment(Qt.AlignTop)
-        self.arg_widget = QWidget()
-        self.arg_widget.setLayout(self.arg_layout)
-        # stylesheet1 = "background-color:White"
-        # self.arg_widget.setStyleSheet(stylesheet1)
-
-        # Make a scroll area for the display.
-        self.scroll = QScrollArea()
-        # Set the scroll area properties.
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setWidget(self.arg_widget)
+        # Create a list view to display logical expressions. Only the rows
+        # in view are drawn, so adding or clearing thousands of expressions
+        # takes no longer than a few.
+        self.arg_model = ExpressionListModel()
+        self.arg_view = QListView()
+        self.arg_view.setModel(self.arg_model)
+        self.arg_view.setUniformItemSizes(True)
+        self.arg_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.arg_view.setFocusPolicy(Qt.NoFocus)
+        # Set the scroll properties.
+        self.arg_view.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.arg_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.scroll_layout = QVBoxLayout()
-        self.scroll_layout.addWidget(self.scroll)
+        self.scroll_layout.addWidget(self.arg_view)
 
         # Create layout to display truth tables.
         self.tableBtn = QPushButton("Show &truth table")
@@ -370,122 +284,17 @@ class ArgCheck(QWidget):
     def check_premise(premise):
         """Takes a brute-force approach to handling as many kinds of syntax
         errors as possible and giving a helpful description to the user of
-        what is wrong.
+        what is wrong. The checks themselves are in syntax.py, which also
+        finds where the error is (see syntax.find_error()).
 
         If no error is found, returns 0, else a string describing the error.
 
         check_premise(str) -> int or str
         """
-
-        # Default value remains if all error handling is cleared.
-        result = 0
-        # Whether the expression is just brackets.
-        all_brackets = False
-        # Locations of operators.
-        op_indices = []
-
-        if premise == '':  # handled in add_prem
-            return result
-
-        if '0' in premise or '1' in premise:
-            return "Syntax error: cannot use 0 or 1 as a symbol"
-
-        if len(premise) == 1:
-            if is_symbol(premise):
-                return result
-            else:
-                return "Syntax error: invalid symbol(s) - must be " \
-                       "alphanumeric"
-
-        if premise[0] == ')':
-            return "Syntax error: input starts with a closed bracket"
-        if is_symbol(premise[0]):
-            if premise[1] == '(' or premise[1] == ')':
-                return "Syntax error: bracket immediately follows" \
-                         " first character"
-        elif premise[0] != '(':
-            return "Syntax error: input starts with an operator"
-
-        if len(premise) == 2:
-            return "Syntax error: input cannot be 2 characters long"
-
-        if premise[0] == '(':
-            all_brackets = True
-
-        if premise.count('(') != premise.count(')'):
-            return "Syntax error: brackets do not close"
-
-        if not is_symbol(premise[-1]) and premise[-1] not in operators and \
-            premise[-1] != "(" and premise[-1] != ")":
-            return "Syntax error: invalid symbol(s) - must be " \
-                   "alphanumeric"
-
-        for i in range(1, len(premise)-1):
-
-            if is_symbol(premise[i]):  # symbol
-                all_brackets = False
-                if is_symbol(premise[i-1]) or is_symbol(premise[i+1]):
-                    result = "Syntax error: proposition(s) represented" \
-                           " by multiple symbols"
-                    break
-
-                if premise[i-1] == ')' or premise[i+1] == '(':
-                    result = "Syntax error: incorrect bracket use"
-                    break
-                elif premise[i-1] == '(' and premise[i+1] == ')':
-                    result = "Syntax error: incorrect bracket use"
-                    break
-
-            else:  # not a symbol
-
-                if premise[i] == '(' and premise[i-1] == ')':  # bracket
-                    result = "Syntax error: consecutive brackets"
-                    break
-                elif premise[i] == ')' and premise[i-1] == '(':
-                    result = "Syntax error: consecutive brackets"
-                    break
-                elif premise[i] == ')' and is_symbol(premise[i+1]):
-                    result = "Syntax error: symbol immediately follows close" \
-                             " bracket"
-                    break
-
-                elif premise[i] != '(' and premise[i] != ')':  # operator
-                    if premise[i] not in operators:
-                        result = "Syntax error: invalid symbol(s) - must be " \
-                                 "alphanumeric"
-                        break
-                    op_indices.append(i)
-                    if i-1 in op_indices:
-                        result = "Syntax error: adjacent operators"
-                        break
-                    if i-2 in op_indices and premise[i] != operators[0]:
-                        result = "Syntax error: sub-expression needs brackets"
-                    all_brackets = False
-                    if premise[i] == operators[0]:  # negation
-                        if premise[i-1] != '(' or premise[i+1] == ')':
-                            result = "Syntax error: incorrect bracket position"
-                            break
-                        elif premise[i+1] != '(' and premise[i+2] != ')':
-                            # open bracket on left, symbol or op on right
-                            result = "Syntax error: negation needs brackets"
-                            break
-
-                    else:  # other operator
-                        if premise[i-1] == '(' or premise[i+1] == ')':
-                            result = "Syntax error: incorrect bracket position"
-                            break
-                        elif is_symbol(premise[i-1]) == False \
-                                and is_symbol(premise[i+1]) == False\
-                                and premise[i-1] != ')'\
-                                and premise[i+1] != '(':
-                            result = "Syntax error: no symbol next to" \
-                                     " operator"
-                            break
-
-        if all_brackets:
-            result = "Syntax error: input contains only brackets"
-
-        return result
+        error = find_error(premise)
+        if error is None:
+            return 0
+        return error[0]
 
     def return_entry(self):
         """Brings the focus of the application to the entry line.
@@ -548,17 +357,13 @@ class ArgCheck(QWidget):
                 # This caused bugs when other functionality was added.
                 # elif premise == '':
                 #     premise = self._arg[-1]
-                #     self.clear_layout(self.arg_layout)
-                #     for e in self.pretty_premises[:-1]:
-                #         self.arg_layout.addWidget(QLabel(e))
+                #     self.arg_model.remove_last()
                 # Extra formatting for the conclusion: a dividing line and
                 # "therefore" symbol.
                 pretty_premise = '____\n\n' + u'\u2234' + \
                                  ' ' + premise
                 # Display the expression in the window.
-                self.current_premise = QLabel(pretty_premise)
-                self.arg_layout.addWidget(self.current_premise)
-                self.premise_labels.append(self.current_premise)
+                self.arg_model.add_entries([pretty_premise])
                 # Spaces are not handled by PropArg.evaluate() so remove.
                 premise = premise.replace(' ', '')
                 # Add to the list of expressions (the argument).
@@ -581,15 +386,15 @@ class ArgCheck(QWidget):
                                           premise])
                 # Proceed as in the "if" case.
                 self.pretty_premises.append(pretty_premise)
-                self.current_premise = QLabel(pretty_premise)
-                self.arg_layout.addWidget(self.current_premise)
-                self.premise_labels.append(self.current_premise)
+                self.arg_model.add_entries([pretty_premise])
                 premise = premise.replace(' ', '')
                 self._arg.append(premise)
                 self.tableBtn.setDisabled(False)
 
         # Clear the entry line for a new input.
         self.clear_entry()
+        if not is_conc and not self._abort:
+            self.expressions_changed()
 
     def undo_prem(self):
         """Maps to the "Back" button. Removes the latest addition to the
@@ -605,13 +410,12 @@ class ArgCheck(QWidget):
             # If the user just concluded an argument:
             if self._post_conc:
                 # Delete the conclusion-specific output.
-                self.outputLabel.deleteLater()
+                self.arg_model.remove_last()
                 # Go back to pre-conclusion state.
                 self._post_conc = False
+                self.result = None
             # Delete the most recently added premise from display.
-            self.premise_labels[-1].deleteLater()
-            # Remove this from the list of displayed premises.
-            self.premise_labels.remove(self.premise_labels[-1])
+            self.arg_model.remove_last()
             # Clear entry box in preparation for returned premise.
             self.clear_entry()
             # Insert removed premise.
@@ -624,6 +428,7 @@ class ArgCheck(QWidget):
             self._arg.remove(self._arg[-1])
             # Remove the displayed premise text from the list.
             self.pretty_premises.remove(self.pretty_premises[-1])
+            self.expressions_changed()
 
     def add_conc(self):
         """Maps to the "Conclude" button. Adds a logical expression as the
@@ -644,10 +449,15 @@ class ArgCheck(QWidget):
             if self._abort:
                 # Something went wrong - abort the process.
                 return
-            # Test the validity of the argument using the PropArg object.
-            self.prop_arg = PropArg(self._arg)
-            output = self.prop_arg.evaluate()
-            if output == -1:  # Unhandled exception
+            # Test the validity of the argument, compiling it for this and
+            # any truth tables made until the expressions change.
+            compiled = self.compile_argument()
+            budget = self.new_budget()
+            engine = engines.preferred(compiled.prop_arg(), engines.VALIDITY,
+                                       self.engine, budget)
+            try:
+                result = compiled.query(budget=budget, engine=engine)
+            except ValueError:  # Unhandled exception
                 self.parent.statusBar().showMessage("An unknown error "
                                                     "occurred. Check for"
                                                     " ambiguity in the"
@@ -655,11 +465,17 @@ class ArgCheck(QWidget):
                 # Force "Back" button.
                 self.undo_prem()
                 return
+            output = result.output
+            if isinstance(output, Undecided):
+                self.parent.statusBar().showMessage("The argument is too "
+                                                    "large to check in full")
             # Display the output message in the window.
-            self.outputLabel = QLabel(output)
-            self.arg_layout.addWidget(self.outputLabel)
-            # Indicate the conclusion has been processed.
+            self.arg_model.add_entries([str(output)])
+            # Indicate the conclusion has been processed, keeping the
+            # results to be saved with the session.
             self._post_conc = True
+            self.result = result
+            self.expressions_changed()
 
         else:
             # Concluded argument already exists, or no expressions at all.
@@ -667,44 +483,496 @@ class ArgCheck(QWidget):
             self.parent.statusBar().showMessage("Add a premise first")
             self.return_entry()
 
+    def import_prems(self):
+        """Maps to the "Import" button. Offers a choice of where to import
+        expressions from.
+        """
+        menu = QMenu(self)
+        menu.addAction("From &file...", self.import_file)
+        menu.addAction("From &clipboard", self.import_clipboard)
+        menu.exec_(QCursor.pos())
+
+    def import_file(self):
+        """Asks for a text file and imports the expressions in it.
+        """
+        path = QFileDialog.getOpenFileName(self, "Import expressions", "",
+                                           "Text files (*.txt);;"
+                                           "All files (*)")[0]
+        if not path:
+            # The dialog was cancelled.
+            return
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            self.parent.statusBar().showMessage("Could not read " + path +
+                                                ": " + str(e))
+            return
+        self.import_text(text)
+
+    def import_clipboard(self):
+        """Imports the expressions in the clipboard.
+        """
+        self.import_text(QApplication.clipboard().text())
+
+    def import_text(self, text):
+        """Adds the expressions in text, one per line, as if each had been
+        entered and added in turn. Blank lines and lines starting with '#'
+        are ignored. If the last expression starts with the "therefore"
+        symbol, it is added as the conclusion.
+
+        Every expression is checked before any is added, so if one has an
+        error, nothing is imported and the line number of the error is shown
+        in the status bar.
+
+        import_text(str) -> NoneType
+        """
+        self.parent.statusBar().clearMessage()
+        premises = []
+        conclusion = None
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if conclusion is not None:
+                self.parent.statusBar().showMessage(
+                    "Line " + str(number) + ": the conclusion must be the "
+                    "last expression")
+                return
+            if line.startswith(u'∴'):
+                line = line[1:].strip()
+                conclusion = line
+            error = self.check_premise(line.replace(" ", ""))
+            if line == '':
+                error = "Enter an expression to conclude with"
+            if error != 0:
+                self.parent.statusBar().showMessage("Line " + str(number) +
+                                                    ": " + error)
+                return
+            if conclusion is None:
+                premises.append(line)
+        if not premises and conclusion is None:
+            self.parent.statusBar().showMessage("No expressions to import")
+            return
+
+        if self._post_conc:
+            # Importing after the conclusion starts a new argument, as for
+            # add_prem().
+            self.reset()
+            self._post_conc = False
+        # Add all the premises to the display in one go.
+        pretty = []
+        for premise in premises:
+            self.raw_premises.append(premise)
+            pretty.append("".join([str(len(self._arg) + 1), ". ", premise]))
+            self._arg.append(premise.replace(' ', ''))
+        self.pretty_premises.extend(pretty)
+        self.arg_model.add_entries(pretty)
+        if self._arg:
+            self.tableBtn.setDisabled(False)
+        self.expressions_changed()
+        if conclusion is not None:
+            # Conclude as if the conclusion had been typed in.
+            self.entry_line.setText(conclusion)
+            self.add_conc()
+
+    def save_session_file(self, columns=False):
+        """Asks for a file and saves the session in it (see session.py),
+        with the truth table if columns == True.
+
+        save_session_file(bool) -> NoneType
+        """
+        from session import EXTENSION, save_session
+        if not self._arg:
+            self.parent.statusBar().showMessage("Add an expression first")
+            return
+        path = QFileDialog.getSaveFileName(self, "Save session", "",
+                                           "Logicheck sessions (*" +
+                                           EXTENSION + ");;"
+                                           "All files (*)")[0]
+        if not path:
+            # The dialog was cancelled.
+            return
+        if not os.path.splitext(path)[1]:
+            path += EXTENSION
+        try:
+            session = self.get_session(columns)
+        except ValueError as e:
+            self.parent.statusBar().showMessage(str(e))
+            return
+        try:
+            save_session(path, session)
+        except OSError as e:
+            self.parent.statusBar().showMessage("Could not write " + path +
+                                                ": " + str(e))
+            return
+        self.parent.statusBar().showMessage("Saved " + path)
+
+    def open_session_file(self):
+        """Asks for a session file (see session.py) and opens it in place of
+        the current expressions.
+        """
+        from session import EXTENSION, open_session
+        path = QFileDialog.getOpenFileName(self, "Open session", "",
+                                           "Logicheck sessions (*" +
+                                           EXTENSION + ");;"
+                                           "All files (*)")[0]
+        if not path:
+            # The dialog was cancelled.
+            return
+        try:
+            session = open_session(path)
+        except (OSError, ValueError) as e:
+            self.parent.statusBar().showMessage("Could not open " + path +
+                                                ": " + str(e))
+            return
+        self.load_session(session)
+
+    def get_session(self, columns=False):
+        """Returns the expressions in the widget as a Session (see
+        session.py), along with the verdict if the argument has been
+        concluded. If columns == True, the truth table is worked out and
+        included, for the rows where the assumptions made in the truth
+        table window hold. Raises ValueError if the table is too large.
+
+        get_session(bool) -> Session
+        """
+        from session import Session, table_columns
+        symbols = PropArg(self._arg).symbols()
+        # As in the truth table window.
+        assumptions = {c: v for c, v in self.assumptions.items()
+                       if c in symbols}
+        result = self.result
+        if result is None:
+            session = Session(list(self.raw_premises), self._post_conc,
+                              symbols=symbols, assumptions=assumptions)
+        else:
+            session = Session(list(self.raw_premises), self._post_conc,
+                              str(result.output), result.valid,
+                              result.counter_examples, symbols, assumptions)
+        if columns:
+            estimate = estimate_table(self._arg, fixed=len(assumptions))
+            if estimate.strategy == REFUSE:
+                raise ValueError("Truth table not saved: " + estimate.reason)
+            session.set_columns(*table_columns(symbols, self._arg,
+                                               assumptions))
+        return session
+
+    def load_session(self, session):
+        """Replaces the expressions in the widget with those of session, as
+        they were when it was saved. The verdict and the truth table, if
+        the session holds one, are shown as saved, without evaluating
+        anything.
+
+        load_session(Session) -> NoneType
+        """
+        from truth_table import SessionTruthTableModel
+        for number, premise in enumerate(session.premises, 1):
+            error = self.check_premise(premise.replace(" ", ""))
+            if error != 0:
+                self.parent.statusBar().showMessage(
+                    "Expression " + str(number) + " of the session: " +
+                    error)
+                return
+        self.reset(True)
+        self._post_conc = False
+        premises = session.premises
+        if session.conc:
+            premises = premises[:-1]
+        # Add the expressions to the display in one go, as for
+        # import_text().
+        pretty = []
+        for premise in premises:
+            self.raw_premises.append(premise)
+            pretty.append("".join([str(len(self._arg) + 1), ". ", premise]))
+            self._arg.append(premise.replace(' ', ''))
+        self.pretty_premises.extend(pretty)
+        if session.conc:
+            # The conclusion and its verdict, as add_conc() shows them.
+            conclusion = session.premises[-1]
+            self.raw_premises.append(conclusion)
+            self.pretty_premises.append(conclusion)
+            pretty.append('____\n\n' + u'\u2234' + ' ' + conclusion)
+            self._arg.append(conclusion.replace(' ', ''))
+            if session.output is not None:
+                pretty.append(session.output)
+                self.result = ArgumentResult(
+                    tuple(self._arg), {}, session.symbols, session.valid,
+                    session.counter_examples, None,
+                    2 ** len(session.symbols), None, session.output)
+            self._post_conc = True
+        self.arg_model.add_entries(pretty)
+        if self._arg:
+            self.tableBtn.setDisabled(False)
+        self.assumptions = dict(session.assumptions)
+        self.expressions_changed()
+        if session.has_columns():
+            # Show the saved table, marking it as the table for these
+            # expressions so that it isn't made again.
+            self.set_table_model(SessionTruthTableModel(session))
+            self.table_window.assume_line.setText("  ".join(
+                "%s = %d" % (c, v) for c, v in session.assumptions.items()))
+            self._table_key = (tuple(self._arg), self._post_conc,
+                               tuple(sorted(self.assumptions.items())))
+            self.show_truth_table()
+
     def show_truth_table(self):
         """Displays the truth table for the set of expressions currently in
-        the widget, in a new window.
-        """
-        if not self._post_conc:
-            # The logic of the expressions has not been processed - do so now
-            # without checking for validity.
-            self.prop_arg = PropArg(self._arg)
-            self.prop_arg.evaluate(test=False)
-        # Retrieve the data for the truth table.
-        self.table_data = self.prop_arg.get_table_data()
-        # Create a new window to display the table.
-        self.table_window = TruthTableWindow(self.table_data)
-        self.table_window.show()
+        the widget, in a separate window. The same window is used every time,
+        and the table is only calculated again if the expressions have
+        changed.
+        """
+        if self.update_truth_table():
+            self.table_window.show()
+            self.table_window.raise_()
+            self.table_window.activateWindow()
+
+    def update_truth_table(self):
+        """Brings the truth table window up to date with the set of
+        expressions currently in the widget, creating the window if there
+        isn't one yet. Nothing is calculated if the expressions haven't
+        changed since the table was last made.
+
+        Returns False if there is no table to show, in which case the status
+        bar says why.
+
+        update_truth_table() -> bool
+        """
+        symbols = PropArg(self._arg).symbols()
+        # Assumptions about symbols no longer in the expressions are left
+        # out.
+        assumptions = {c: v for c, v in self.assumptions.items()
+                       if c in symbols}
+        key = (tuple(self._arg), self._post_conc,
+               tuple(sorted(assumptions.items())))
+        if self.table_window is not None and key == self._table_key:
+            return True
+        # Decide how to produce the table before calculating anything.
+        estimate = estimate_table(self._arg, fixed=len(assumptions))
+        if estimate.strategy == REFUSE:
+            self.parent.statusBar().showMessage("Truth table not shown: " +
+                                                estimate.reason)
+            return False
+        from truth_table import LazyTruthTableModel, TruthTableModel
+        if estimate.strategy == STREAM:
+            # Too big to calculate in full - rows are calculated as they are
+            # scrolled to.
+            try:
+                model = LazyTruthTableModel(symbols, self._arg,
+                                            conc=self._post_conc,
+                                            assumptions=assumptions)
+            except ValueError:
+                self.parent.statusBar().showMessage("An unknown error "
+                                                    "occurred. Check for"
+                                                    " ambiguity in the"
+                                                    " expression.")
+                return False
+        else:
+            # Evaluate the expressions, checking for validity under the
+            # assumptions if there is a conclusion. The compiled expressions
+            # are reused for each set of assumptions tried.
+            compiled = self.compile_argument()
+            budget = self.new_budget()
+            engine = engines.preferred(compiled.prop_arg(), engines.TABLE,
+                                       self.engine, budget)
+            try:
+                result = compiled.query(self._post_conc, True, assumptions,
+                                        budget, engine)
+            except ValueError:  # Unhandled exception
+                self.parent.statusBar().showMessage("An unknown error "
+                                                    "occurred. Check for"
+                                                    " ambiguity in the"
+                                                    " expression.")
+                return False
+            output = result.output
+            if isinstance(output, Undecided):
+                self.parent.statusBar().showMessage("".join([
+                    "Showing the first ", str(output.rows_done), " of ",
+                    str(output.rows_total), " rows: ", output.reason]))
+            elif output is not None and assumptions:
+                # The verdict under the assumptions, without the counter
+                # examples, which are in the table.
+                self.parent.statusBar().showMessage(
+                    output.strip().split('.')[0] + '.')
+            # Retrieve the data for the truth table. The columns the window
+            # filters and sorts by are worked out in one bit-parallel pass,
+            # rather than read back out of the rows.
+            self.table_data = result.table_data
+            from session import table_columns
+            columns = table_columns(list(result.symbols), self._arg,
+                                    assumptions)[0]
+            model = TruthTableModel(self.table_data, len(result.symbols),
+                                    self._post_conc, columns)
+        self.set_table_model(model)
+        self._table_key = key
+        return True
+
+    def set_table_model(self, model):
+        """Puts the table in model in the truth table window, creating the
+        window if there isn't one yet.
+
+        set_table_model(QAbstractTableModel) -> NoneType
+        """
+        from truth_table import TruthTableWindow
+        if self.table_window is None:
+            # Create the window on first use.
+            self.table_window = TruthTableWindow(model)
+            self.table_window.assume_line.editingFinished.connect(
+                self.change_assumptions)
+        else:
+            # Swap the new table into the existing window.
+            self.table_window.set_model(model)
+
+    def change_assumptions(self):
+        """Called when the assumptions in the truth table window have been
+        edited. The table is made again for just the rows where they hold,
+        or the status bar says what is wrong with them.
+        """
+        try:
+            assumptions = self.parse_assumptions(
+                self.table_window.assume_line.text())
+        except ValueError as e:
+            self.parent.statusBar().showMessage(str(e))
+            return
+        symbols = PropArg(self._arg).symbols()
+        unknown = [c for c in assumptions if c not in symbols]
+        if unknown:
+            self.parent.statusBar().showMessage("Cannot assume a truth value "
+                                                "for a symbol not in the "
+                                                "expressions: " +
+                                                ', '.join(unknown))
+            return
+        self.assumptions = assumptions
+        if self._arg:
+            self.update_truth_table()
 
     @staticmethod
-    def layout_widgets(layout):
-        """Returns all QWidgets contained in a QLayout.
+    def parse_assumptions(text):
+        """Reads truth values to assume for symbols, written as in a list of
+        counter examples, e.g. "P = 1  R = 0", optionally separated by
+        commas. Raises ValueError if text isn't written that way or gives a
+        symbol twice.
 
-        layout_widgets(QLayout) -> tuple<QWidget>
+        parse_assumptions(str) -> dict
+        """
+        assumptions = {}
+        if ASSUMPTION.sub('', text).strip(' ,'):
+            raise ValueError("Assumptions must be written as symbols and "
+                             "truth values, e.g. P = 1, R = 0")
+        for c, v in ASSUMPTION.findall(text):
+            if not is_symbol(c) or c in '01':
+                raise ValueError("Invalid symbol in assumptions: " + c)
+            if c in assumptions:
+                raise ValueError("Truth value assumed twice for " + c)
+            assumptions[c] = int(v)
+        return assumptions
+
+    def expressions_changed(self):
+        """Called whenever the set of expressions changes. If the truth table
+        window is open, it is brought up to date once control returns to the
+        event loop, so that several changes made together (e.g. a reset
+        followed by a new expression) only update it once.
+        """
+        self._arg_symbols = None
+        self.update_preview()
+        if self.table_window is not None and \
+                self.table_window.isVisible() and not self._table_pending:
+            self._table_pending = True
+            QTimer.singleShot(0, self.refresh_truth_table)
+
+    def update_syntax(self):
+        """Checks the expression in the entry line after it is edited. Any
+        syntax error is shown in the status bar and in the entry line's
+        tooltip, which marks where it was found, and the preview of the truth table
+        size is updated.
         """
-        return (layout.itemAt(i) for i in range(layout.count()))
+        self.syntax.update(self.entry_line.text())
+        error = self.syntax.error()
+        status = self.parent.statusBar()
+        if error is None:
+            self.mark_error(None)
+            # Leave any other message alone.
+            if self._syntax_message is not None and \
+                    status.currentMessage() == self._syntax_message:
+                status.clearMessage()
+            self._syntax_message = None
+        else:
+            message, position = error
+            self.mark_error(self.syntax.raw_position(position), message)
+            status.showMessage(message)
+            self._syntax_message = message
+        self.update_preview()
+
+    def mark_error(self, position, message=None):
+        """Marks the character at position in the entry line, in red in the
+        entry line's tooltip under the error message, or removes the mark
+        if position is None. The text itself is left alone, so nothing gets
+        in the way of an input method composing text in it.
+
+        mark_error(int, str) -> NoneType
+        """
+        if position is None and self._error_mark is None:
+            return
+        self._error_mark = position
+        if position is None:
+            self.entry_line.setToolTip('')
+            return
+        text = self.entry_line.text()
+        # The character found at fault, or a space after the end if the
+        # expression stops short.
+        marked = text[position:position + 1] or ' '
+        self.entry_line.setToolTip(''.join([
+            '<p>', escape(message or ''), '</p><p style="white-space:pre">',
+            escape(text[:position]),
+            '<span style="color:red; text-decoration:underline">',
+            escape(marked), '</span>', escape(text[position + 1:]),
+            '</p>']))
+
+    def update_preview(self):
+        """Shows the number of symbols and rows the truth table would have
+        with the expression being typed added to the argument.
+        """
+        if self._arg_symbols is None:
+            self._arg_symbols = set(c for p in self._arg for c in p
+                                    if is_symbol(c))
+        n = len(self._arg_symbols | self.syntax.symbols())
+        if n == 0:
+            self.preview_label.clear()
+            return
+        text = "%d symbol%s, %d rows" % (n, '' if n == 1 else 's', 2 ** n)
+        if 2 ** n > STREAM_ROWS:
+            text = "%d symbols, too many rows to show" % n
+        self.preview_label.setText(text)
+
+    def refresh_truth_table(self):
+        """Updates the open truth table window after expressions_changed(),
+        or hides it if there is no longer a table to show.
+        """
+        self._table_pending = False
+        if self.table_window is None or not self.table_window.isVisible():
+            return
+        if not self._arg or not self.update_truth_table():
+            self.table_window.hide()
 
     @staticmethod
-    def clear_layout(layout):
-        """Clears all QWidget and QLayout objects from a QLayout.
+    def new_budget():
+        """Returns the limits for an evaluation started from the GUI.
+
+        new_budget() -> Budget
+        """
+        return Budget(seconds=GUI_SECONDS, max_bytes=GUI_MAX_BYTES)
+
+    def compile_argument(self):
+        """Returns the current expressions compiled, compiling them only if
+        they have changed since last time.
 
-        clear_layout(QLayout)
+        compile_argument() -> CompiledArgument
         """
-        while layout.count():
-            # There are objects in the layout. Store the first one.
-            child = layout.takeAt(0)
-            if child.widget() is not None:
-                # Object is a QWidget - delete.
-                child.widget().deleteLater()
-            elif child.layout() is not None:
-                # Object is a QLayout - clear.
-                clearLayout(child.layout())
+        arg = tuple(p.replace(' ', '') for p in self._arg)
+        if self.compiled is None or self.compiled.argument != arg or \
+                self.compiled.cache is not self.cache:
+            self.compiled = CompiledArgument(arg, self.cache)
+        return self.compiled
 
     def reset(self, clear=False):
         """Maps to the "Reset" button. Erases all data pertaining to the set
@@ -720,13 +988,14 @@ class ArgCheck(QWidget):
         self._arg = []
         self.raw_premises = []
         self.pretty_premises = []
-        self.premise_labels = []
+        self.result = None
         # Clear the display of expressions.
-        self.clear_layout(self.arg_layout)
+        self.arg_model.clear()
         # Clear the status bar.
         self.parent.statusBar().showMessage("")
         # Disable the truth table button since there is no data to use.
         self.tableBtn.setDisabled(True)
+        self.expressions_changed()
 
     def add_op(self):
         """Maps to the operators buttons. Inserts the operator in the entry
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""
+batch.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from engines import ENGINES, log_to_stderr, logger
+from server import OPS, EvalServer, run_request, worker_context
+
+# Number of arguments sent to a worker at a time. Small arguments take far
+# less time to check than to send between processes one by one.
+CHUNK_SIZE = 256
+# Number of chunks waiting or in progress per worker. Arguments are only read
+# from the input as chunks finish, so a huge batch never has to be held in
+# memory all at once.
+PENDING_PER_WORKER = 2
+
+
+class BatchResult(object):
+    """The result of checking one argument of a batch. Either result holds
+    the same dictionary the evaluation server would give, or error holds
+    the type and message of what went wrong with this argument.
+    """
+
+    def __init__(self, index, argument, result=None, error=None):
+        """
+        Constructor
+
+        __init__(int, list<str>, dict, dict)
+        """
+        # Position of the argument in the batch, counting from 0, or as
+        # numbered by the caller (see check_batch()).
+        self.index = index
+        self.argument = argument
+        self.result = result
+        # E.g. {'type': 'ValueError', 'message': 'Syntax error: ...'}.
+        self.error = error
+        self.ok = error is None
+
+    def to_dict(self):
+        """Returns the result as a dictionary ready to be encoded as JSON,
+        in the same form as a response from the evaluation server.
+
+        to_dict() -> dict
+        """
+        if self.ok:
+            return {'index': self.index, 'ok': True, 'result': self.result}
+        return {'index': self.index, 'ok': False, 'error': self.error}
+
+
+def error_dict(e):
+    """Returns the structured form of an exception used in a BatchResult.
+
+    error_dict(Exception) -> dict
+    """
+    return {'type': type(e).__name__, 'message': str(e)}
+
+
+def check_chunk(chunk, op, falsify=0, limits=None, cache_path=None,
+                engine=None):
+    """Checks each (index, argument) pair in chunk, returning a BatchResult
+    for each. Runs in a worker process. A failure only affects the argument
+    it happened on.
+
+    check_chunk(list<tuple<int, list<str>>>, str, int, dict, str, str)
+        -> list<BatchResult>
+    """
+    results = []
+    for index, arg in chunk:
+        try:
+            # Validate the argument as the server would.
+            request = {'op': op, 'argument': arg, 'falsify': falsify,
+                       'budget': limits}
+            _, parsed, samples, budget, _, _ = \
+                EvalServer.parse_request(request)
+            # The engine for the whole batch is only used where it can
+            # answer op, as for the server's default.
+            result = run_request(op, parsed, cache_path, samples, budget,
+                                 default_engine=engine)
+            results.append(BatchResult(index, arg, result))
+        except Exception as e:
+            results.append(BatchResult(index, arg, error=error_dict(e)))
+    return results
+
+
+def check_batch(arguments, op='validity', workers=None, ordered=True,
+                chunk_size=CHUNK_SIZE, falsify=0, limits=None,
+                cache_path=None, engine=None, numbered=False):
+    """Checks many arguments (each a list of expressions) in a pool of
+    worker processes, yielding a BatchResult for each.
+
+    Arguments are read from the iterable chunk_size at a time, and only as
+    fast as the workers get through them. If ordered == True, results are
+    yielded in the same order as the arguments; otherwise each chunk's
+    results are yielded as soon as it is finished.
+
+    Each result's index is the argument's position in the iterable,
+    counting from 0, unless numbered == True, in which case the iterable
+    gives (index, argument) pairs, e.g. the line each argument was read
+    from.
+
+    op, falsify, limits and cache_path are as for a request to the
+    evaluation server (see server.EvalServer), and engine is used where it
+    can answer op, as for the server's default engine. A malformed argument
+    or a failed evaluation gives a BatchResult with an error; the rest of
+    the batch carries on.
+
+    check_batch(iterable<list<str>>, str, int, bool, int, int, dict, str,
+                str, bool) -> generator<BatchResult>
+    """
+    if op not in OPS:
+        raise ValueError("Unknown op: " + str(op))
+    if engine is not None and engine not in ENGINES:
+        raise ValueError("Unknown engine: " + str(engine))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_pending = workers * PENDING_PER_WORKER
+    items = iter(arguments) if numbered else enumerate(arguments)
+    # Workers log engine choices as this process does.
+    pool = ProcessPoolExecutor(workers, worker_context(),
+                               initializer=log_to_stderr,
+                               initargs=(logger.getEffectiveLevel(),))
+    # Chunks being worked on, by future, and their number in the batch.
+    pending = {}
+    # Finished chunks waiting for an earlier one, by number.
+    finished = {}
+    submitted = 0
+    next_chunk = 0
+    exhausted = False
+    try:
+        while True:
+            # Keep the workers busy without reading ahead any further.
+            while not exhausted and len(pending) < max_pending:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                future = pool.submit(check_chunk, chunk, op, falsify, limits,
+                                     cache_path, engine)
+                pending[future] = (submitted, chunk)
+                submitted += 1
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, chunk = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # The worker itself failed, e.g. it was killed. Every
+                    # argument in the chunk gets the error.
+                    results = [BatchResult(index, arg, error=error_dict(e))
+                               for index, arg in chunk]
+                if ordered:
+                    finished[number] = results
+                else:
+                    for result in results:
+                        yield result
+            # Yield any chunks that are now next in order.
+            while next_chunk in finished:
+                for result in finished.pop(next_chunk):
+                    yield result
+                next_chunk += 1
+    finally:
+        # Stop any remaining work if the caller stops early.
+        pool.shutdown(cancel_futures=True)
+
+
+def run_batch(infile, outfile, op='validity', workers=None, ordered=True,
+              cache_path=None, engine=None):
+    """Reads one argument per line from infile, as a JSON list of
+    expressions, and writes one result per line to outfile, as JSON in the
+    form given by BatchResult.to_dict(). Each result's index is the number
+    of the line the argument was on, counting from 0. Blank lines are
+    skipped, but still counted, so the index always points back to the
+    line. Returns 1 if any argument failed, otherwise 0.
+
+    run_batch(file, file, str, int, bool, str, str) -> int
+    """
+
+    def decode(line):
+        try:
+            return json.loads(line)
+        except ValueError:
+            # Passed on as is, so it is reported as a malformed argument.
+            return line
+
+    lines = enumerate(line.strip() for line in infile)
+    arguments = ((number, decode(line)) for number, line in lines if line)
+    failures = 0
+    for result in check_batch(arguments, op, workers, ordered,
+                              cache_path=cache_path, engine=engine,
+                              numbered=True):
+        if not result.ok:
+            failures += 1
+        outfile.write(json.dumps(result.to_dict(), ensure_ascii=False) + '\n')
+    outfile.flush()
+    # Exit status for the command line.
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_batch(sys.stdin, sys.stdout))
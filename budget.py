@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""
+budget.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+
+# Rough memory cost of keeping one row of a truth table, in bytes: a fixed
+# overhead for the row's lists and tuples, plus an amount per column. Used
+# to turn a memory limit into a number of rows.
+ROW_BYTES = 400
+CELL_BYTES = 40
+# The deadline is only checked every this many rows, to keep it cheap.
+CHECK_EVERY = 256
+
+
+def row_bytes(columns):
+    """Returns the estimated memory needed for one row of a truth table
+    with the given number of columns.
+
+    row_bytes(int) -> int
+    """
+    return ROW_BYTES + CELL_BYTES * columns
+
+
+class Budget(object):
+    """Limits on the work done to evaluate a set of expressions: a wall-clock
+    deadline, a maximum number of rows of the truth table, and a maximum
+    number of bytes of truth table to keep in memory. Any limit left as None
+    does not apply.
+
+    The deadline is counted from when the Budget is created.
+    """
+
+    def __init__(self, seconds=None, max_rows=None, max_bytes=None):
+        """
+        Constructor
+
+        __init__(float, int, int)
+        """
+        self.seconds = seconds
+        self.deadline = None
+        if seconds is not None:
+            self.deadline = time.monotonic() + seconds
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def exceeded(self, rows, columns=None):
+        """Returns the reason the budget has run out after rows rows with
+        the given number of columns, or None if it hasn't. If columns is
+        None, the rows are not being kept, so the memory limit is ignored.
+
+        exceeded(int, int) -> str or NoneType
+        """
+        if self.max_rows is not None and rows > self.max_rows:
+            return "row limit of %d reached" % self.max_rows
+        if self.max_bytes is not None and columns is not None and \
+                rows * row_bytes(columns) > self.max_bytes:
+            return "memory limit of %d bytes reached" % self.max_bytes
+        if rows % CHECK_EVERY == 0:
+            return self.expired()
+        return None
+
+    def expired(self):
+        """Returns the reason the budget has run out if the deadline has
+        passed, otherwise None. For work that isn't counted in rows.
+
+        expired() -> str or NoneType
+        """
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return "time limit of %g seconds reached" % self.seconds
+        return None
+
+
+class Undecided(object):
+    """The result of an evaluation that ran out of budget before finishing.
+    Holds how far it got and any counter examples already found. If there
+    are any, the argument is known to be invalid, but they may not be all of
+    its counter examples.
+
+    rows_done is None if the evaluation didn't go through the truth table
+    row by row (e.g. the solver in sat.py).
+    """
+
+    def __init__(self, reason, rows_done, rows_total, symbols,
+                 counter_examples):
+        """
+        Constructor
+
+        __init__(str, int, int, list<str>, list<dict>)
+        """
+        self.reason = reason
+        self.rows_done = rows_done
+        self.rows_total = rows_total
+        self.symbols = symbols
+        self.counter_examples = counter_examples
+        # False if a counter example was found, otherwise unknown.
+        self.valid = False if counter_examples else None
+
+    def progress(self):
+        """Returns the fraction of the truth table that was evaluated, or
+        None if it isn't known.
+
+        progress() -> float or NoneType
+        """
+        if self.rows_done is None:
+            return None
+        return self.rows_done / self.rows_total
+
+    def __str__(self):
+        if self.rows_done is None:
+            output = '\nStopped early: %s.\n' % self.reason
+        else:
+            output = '\nStopped early: %s after %d of %d rows (%.1f%%).\n' % \
+                     (self.reason, self.rows_done, self.rows_total,
+                      100 * self.progress())
+        if self.counter_examples:
+            output += '\nThe argument is invalid. Counter examples found ' \
+                      'so far:\n'
+            for v in self.counter_examples:
+                output += '\n'
+                for k in self.symbols:
+                    output += str(k) + ' = ' + str(v[k]) + '  '
+                output += '\n'
+            output += '\n'
+        return output
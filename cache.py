@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+
+"""
+cache.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default limit on the total size of the stored results, in bytes.
+MAX_BYTES = 64 * 1024 * 1024
+# Truth columns are only stored for tables with at most this many rows, so
+# that one huge table can't push everything else out of the cache.
+MAX_COLUMN_ROWS = 2 ** 20
+# Seconds to wait for another process to release the database.
+TIMEOUT = 30
+
+
+def pack_columns(all_truth, m):
+    """Packs the m truth columns of all_truth (a list of rows of 0's and
+    1's) into bytes, one bit per row, with the columns one after another.
+
+    pack_columns(list<list<int>>, int) -> bytes
+    """
+    rows = len(all_truth)
+    size = (rows + 7) // 8
+    packed = b''
+    for k in range(m):
+        # Build the column as a binary string, last row first, so that row i
+        # ends up as bit i of the integer.
+        bits = ''.join(str(all_truth[i][k]) for i in range(rows - 1, -1, -1))
+        packed += int(bits or '0', 2).to_bytes(size, 'little')
+    return packed
+
+
+def unpack_columns(packed, rows, m):
+    """Reverses pack_columns(), returning the rows of truth values.
+
+    unpack_columns(bytes, int, int) -> list<list<int>>
+    """
+    size = (rows + 7) // 8
+    columns = []
+    for k in range(m):
+        column = int.from_bytes(packed[k * size:(k + 1) * size], 'little')
+        # Reverse the binary string so that character i is row i.
+        columns.append(format(column, '0%db' % rows)[::-1])
+    return [[int(c[i]) for c in columns] for i in range(rows)]
+
+
+class CacheEntry(object):
+    """A result read back from the persistent cache.
+    """
+
+    def __init__(self, symbols, valid, counter_rows, columns):
+        """
+        Constructor
+
+        __init__(list<str>, bool or NoneType, list<int>, bytes or NoneType)
+        """
+        self.symbols = symbols
+        self.valid = valid
+        # Counter examples are stored as row numbers of the truth table.
+        self.counter_rows = counter_rows
+        # Packed truth columns, or None if they were not stored.
+        self.columns = columns
+
+
+class PersistentCache(object):
+    """Stores evaluation results in an SQLite database so they survive
+    between sessions, and can be shared by several processes, and several
+    threads of each, at once.
+
+    Entries are keyed by the canonical text of the argument and the engine
+    version, so results from an older engine are never returned. Once the
+    stored results exceed max_bytes, the least recently used are evicted.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        """
+        Constructor
+
+        __init__(str, int)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        # Connections can't be shared across processes or threads, so each
+        # thread opens its own on first use.
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Connections stay behind when the cache is sent to another
+        # process.
+        return {'path': self.path, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_bytes'])
+
+    def connection(self):
+        """Returns this thread's connection to the database, creating the
+        database if necessary.
+
+        connection() -> sqlite3.Connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=TIMEOUT,
+                                   isolation_level=None)
+            # Write-ahead logging lets readers carry on while another
+            # process writes.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "key TEXT NOT NULL, "
+                         "version INTEGER NOT NULL, "
+                         "symbols TEXT NOT NULL, "
+                         "valid INTEGER, "
+                         "counter_rows TEXT NOT NULL, "
+                         "columns BLOB, "
+                         "size INTEGER NOT NULL, "
+                         "accessed REAL NOT NULL, "
+                         "PRIMARY KEY (key, version))")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed "
+                         "ON results (accessed)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, version):
+        """Returns the entry stored for key by the given engine version, or
+        None if there is none.
+
+        get(str, int) -> CacheEntry or NoneType
+        """
+        conn = self.connection()
+        row = conn.execute("SELECT symbols, valid, counter_rows, columns "
+                           "FROM results WHERE key = ? AND version = ?",
+                           (key, version)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE results SET accessed = ? "
+                     "WHERE key = ? AND version = ?",
+                     (time.time(), key, version))
+        valid = None if row[1] is None else bool(row[1])
+        return CacheEntry(json.loads(row[0]), valid, json.loads(row[2]),
+                          row[3])
+
+    def put(self, key, version, symbols, valid, counter_rows, columns=None):
+        """Stores a result, replacing any existing entry for key, then
+        evicts the least recently used entries if the cache is too big.
+
+        put(str, int, list<str>, bool or NoneType, list<int>,
+            bytes or NoneType) -> NoneType
+        """
+        symbols = json.dumps(symbols)
+        counter_rows = json.dumps(counter_rows)
+        size = len(key) + len(symbols) + len(counter_rows) + \
+            (len(columns) if columns else 0)
+        valid = None if valid is None else int(valid)
+        conn = self.connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so the size check
+        # below sees a consistent picture even with other writers about.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO results VALUES "
+                         "(?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, version, symbols, valid, counter_rows,
+                          columns, size, time.time()))
+            total = conn.execute("SELECT SUM(size) FROM results"
+                                 ).fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total - self.max_bytes)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _evict(conn, excess):
+        """Deletes the least recently used entries until at least excess
+        bytes have been freed.
+
+        _evict(sqlite3.Connection, int) -> NoneType
+        """
+        freed = 0
+        doomed = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM results "
+                                        "ORDER BY accessed"):
+            if freed >= excess:
+                break
+            doomed.append((rowid,))
+            freed += size
+        conn.executemany("DELETE FROM results WHERE rowid = ?", doomed)
+
+    def clear(self):
+        """Removes every entry from the cache.
+        """
+        self.connection().execute("DELETE FROM results")
+
+    def close(self):
+        """Closes this thread's connection to the database.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
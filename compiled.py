@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+"""
+compiled.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from functools import lru_cache
+
+from proparg import PropArg
+from budget import Undecided
+
+# Number of arguments compile_argument() keeps compiled in each process.
+COMPILED_ARGUMENTS = 64
+
+
+class ArgumentResult(object):
+    """The results of one query of a CompiledArgument. Every query makes a
+    new one, which nothing else refers to, so it can be kept or changed
+    freely.
+    """
+
+    def __init__(self, argument, assumptions, symbols, valid,
+                 counter_examples, models, rows, table_data, output):
+        """
+        Constructor
+
+        __init__(tuple<str>, dict, list<str>, bool, list<dict>, int, int,
+                 list, str or Undecided)
+        """
+        self.argument = argument
+        # Truth values assumed for some symbols, and the number of rows of
+        # the truth table where they hold.
+        self.assumptions = assumptions
+        self.rows = rows
+        self.symbols = symbols
+        # None unless the expressions were checked as an argument.
+        self.valid = valid
+        self.counter_examples = counter_examples
+        # None if the models weren't counted.
+        self.models = models
+        # As from PropArg.get_table_data(), or None if no table was asked
+        # for.
+        self.table_data = table_data
+        # The message from PropArg.evaluate(), if any. An Undecided object
+        # if the budget ran out.
+        self.output = output
+
+    @property
+    def undecided(self):
+        """Whether the query stopped before it was finished.
+
+        undecided -> bool
+        """
+        return isinstance(self.output, Undecided)
+
+    def __str__(self):
+        return '' if self.output is None else str(self.output)
+
+
+class CompiledArgument(object):
+    """A set of expressions, or an argument, compiled once and then queried
+    any number of times, from any number of threads at once.
+
+    Nothing about it changes after it is made, but for the work kept in
+    _prepared: each query evaluates with a PropArg of its own that shares
+    the compiled expressions, and returns a new ArgumentResult. The only other thing shared is the persistent
+    cache, if one is given, which is safe to use from several threads.
+    """
+
+    def __init__(self, arg, cache=None):
+        """
+        Constructor
+
+        __init__(list<str>, PersistentCache)
+        """
+        # Spaces are not handled, as for PropArg.
+        self.argument = tuple(p.replace(' ', '') for p in arg)
+        self.cache = cache
+        prop_arg = PropArg(list(self.argument))
+        self.symbols = tuple(prop_arg.symbols())
+        # The compiled and simplified expressions, made by the first query
+        # that needs them and then shared by the rest. Only what is used is
+        # made: small arguments may never be compiled at all (see
+        # engines.small()). Two threads may both make the same thing, but
+        # they make it the same way, and storing it in a dictionary is
+        # atomic.
+        self._prepared = prop_arg._prepared
+
+    def prop_arg(self):
+        """Returns a new PropArg for the expressions, sharing the compiled
+        and simplified expressions.
+
+        prop_arg() -> PropArg
+        """
+        return PropArg(list(self.argument), self._prepared)
+
+    def query(self, test=True, table=False, assumptions=None, budget=None,
+              engine=None, falsify=0):
+        """Evaluates the expressions as PropArg.evaluate() would, checking
+        them as an argument if test == True, and returns the results. The
+        models are counted if neither the verdict nor the table is asked
+        for. Raises ValueError if an assumption is invalid (see
+        PropArg.assume()) or the expressions can't be evaluated.
+
+        query(bool, bool, dict, Budget, str, int) -> ArgumentResult
+        """
+        prop_arg = self.prop_arg()
+        output = prop_arg.evaluate(test, self.cache, falsify, budget, table,
+                                   engine, assumptions)
+        if output == -1:  # Unhandled exception
+            raise ValueError("An unknown error occurred. Check for ambiguity "
+                             "in the expression.")
+        table_data = None
+        if table:
+            # Only the rows evaluated, if the budget ran out.
+            table_data = prop_arg.get_table_data()
+        elif not test and not isinstance(output, Undecided):
+            prop_arg.count_models()
+        return ArgumentResult(self.argument, dict(prop_arg.assumptions),
+                              prop_arg.psyms, prop_arg.valid,
+                              prop_arg.counter_examples, prop_arg.models,
+                              2 ** len(prop_arg.free_symbols()), table_data,
+                              output)
+
+
+@lru_cache(maxsize=COMPILED_ARGUMENTS)
+def compile_argument(arg, cache=None):
+    """Returns the CompiledArgument for arg, a tuple of expressions, making
+    it only if it isn't one of the last COMPILED_ARGUMENTS asked for in this
+    process. Safe to call from several threads.
+
+    compile_argument(tuple<str>, PersistentCache) -> CompiledArgument
+    """
+    return CompiledArgument(arg, cache)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+"""
+cost.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from budget import row_bytes
+from expression import is_symbol
+
+# Ways of producing a truth table, from cheapest to most expensive to set up.
+MATERIALISE = 'materialise'  # Calculate every row up front.
+STREAM = 'stream'            # Calculate rows as they are looked at.
+REFUSE = 'refuse'            # Too big to be worth showing at all.
+
+# Largest tables that are calculated in full, by rows and by memory.
+MATERIALISE_ROWS = 2 ** 16
+MATERIALISE_BYTES = 256 * 1024 ** 2
+# Largest tables that are shown at all. Beyond this, nobody is going to
+# scroll through the rows.
+STREAM_ROWS = 2 ** 24
+# Rough time to produce and display one cell of a full table, in seconds.
+CELL_SECONDS = 2e-6
+
+
+class TableEstimate(object):
+    """The estimated size and cost of the truth table for a set of
+    expressions, and the chosen way of producing it.
+    """
+
+    def __init__(self, symbols, rows, columns, strategy, reason):
+        """
+        Constructor
+
+        __init__(int, int, int, str, str)
+        """
+        self.symbols = symbols
+        self.rows = rows
+        self.columns = columns
+        # Memory needed to hold the whole table, in bytes.
+        self.bytes = rows * row_bytes(columns)
+        # Number of cells, and the time to produce them all.
+        self.cells = rows * columns
+        self.seconds = self.cells * CELL_SECONDS
+        # One of MATERIALISE, STREAM or REFUSE, and why.
+        self.strategy = strategy
+        self.reason = reason
+
+    def __str__(self):
+        return "%d rows x %d columns, about %.1f MB: %s" % \
+               (self.rows, self.columns, self.bytes / 1024 ** 2, self.reason)
+
+
+def estimate_table(arg, budget=None, fixed=0):
+    """Estimates the size of the truth table for the expressions in arg
+    before anything is calculated, and chooses whether to calculate it in
+    full (MATERIALISE), calculate rows as they are needed (STREAM), or not
+    produce it at all (REFUSE).
+
+    If a Budget is given, a table is only materialised if it fits within
+    the budget's row and memory limits. fixed is the number of symbols
+    whose truth values are assumed, which are left out of the rows.
+
+    estimate_table(list<str>, Budget, int) -> TableEstimate
+    """
+    n = len(set(c for p in arg for c in p if is_symbol(c)))
+    rows = 2 ** (n - fixed)
+    columns = n + len(arg)
+    max_rows = MATERIALISE_ROWS
+    max_bytes = MATERIALISE_BYTES
+    if budget is not None:
+        if budget.max_rows is not None:
+            max_rows = min(max_rows, budget.max_rows)
+        if budget.max_bytes is not None:
+            max_bytes = min(max_bytes, budget.max_bytes)
+
+    if rows <= max_rows and rows * row_bytes(columns) <= max_bytes:
+        return TableEstimate(n, rows, columns, MATERIALISE,
+                             "small enough to calculate in full")
+    if rows <= STREAM_ROWS:
+        return TableEstimate(n, rows, columns, STREAM,
+                             "too large to calculate in full, so rows are "
+                             "calculated as they are shown")
+    return TableEstimate(n, rows, columns, REFUSE,
+                         "%d symbols give too many rows to show (the limit "
+                         "is %d symbols)" % (n, STREAM_ROWS.bit_length() - 1))
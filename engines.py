@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+
+"""
+engines.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+from budget import Undecided
+from expression import operators
+
+# What is wanted from an evaluation: whether an argument is valid, the
+# whole truth table, or the number of sets of truth values making every
+# expression true. The same names as the ops of the evaluation server.
+VALIDITY = 'validity'
+TABLE = 'table'
+COUNT = 'count'
+
+# Names of the built-in engines.
+ROWS = 'rows'
+BITS = 'bits'
+SAT = 'sat'
+
+# Choices and timings are logged here at INFO level, e.g. with
+# "logicheck.py --log-engines", so that the estimates below can be tuned
+# against real arguments.
+logger = logging.getLogger('logicheck.engines')
+
+
+# Rough costs in seconds, measured on a typical machine. Compiling the
+# expressions, which both the rows and bits engines do first, costs a little
+# per operator. Going through the truth table a row at a time then costs a
+# fixed amount per row and a little more per operator per row.
+COMPILE_OPERATOR_SECONDS = 2.5e-5
+ROW_SECONDS = 1.5e-5
+ROW_OPERATOR_SECONDS = 4e-8
+# Whole columns as bit-vectors cost very little per operator per row, and are
+# limited by the memory the columns take up: one bit per row for every
+# symbol and operator, as they are all held until the end.
+BIT_SECONDS = 5e-4
+BIT_OPERATOR_SECONDS = 2e-10
+BIT_SYMBOLS = 22
+BIT_MAX_BYTES = 256 * 1024 ** 2
+# The solver has no cost proportional to the truth table, just a guess per
+# operator per symbol, plus a guess at how many models need counting. Each
+# counter example or model found costs about as much as a new search, so it
+# is slow for arguments with very many of them.
+SAT_SECONDS = 1e-3
+SAT_OPERATOR_SECONDS = 5e-6
+SAT_MODEL_SECONDS = 1e-3
+SAT_MODEL_FRACTION = 0.25
+# Choosing an engine, simplifying and compiling the expressions costs
+# about PREPARE_SECONDS before any of the above. Going through the truth
+# table with PropArg.convert() and det() instead costs nothing up front and
+# DET_CHARACTER_SECONDS per character of the expressions per row, which is
+# less for the smallest arguments, e.g. three symbols and a few short
+# expressions, so they skip the rest (see small()).
+PREPARE_SECONDS = 2.5e-4
+DET_CHARACTER_SECONDS = 5e-7
+
+
+def log_to_stderr(level=logging.INFO):
+    """Writes engine choices and timings to stderr. Also given to process
+    pools, with the level of the parent process, so that workers log the
+    same way.
+
+    log_to_stderr(int) -> NoneType
+    """
+    logging.basicConfig(format="%(asctime)s %(process)d %(message)s")
+    logger.setLevel(level)
+
+
+class Engine(object):
+    """A way of evaluating a PropArg. Subclasses give a name, an estimate of
+    the time each query would take, and run the evaluation, with the same
+    results as PropArg.evaluate().
+    """
+
+    name = None
+
+    def cost(self, symbols, size, query, budget=None, rows=None):
+        """Returns the estimated time in seconds to answer query for an
+        argument with the given number of symbols and operators, or None if
+        this engine can't answer it. rows is the number of rows left to
+        evaluate one at a time once rows alike by symmetry are collapsed
+        (see PropArg.symmetry()), or None if there is no such symmetry.
+
+        cost(int, int, str, Budget, int) -> float or NoneType
+        """
+        raise NotImplementedError
+
+    def run(self, prop_arg, test, table, cache, budget):
+        """Evaluates prop_arg, taking the arguments of PropArg.evaluate(),
+        and returns what it would return.
+
+        run(PropArg, bool, bool, PersistentCache, Budget)
+            -> NoneType or str or Undecided
+        """
+        raise NotImplementedError
+
+
+class RowEngine(Engine):
+    """Goes through the truth table a row at a time, with the expressions
+    compiled (see PropArg.evaluate()). The only engine that makes a full
+    truth table, and the only one that can stop part way through for a
+    row or memory limit.
+    """
+
+    name = ROWS
+
+    def cost(self, symbols, size, query, budget=None, rows=None):
+        if rows is None or query == TABLE:
+            rows = 2 ** symbols
+        return size * COMPILE_OPERATOR_SECONDS + \
+            rows * (ROW_SECONDS + size * ROW_OPERATOR_SECONDS)
+
+    def run(self, prop_arg, test, table, cache, budget):
+        return prop_arg.evaluate(test, cache, budget=budget, table=table,
+                                 engine=ROWS)
+
+
+class BitEngine(Engine):
+    """Evaluates each expression over the whole truth table at once, as
+    columns of bits (see PropArg.evaluate_columns()). Can only stop part
+    way through for a deadline, and isn't chosen if it is expected to miss
+    one.
+    """
+
+    name = BITS
+
+    def cost(self, symbols, size, query, budget=None, rows=None):
+        if query == TABLE or symbols > BIT_SYMBOLS:
+            return None
+        max_bytes = BIT_MAX_BYTES
+        if budget is not None:
+            if budget.max_rows is not None and \
+                    2 ** symbols > budget.max_rows:
+                # It can't stop part way through.
+                return None
+            if budget.max_bytes is not None:
+                max_bytes = min(max_bytes, budget.max_bytes)
+        if 2 ** symbols * (symbols + size) // 8 > max_bytes:
+            return None
+        seconds = BIT_SECONDS + size * COMPILE_OPERATOR_SECONDS + \
+            2 ** symbols * size * BIT_OPERATOR_SECONDS
+        if budget is not None and budget.deadline is not None and \
+                time.monotonic() + seconds > budget.deadline:
+            # Expected to run out of time, with little to show for it.
+            return None
+        return seconds
+
+    def run(self, prop_arg, test, table, cache, budget):
+        output = prop_arg.evaluate_columns(test, budget)
+        # Incomplete results are not stored.
+        if output != -1 and not isinstance(output, Undecided):
+            prop_arg.store(cache, test)
+        return output
+
+
+class SatEngine(Engine):
+    """Finds the counter examples, or the models to count, with the solver
+    in sat.py (see PropArg.solve()).
+    """
+
+    name = SAT
+
+    def cost(self, symbols, size, query, budget=None, rows=None):
+        if query == TABLE:
+            return None
+        seconds = SAT_SECONDS + size * symbols * SAT_OPERATOR_SECONDS
+        if query == COUNT:
+            # Each model is found and blocked in turn.
+            seconds += 2 ** symbols * SAT_MODEL_FRACTION * SAT_MODEL_SECONDS
+        return seconds
+
+    def run(self, prop_arg, test, table, cache, budget):
+        output = prop_arg.solve(test, budget=budget)
+        # Incomplete results are not stored.
+        if output != -1 and not isinstance(output, Undecided):
+            prop_arg.store(cache, test)
+        return output
+
+
+# Engines to choose from, by name.
+ENGINES = OrderedDict()
+
+
+def register(engine):
+    """Adds an engine to choose from, replacing any with the same name.
+
+    register(Engine) -> NoneType
+    """
+    ENGINES[engine.name] = engine
+
+
+for _engine in (RowEngine(), BitEngine(), SatEngine()):
+    register(_engine)
+
+
+def small(arg, rows):
+    """Returns True if going through rows rows of the truth table of arg,
+    a list of expressions, with PropArg.convert() and det() is estimated to
+    take less time than choosing an engine and preparing the expressions
+    for it. Only counts characters, so is quick enough to ask first.
+
+    small(list<str>, int) -> bool
+    """
+    return rows * sum(len(p) for p in arg) * DET_CHARACTER_SECONDS < \
+        PREPARE_SECONDS
+
+
+def query_of(test, table):
+    """Returns the query answered by PropArg.evaluate(test, table=table).
+
+    query_of(bool, bool) -> str
+    """
+    if table:
+        return TABLE
+    return VALIDITY if test else COUNT
+
+
+def measure(prop_arg, query, budget=None, rows=True):
+    """Returns the number of symbols in prop_arg's expressions whose truth
+    values aren't assumed (see PropArg.assume()), the number of operators
+    left once they are simplified (see PropArg.simplify()), and the number
+    of rows left by symmetry for query (see Engine.cost()). The symmetry is
+    only looked for if rows == True and it could change which engine is
+    cheapest under the budget (see symmetry_matters()); otherwise the rows
+    are None.
+
+    measure(PropArg, str, Budget, bool) -> tuple<int, int, int>
+    """
+    try:
+        size = prop_arg.simplify().after
+    except ValueError:
+        # Left to the engine to report.
+        size = sum(p.count(op) for p in prop_arg._arg for op in operators)
+    symbols = len(prop_arg.free_symbols())
+    orbits = None
+    if rows and symmetry_matters(symbols, size, query, budget):
+        symmetry = prop_arg.symmetry(query == VALIDITY)
+        if symmetry is not None:
+            orbits = symmetry.orbits()
+    return symbols, size, orbits
+
+
+def estimates(symbols, size, query, budget=None, rows=None):
+    """Returns the estimated cost of every engine that can answer query, as
+    (seconds, engine) pairs, cheapest first. Ties go to the engine
+    registered first.
+
+    estimates(int, int, str, Budget, int) -> list<tuple<float, Engine>>
+    """
+    costs = [(engine.cost(symbols, size, query, budget, rows), engine)
+             for engine in ENGINES.values()]
+    return sorted([(seconds, engine) for seconds, engine in costs
+                   if seconds is not None], key=lambda c: c[0])
+
+
+def symmetry_matters(symbols, size, query, budget=None):
+    """Returns True if collapsing the rows that are alike by symmetry (see
+    PropArg.symmetry()) could change which engine is cheapest for query, so
+    that it is worth looking for. At best every symbol is interchangeable,
+    leaving symbols + 1 rows; if the same engine is cheapest then as with
+    no symmetry at all, it is cheapest whatever the symmetry.
+
+    symmetry_matters(int, int, str, Budget) -> bool
+    """
+    if query == TABLE:
+        return False
+    best = estimates(symbols, size, query, budget, symbols + 1)
+    worst = estimates(symbols, size, query, budget)
+    return bool(best) and bool(worst) and best[0][1] is not worst[0][1]
+
+
+def choose(prop_arg, query, name=None, budget=None):
+    """Returns the engine to answer query for prop_arg: the one named, if a
+    name is given, otherwise the one with the lowest estimated cost. Raises
+    ValueError if the named engine doesn't exist or can't answer query.
+
+    choose(PropArg, str, str, Budget) -> Engine
+    """
+    if name is not None:
+        if name not in ENGINES:
+            raise ValueError("Unknown engine: " + str(name))
+        # Whether an engine can answer doesn't depend on the symmetry.
+        symbols, size, rows = measure(prop_arg, query, rows=False)
+        engine = ENGINES[name]
+        if engine.cost(symbols, size, query, budget, rows) is None:
+            raise ValueError("The %s engine can't answer a %s query" %
+                             (name, query))
+        logger.info("%s: %s engine chosen by caller, %d symbols, "
+                    "%d operators", query, name, symbols, size)
+        return engine
+    symbols, size, rows = measure(prop_arg, query, budget)
+    costs = estimates(symbols, size, query, budget, rows)
+    seconds, engine = costs[0]
+    logger.info("%s: %s engine chosen for %d symbols, %d operators "
+                "(estimates: %s)", query, engine.name, symbols, size,
+                ', '.join('%s %.3gs' % (e.name, s) for s, e in costs))
+    return engine
+
+
+def preferred(prop_arg, query, name, budget=None):
+    """Returns name if the engine of that name can answer query for
+    prop_arg, otherwise None, so that one is chosen automatically. For an
+    engine preferred for a whole session, e.g. in the GUI, which shouldn't
+    stop anything it can't do from being done some other way.
+
+    preferred(PropArg, str, str, Budget) -> str or NoneType
+    """
+    if name not in ENGINES:
+        return None
+    symbols, size, rows = measure(prop_arg, query, rows=False)
+    if ENGINES[name].cost(symbols, size, query, budget, rows) is None:
+        return None
+    return name
+
+
+def run(prop_arg, test=True, table=None, cache=None, budget=None,
+        name=None):
+    """Evaluates prop_arg with the engine chosen by choose(), logging how
+    long it took. Takes the arguments of PropArg.evaluate(), plus the name
+    of an engine to use, and returns what it would return.
+
+    run(PropArg, bool, bool, PersistentCache, Budget, str)
+        -> NoneType or str or Undecided
+    """
+    query = query_of(test, table)
+    engine = choose(prop_arg, query, name, budget)
+    start = time.perf_counter()
+    output = engine.run(prop_arg, test, table, cache, budget)
+    logger.info("%s: %s engine took %.3fs", query, engine.name,
+                time.perf_counter() - start)
+    return output
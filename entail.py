@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+"""
+entail.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from itertools import islice
+
+from expression import compile_expressions, is_symbol, symbol_bits
+from sat import encode
+
+# Largest number of symbols for which the sets of truth values that make
+# every premise true are kept as a bitset, one bit per row of the truth
+# table (2**22 bits is 512 KB). Beyond this, queries go to the solver.
+BITSET_SYMBOLS = 22
+
+
+class EntailmentResult(object):
+    """Whether a conclusion follows from the premises of an Entailment, with
+    the counter examples if it doesn't.
+    """
+
+    def __init__(self, conclusion, valid, symbols, counter_examples):
+        """
+        Constructor
+
+        __init__(str, bool, list<str>, list<dict>)
+        """
+        self.conclusion = conclusion
+        self.valid = valid
+        self.symbols = symbols
+        # Sets of truth values, in truth table order, that make every
+        # premise true and the conclusion false.
+        self.counter_examples = counter_examples
+
+    def __str__(self):
+        # Same form as PropArg.message().
+        if self.valid:
+            return '\nThe argument is valid.\n'
+        output = '\nThe argument is invalid. Counter examples:\n'
+        for v in self.counter_examples:
+            output += '\n'
+            for k in self.symbols:
+                output += str(k) + ' = ' + str(v[k]) + '  '
+            output += '\n'
+        output += '\n'
+        return output
+
+
+class Entailment(object):
+    """A fixed set of premises, evaluated once, against which any number of
+    conclusions can be checked.
+
+    With at most BITSET_SYMBOLS symbols, the sets of truth values that make
+    every premise true are kept as a bitset over the whole truth table, so
+    checking a conclusion only means evaluating the conclusion. Conclusions
+    with symbols the premises don't have get those as extra, high bits. With
+    more symbols, the premises are encoded once for the solver in sat.py,
+    and each conclusion is added to it for its own query and then taken
+    out again.
+    """
+
+    def __init__(self, premises):
+        """
+        Constructor
+
+        Raises ValueError if a premise can't be parsed (see
+        expression.parse()).
+
+        __init__(list<str>)
+        """
+        # Spaces are not handled, as for PropArg.
+        self.premises = [p.replace(' ', '') for p in premises]
+        self.symbols = self.symbols_of(self.premises)
+        n = len(self.symbols)
+        self._solver = None
+        self._columns = None
+        self.models = None
+        if n <= BITSET_SYMBOLS:
+            rows = 2 ** n
+            mask = (1 << rows) - 1
+            # Truth values of each symbol over the whole table.
+            self._columns = [symbol_bits(n, j, 0, rows) for j in range(n)]
+            compiled = compile_expressions(self.premises, self.symbols)
+            # Rows where every premise is true.
+            self.models = mask
+            for column in compiled(self._columns, mask):
+                self.models &= column
+        else:
+            # Check the premises parse, as for the bitset.
+            self.solver()
+
+    @staticmethod
+    def symbols_of(expressions):
+        """Returns the unique symbols in expressions, in the order they
+        first occur. Raises ValueError for '0' or '1', which det() can't
+        tell apart from truth values.
+
+        symbols_of(list<str>) -> list<str>
+        """
+        # Dictionary keys keep the order they were added in.
+        symbols = list(dict.fromkeys(c for p in expressions for c in p
+                                     if is_symbol(c)))
+        if '0' in symbols or '1' in symbols:
+            raise ValueError("0 and 1 can't be used as symbols")
+        return symbols
+
+    def solver(self):
+        """Returns the solver holding the premises, all of which must be
+        true, creating it on first use.
+
+        solver() -> sat.Solver
+        """
+        if self._solver is None:
+            solver, roots = encode(self.premises, self.symbols)
+            for root in roots:
+                solver.add_clause([root])
+            self._solver = solver
+        return self._solver
+
+    def consistent(self):
+        """Returns True if some set of truth values makes every premise
+        true.
+
+        consistent() -> bool
+        """
+        if self.models is not None:
+            return self.models != 0
+        return self.solver().solve() is not None
+
+    def query(self, conclusion, limit=None):
+        """Checks whether conclusion follows from the premises. At most
+        limit counter examples are found, if limit is given; the verdict
+        is exact either way. Raises ValueError if the conclusion can't be
+        parsed.
+
+        query(str, int) -> EntailmentResult
+        """
+        conclusion = conclusion.replace(' ', '')
+        new = [c for c in self.symbols_of([conclusion])
+               if c not in self.symbols]
+        if self.models is None or \
+                len(self.symbols) + len(new) > BITSET_SYMBOLS:
+            return self.query_solver(conclusion, new, limit)
+        if not new:
+            column = compile_expressions([conclusion], self.symbols)(
+                self._columns, (1 << 2 ** len(self.symbols)) - 1)[0]
+            return self.result(conclusion, new, self.models & ~column, limit)
+        return self.query_new(conclusion, new, limit)
+
+    def query_all(self, conclusions, limit=None):
+        """Checks many conclusions at once, returning a result for each, in
+        order, as for query(). Conclusions using only the premises' symbols
+        are compiled together and evaluated in one pass over the table.
+
+        query_all(list<str>, int) -> list<EntailmentResult>
+        """
+        conclusions = [c.replace(' ', '') for c in conclusions]
+        results = [None] * len(conclusions)
+        known = set(self.symbols)
+        batch = []
+        if self.models is not None:
+            batch = [k for k, c in enumerate(conclusions)
+                     if set(self.symbols_of([c])) <= known]
+        if batch:
+            mask = (1 << 2 ** len(self.symbols)) - 1
+            compiled = compile_expressions([conclusions[k] for k in batch],
+                                           self.symbols)
+            for k, column in zip(batch, compiled(self._columns, mask)):
+                results[k] = self.result(conclusions[k], [],
+                                         self.models & ~column, limit)
+        for k, conclusion in enumerate(conclusions):
+            if results[k] is None:
+                results[k] = self.query(conclusion, limit)
+        return results
+
+    def query_new(self, conclusion, new, limit):
+        """Checks a conclusion with symbols the premises don't have. The new
+        symbols become the high bits of the row number, so the premises'
+        bitset just repeats for every set of their truth values.
+
+        query_new(str, list<str>, int) -> EntailmentResult
+        """
+        n = len(self.symbols)
+        total = n + len(new)
+        rows = 2 ** total
+        mask = (1 << rows) - 1
+        # With the new symbols first, symbol_bits() gives them the high
+        # bits and the premises' symbols the same bits as before.
+        columns = [symbol_bits(total, j, 0, rows) for j in range(total)]
+        column = compile_expressions([conclusion], new + self.symbols)(
+            columns, mask)[0]
+        models = self.models
+        length = 2 ** n
+        while length < rows:
+            models |= models << length
+            length *= 2
+        return self.result(conclusion, new, models & ~column, limit)
+
+    def result(self, conclusion, new, bad, limit):
+        """Makes the result for a conclusion from the bitset of its counter
+        examples, in which the premises' symbols are the low bits of the row
+        number and any new symbols the high bits.
+
+        result(str, list<str>, int, int) -> EntailmentResult
+        """
+        n = len(self.symbols)
+        k = len(new)
+        found = []
+        while bad and (limit is None or len(found) < limit):
+            # Take the lowest set bit.
+            low = bad & -bad
+            found.append(low.bit_length() - 1)
+            bad ^= low
+        examples = []
+        for row in found:
+            old, extra = row & ((1 << n) - 1), row >> n
+            vals = {c: (old >> (n - 1 - j)) & 1
+                    for j, c in enumerate(self.symbols)}
+            vals.update({c: (extra >> (k - 1 - j)) & 1
+                         for j, c in enumerate(new)})
+            # In the truth table of the whole argument, the premises'
+            # symbols come first.
+            examples.append(((old << k) | extra, vals))
+        examples.sort(key=lambda e: e[0])
+        return EntailmentResult(conclusion, not found, self.symbols + new,
+                                [vals for _, vals in examples])
+
+    def query_solver(self, conclusion, new, limit):
+        """Checks a conclusion with the solver, assuming it is false. The
+        conclusion, any new symbols and the clauses blocking each counter
+        example found are only added for this query: the solver is rolled
+        back to just the premises afterwards, so it doesn't grow however
+        many conclusions are checked.
+
+        query_solver(str, list<str>, int) -> EntailmentResult
+        """
+        solver = self.solver()
+        checkpoint = solver.checkpoint()
+        try:
+            symbols = self.symbols + new
+            _, roots = encode([conclusion], symbols, solver)
+            variables = [solver.symbol_variables[c] for c in symbols]
+            found = []
+
+            def solutions():
+                while True:
+                    model = solver.solve([-roots[0]])
+                    if model is None:
+                        return
+                    values = tuple(model[v] for v in variables)
+                    yield values
+                    solver.add_clause([-v if x else v
+                                       for v, x in zip(variables, values)])
+
+            for values in islice(solutions(), limit):
+                found.append(values)
+        finally:
+            solver.rollback(checkpoint)
+        found.sort()
+        return EntailmentResult(conclusion, not found, symbols,
+                                [dict(zip(symbols, v)) for v in found])
@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+
+"""
+expression.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Unicode for logical operators - "operators" currently used.
+operators1 = [u'\u00ac', u'\u2227', u'\u2228', u'\u2262', u'\u2261', u'\u2283']
+operators = [u'\u00ac', u'\u2227', u'\u2228', u'\u2a01', u'\u21d4', u'\u21d2']
+# html (prefix "&#", postfix ";"): 172, 8743, 8744, 10753, 8660, 8658.
+NOT, AND, OR, XOR, IFF, IF = operators
+
+# Node kind for a proposition symbol in a parsed expression. All other nodes
+# are identified by their operator.
+SYMBOL = 's'
+
+
+# Check if a string character is a letter or a number,
+# i.e. a valid symbol, not a logical operator.
+def is_symbol(c):
+    """Returns True if a string character is a letter or a number, i.e. a
+    valid symbol, not a logical operator; otherwise False.
+
+    is_symbol(str) -> bool
+    Precondition: len(c) == 1
+    """
+    if c.isalpha() or c.isdigit():
+        return True
+    else:
+        return False
+
+
+def parse(premise):
+    """Parses a logical expression into a list of nodes, in which every
+    node comes after the nodes it uses. The last node is the whole
+    expression. Each node is a tuple, one of
+
+        (SYMBOL, symbol)
+        (NOT, operand)
+        (operator, left operand, right operand)
+
+    where the operands are indices of earlier nodes. Identical
+    sub-expressions share a node.
+
+    The expression must have the structure accepted by PropArg.det(): at
+    most one operator per bracket level. Raises ValueError otherwise.
+
+    parse(str) -> list<tuple>
+    """
+
+    nodes = []
+    # Index of each distinct node, so that repeats can be shared.
+    index = {}
+
+    def add(node):
+        if node not in index:
+            index[node] = len(nodes)
+            nodes.append(node)
+        return index[node]
+
+    def reduce(items):
+        # Combine the contents of one bracket level into a single node.
+        if len(items) == 1 and isinstance(items[0], int):
+            return items[0]
+        if len(items) == 2 and items[0] == NOT and \
+                isinstance(items[1], int):
+            return add((NOT, items[1]))
+        if len(items) == 3 and isinstance(items[0], int) and \
+                isinstance(items[2], int) and items[1] in operators[1:]:
+            return add((items[1], items[0], items[2]))
+        raise ValueError("Invalid expression: " + premise)
+
+    # An explicit stack of bracket levels, each a list of operand node
+    # indices and operator characters.
+    stack = [[]]
+    for c in premise:
+        if c == '(':
+            stack.append([])
+        elif c == ')':
+            if len(stack) == 1:
+                raise ValueError("Brackets do not close: " + premise)
+            items = stack.pop()
+            stack[-1].append(reduce(items))
+        elif c in operators:
+            stack[-1].append(c)
+        elif is_symbol(c):
+            stack[-1].append(add((SYMBOL, c)))
+        elif not c.isspace():
+            raise ValueError("Invalid character: " + c)
+    if len(stack) != 1:
+        raise ValueError("Brackets do not close: " + premise)
+    root = reduce(stack[0])
+    if root != len(nodes) - 1:
+        # The whole expression is a repeat of one of its parts. Any later
+        # nodes can't be part of it.
+        nodes = nodes[:root + 1]
+    return nodes
+
+
+def render(nodes, i, top=True):
+    """Writes node i of a parsed expression (see parse()) back out as an
+    expression, with every operator in brackets except, if top == True, the
+    outermost. Uses a stack of its own rather than recursion, so it works
+    however deeply the expression is nested.
+
+    render(list<tuple>, int, bool) -> str
+    """
+    pieces = []
+    # Text still to write, last first: either a string or a (node, top)
+    # pair still to be written out.
+    stack = [(i, top)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+            continue
+        node = nodes[item[0]]
+        if node[0] == SYMBOL:
+            pieces.append(node[1])
+        elif node[0] == NOT:
+            pieces.append('(' + NOT)
+            stack.extend([')', (node[1], False)])
+        else:
+            if not item[1]:
+                pieces.append('(')
+                stack.append(')')
+            stack.extend([(node[2], False), node[0], (node[1], False)])
+    return ''.join(pieces)
+
+
+def evaluate_bits(nodes, values, mask):
+    """Evaluates a parsed expression for many sets of truth values at once.
+    Each symbol's value in values is an integer holding one truth value per
+    bit; mask has a 1 for every bit in use. Returns the truth values of the
+    expression in the same form.
+
+    evaluate_bits(list<tuple>, dict<str, int>, int) -> int
+    """
+    results = []
+    for node in nodes:
+        op = node[0]
+        if op == SYMBOL:
+            v = values[node[1]]
+        elif op == NOT:
+            v = mask ^ results[node[1]]
+        else:
+            p = results[node[1]]
+            q = results[node[2]]
+            if op == AND:
+                v = p & q
+            elif op == OR:
+                v = p | q
+            elif op == XOR:
+                v = p ^ q
+            elif op == IFF:
+                v = mask ^ (p ^ q)
+            else:  # IF
+                v = (mask ^ p) | q
+        results.append(v)
+    return results[-1]
+
+
+def symbol_bits(n, j, start, width):
+    """Returns the truth values of the j'th of n symbols for rows start to
+    start + width - 1 of a truth table, one per bit as for evaluate_bits().
+    Rows are in the order used by PropArg.evaluate(): row r gives symbol j
+    the value of bit n-1-j of r, so the first symbol changes slowest.
+
+    symbol_bits(int, int, int, int) -> int
+    """
+    half = 1 << (n - 1 - j)
+    if half < 64 or 2 * half <= width:
+        # Short runs of 0's then 1's, or many of them: build one period and
+        # double it up.
+        period = 2 * half
+        offset = start % period
+        total = offset + width
+        bits = ((1 << half) - 1) << half
+        length = period
+        while length < total:
+            bits |= bits << length
+            length *= 2
+        return (bits >> offset) & ((1 << width) - 1)
+    # Long runs: fill in each run of 1's directly.
+    bits = 0
+    k = 0
+    while k < width:
+        pos = start + k
+        end = min(width, (pos // half + 1) * half - start)
+        if (pos // half) & 1:
+            bits |= ((1 << (end - k)) - 1) << k
+        k = end
+    return bits
+
+
+def assumed_bits(symbols, assumptions, start, width):
+    """Returns the truth values of each of symbols for rows start to
+    start + width - 1 of the part of a truth table where the symbols in
+    assumptions have the truth values given there. Those symbols are the
+    same in every row, and the rest take turns as for symbol_bits().
+
+    assumed_bits(list<str>, dict, int, int) -> list<int>
+    """
+    n = len(symbols) - len(assumptions)
+    mask = (1 << width) - 1
+    columns = []
+    j = 0
+    for c in symbols:
+        if c in assumptions:
+            columns.append(mask if assumptions[c] else 0)
+        else:
+            columns.append(symbol_bits(n, j, start, width))
+            j += 1
+    return columns
+
+
+# Python code for each operator in a compiled expression, given the names of
+# its operands. m is the mask, as for evaluate_bits().
+TEMPLATES = {NOT: 'm ^ %s',
+             AND: '%s & %s',
+             OR: '%s | %s',
+             XOR: '%s ^ %s',
+             IFF: 'm ^ %s ^ %s',
+             IF: '(m ^ %s) | %s'}
+
+# Largest number of symbols of a sub-expression replaced by a lookup table
+# when compiling with cuts (see cut_tables()). Its table has 2**4 entries.
+CUT_SYMBOLS = 4
+# Fewest operators a sub-expression must have to be worth replacing by a
+# lookup table: looking up a table costs one step per symbol.
+CUT_OPERATORS = 3
+
+
+def compile_expressions(premises, symbols, cuts=False):
+    """Compiles logical expressions into a single Python function, so that
+    they can be evaluated without parsing or walking them again. The
+    function is called as
+
+        evaluate(values, mask=1) -> tuple<int>
+
+    where values is a sequence holding the value of each symbol, in the
+    order of symbols, and the result holds the value of each expression.
+    With the default mask, values are 0's and 1's; as for evaluate_bits(),
+    they can also be integers holding one truth value per bit, with mask
+    having a 1 for every bit in use. Sub-expressions shared between the
+    expressions are only evaluated once.
+
+    If cuts == True, sub-expressions of up to CUT_SYMBOLS symbols are
+    looked up in tables worked out beforehand (see cut_tables()), and the
+    function only takes 0's and 1's: it is called as evaluate(values).
+
+    An expression may also be given as 0 or 1, for one that is always false
+    or always true, as simplify.simplify_argument() gives them.
+
+    Raises ValueError if an expression can't be parsed (see parse()) or
+    uses a symbol not in symbols.
+
+    compile_expressions(list<str or int>, list<str>, bool) -> function
+    """
+    position = {c: k for k, c in enumerate(symbols)}
+    # Distinct nodes of all the expressions, in the form given by parse(),
+    # and the index of each.
+    graph = []
+    index = {}
+    roots = []
+    # Code for the value of each expression.
+    results = []
+    for premise in premises:
+        if premise in (0, 1):
+            results.append('m' if premise else '0')
+            continue
+        # Indices in graph of the nodes of this expression.
+        local = []
+        for node in parse(premise):
+            if node[0] == SYMBOL:
+                if node[1] not in position:
+                    raise ValueError("Unknown symbol: " + node[1])
+                key = node
+            else:
+                key = (node[0],) + tuple(local[k] for k in node[1:])
+            if key not in index:
+                index[key] = len(graph)
+                graph.append(key)
+            local.append(index[key])
+        roots.append(local[-1])
+        results.append('n%d' % local[-1])
+
+    tables = cut_tables(graph, roots) if cuts else {}
+    # Nodes whose values are needed: the expressions and, working back
+    # from them, the operands of each node that isn't looked up.
+    needed = [not cuts] * len(graph)
+    for k in roots:
+        needed[k] = True
+    for k in range(len(graph) - 1, -1, -1):
+        if not needed[k] or not cuts:
+            continue
+        if k in tables:
+            operands = tables[k][0]
+        else:
+            operands = graph[k][1:] if graph[k][0] != SYMBOL else ()
+        for j in operands:
+            needed[j] = True
+
+    lines = []
+    for k, node in enumerate(graph):
+        if not needed[k]:
+            continue
+        if k in tables:
+            # E.g. ((0, 1), (1, 1))[n0][n2] for n0 | n2.
+            support, table = tables[k]
+            code = repr(table) + ''.join('[n%d]' % j for j in support)
+        elif node[0] == SYMBOL:
+            code = 'v[%d]' % position[node[1]]
+        else:
+            code = TEMPLATES[node[0]] % tuple('n%d' % j for j in node[1:])
+        lines.append('    n%d = %s\n' % (k, code))
+    if cuts:
+        # The tables only hold 0's and 1's.
+        header = 'def evaluate(v):\n    m = 1\n'
+    else:
+        header = 'def evaluate(v, m=1):\n'
+    source = header + ''.join(lines) + \
+        '    return (%s)\n' % ''.join(r + ', ' for r in results)
+    namespace = {}
+    exec(compile(source, '<expressions>', 'exec'), namespace)
+    return namespace['evaluate']
+
+
+def cut_tables(graph, roots):
+    """Finds the sub-expressions to look up in tables when compiling with
+    cuts, and works out their tables. graph holds the distinct nodes of the
+    expressions, as for parse() but shared between them, and roots the node
+    of each expression.
+
+    A node is looked up if it depends on no more than CUT_SYMBOLS symbols,
+    has at least CUT_OPERATORS operators, and isn't itself part of a larger
+    such node, unless something else also needs its value. Its table is
+    worked out with the operators of evaluate_bits(), as for every other
+    way of evaluating expressions.
+
+    Returns, by node index, the indices of the symbol nodes the node
+    depends on, in order, and its table: a tuple nested one level per
+    symbol, indexed by their truth values in the same order.
+
+    cut_tables(list<tuple>, list<int>) -> dict<int, tuple>
+    """
+    # Symbol nodes each node depends on, or None if there are too many,
+    # and the number of operators it has (counting shared ones each time).
+    support = []
+    size = []
+    for node in graph:
+        if node[0] == SYMBOL:
+            support.append(frozenset([len(support)]))
+            size.append(0)
+            continue
+        s = frozenset()
+        for j in node[1:]:
+            if s is not None and support[j] is not None:
+                s = s | support[j]
+            else:
+                s = None
+        if s is not None and len(s) > CUT_SYMBOLS:
+            s = None
+        support.append(s)
+        size.append(1 + sum(size[j] for j in node[1:]))
+
+    def worth(k):
+        return support[k] is not None and size[k] >= CUT_OPERATORS
+
+    # Work back from the expressions, taking the largest nodes worth
+    # looking up and going inside any other node.
+    needed = [False] * len(graph)
+    for k in roots:
+        needed[k] = True
+    cuts = []
+    for k in range(len(graph) - 1, -1, -1):
+        if not needed[k] or graph[k][0] == SYMBOL:
+            continue
+        if worth(k):
+            cuts.append(k)
+        else:
+            for j in graph[k][1:]:
+                needed[j] = True
+
+    tables = {}
+    for k in cuts:
+        symbols = sorted(support[k])
+        n = len(symbols)
+        width = 2 ** n
+        # Nodes this one is made of, in order, with operands renumbered.
+        inside = {k}
+        stack = [k]
+        while stack:
+            for j in graph[stack.pop()][1:]:
+                if graph[j][0] != SYMBOL and j not in inside:
+                    inside.add(j)
+                    stack.append(j)
+        order = symbols + sorted(inside)
+        renumber = {j: i for i, j in enumerate(order)}
+        nodes = [graph[j] if graph[j][0] == SYMBOL else
+                 (graph[j][0],) + tuple(renumber[i] for i in graph[j][1:])
+                 for j in order]
+        values = {graph[j][1]: symbol_bits(n, i, 0, width)
+                  for i, j in enumerate(symbols)}
+        bits = evaluate_bits(nodes, values, (1 << width) - 1)
+        # Row r of the table is bit r, which gives the first symbol the
+        # value of the highest bit of r.
+        table = [(bits >> r) & 1 for r in range(width)]
+        for _ in range(n):
+            table = [tuple(table[i:i + 2]) for i in range(0, len(table), 2)]
+        tables[k] = (tuple(symbols), table[0])
+    return tables
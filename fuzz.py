@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+
+"""
+fuzz.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from cache import pack_columns, unpack_columns
+from engines import BITS, ROWS
+from entail import Entailment
+from expression import NOT, operators, compile_expressions, \
+    evaluate_bits, parse, render, symbol_bits
+from proparg import PropArg
+from simplify import simplify_argument
+from symmetry import Symmetry, SymmetryFinder
+from syntax import find_error
+
+# Symbols used in generated expressions. '0' and '1' are left out, since
+# convert() can't tell them apart from truth values (see its FIXME).
+SYMBOLS = 'ABCDEFGHPQRS23456789'
+# Default limits on the size of generated arguments.
+MAX_SYMBOLS = 6
+MAX_DEPTH = 4
+MAX_EXPRESSIONS = 4
+# Default number of arguments generated by run().
+COUNT = 500
+# Random sets of truth values tried by the falsify engine.
+FALSIFY_SAMPLES = 64
+
+
+class ReferenceArg(PropArg):
+    """A PropArg that always evaluates with convert() and det(), the
+    original evaluator, which every other engine is checked against.
+    """
+
+    def compile(self, cuts=False):
+        return None
+
+
+class Outcome(object):
+    """What an engine found for an argument. Anything an engine doesn't
+    calculate is left as None, and isn't compared.
+    """
+
+    def __init__(self, valid=None, counter_rows=None, columns=None,
+                 model_rows=None):
+        """
+        Constructor
+
+        __init__(bool, list<int>, list<int>, list<int>)
+        """
+        self.valid = valid
+        # Row numbers of the truth table, in order.
+        self.counter_rows = counter_rows
+        self.model_rows = model_rows
+        # One integer per expression, with bit i the value in row i.
+        self.columns = columns
+
+    def differences(self, other):
+        """Returns the names of the results that differ between this
+        outcome and other, where both have them.
+
+        differences(Outcome) -> list<str>
+        """
+        names = []
+        for name in ['valid', 'counter_rows', 'model_rows', 'columns']:
+            mine = getattr(self, name)
+            theirs = getattr(other, name)
+            if mine is not None and theirs is not None and mine != theirs:
+                names.append(name)
+        return names
+
+
+def rows_of(examples, psyms):
+    """Returns the truth table row numbers of sets of truth values.
+
+    rows_of(list<dict>, list<str>) -> list<int>
+    """
+    n = len(psyms)
+    return sorted(sum(int(vals[c]) << (n - 1 - j) for j, c in enumerate(psyms))
+                  for vals in examples)
+
+
+def columns_of(all_truth, m):
+    """Turns rows of truth values, as in PropArg.all_truth, into one integer
+    per expression with bit i the value in row i.
+
+    columns_of(list<list<int>>, int) -> list<int>
+    """
+    return [sum(row[k] << i for i, row in enumerate(all_truth))
+            for k in range(m)]
+
+
+def models_of(columns, rows):
+    """Returns the rows in which every column is true.
+
+    models_of(list<int>, int) -> list<int>
+    """
+    mask = (1 << rows) - 1
+    for c in columns:
+        mask &= c
+    return [i for i in range(rows) if (mask >> i) & 1]
+
+
+def symbol_columns(psyms):
+    """Returns the truth values of each symbol over the whole truth table,
+    one integer per symbol.
+
+    symbol_columns(list<str>) -> list<int>
+    """
+    n = len(psyms)
+    return [symbol_bits(n, j, 0, 2 ** n) for j in range(n)]
+
+
+def outcome_of(prop_arg, arg):
+    """Collects the results of PropArg.evaluate(table=True).
+
+    outcome_of(PropArg, list<str>) -> Outcome
+    """
+    columns = columns_of(prop_arg.all_truth, len(arg))
+    return Outcome(prop_arg.valid, rows_of(prop_arg.counter_examples,
+                                           prop_arg.psyms), columns,
+                   models_of(columns, 2 ** len(prop_arg.psyms)))
+
+
+def reference(arg):
+    """Runs the reference evaluator.
+
+    reference(list<str>) -> Outcome
+    """
+    prop_arg = ReferenceArg(arg)
+    if prop_arg.evaluate(table=True) == -1:
+        raise ValueError("Unhandled exception in det()")
+    return outcome_of(prop_arg, arg)
+
+
+def engine_default(arg):
+    # PropArg.evaluate() as the GUI calls it, with the engine chosen for it,
+    # or with convert() and det() if the argument is small enough.
+    prop_arg = PropArg(arg)
+    if prop_arg.evaluate(table=True) == -1:
+        raise ValueError("Unhandled exception in evaluate()")
+    return outcome_of(prop_arg, arg)
+
+
+def engine_compiled(arg):
+    # PropArg.evaluate() with compiled expressions, one row at a time, with
+    # small sub-expressions looked up in tables.
+    prop_arg = PropArg(arg)
+    if prop_arg.evaluate(table=True, engine=ROWS) == -1:
+        raise ValueError("Unhandled exception in evaluate()")
+    return outcome_of(prop_arg, arg)
+
+
+def engine_bits(arg):
+    # expression.evaluate_bits() over the whole table at once.
+    psyms = PropArg(arg).symbols()
+    values = dict(zip(psyms, symbol_columns(psyms)))
+    mask = (1 << 2 ** len(psyms)) - 1
+    columns = [evaluate_bits(parse(p), values, mask) for p in arg]
+    return Outcome(columns=columns)
+
+
+def engine_compiled_bits(arg):
+    # expression.compile_expressions() on bit-vectors.
+    psyms = PropArg(arg).symbols()
+    mask = (1 << 2 ** len(psyms)) - 1
+    compiled = compile_expressions(arg, psyms)
+    return Outcome(columns=list(compiled(symbol_columns(psyms), mask)))
+
+
+def engine_simplify(arg):
+    # simplify.simplify_argument(), with the simplified expressions
+    # evaluated as for engine_bits().
+    psyms = PropArg(arg).symbols()
+    values = dict(zip(psyms, symbol_columns(psyms)))
+    mask = (1 << 2 ** len(psyms)) - 1
+    columns = []
+    for p in simplify_argument(arg).expressions:
+        if p in (0, 1):
+            columns.append(mask if p else 0)
+        else:
+            columns.append(evaluate_bits(parse(p), values, mask))
+    return Outcome(columns=columns)
+
+
+def engine_symmetry(arg):
+    # One row of each orbit of interchangeable symbols (see symmetry.py),
+    # whatever the number of symbols, with the counter examples and models
+    # found expanded to their whole orbits.
+    prop_arg = PropArg(arg)
+    psyms = prop_arg.symbols()
+    finder = SymmetryFinder(prop_arg.simplify().expressions)
+    symmetry = Symmetry(psyms, finder.classes(psyms))
+    compiled = prop_arg.compile()
+    counter_examples = []
+    models = []
+    for row, size in symmetry.representatives():
+        truth = compiled(row)
+        orbit = [dict(zip(psyms, r)) for r in symmetry.expand(row)]
+        if len(orbit) != size:
+            raise ValueError("Orbit of the wrong size")
+        if all(truth):
+            models.extend(orbit)
+        elif all(truth[:-1]):
+            counter_examples.extend(orbit)
+    return Outcome(not counter_examples, rows_of(counter_examples, psyms),
+                   model_rows=rows_of(models, psyms))
+
+
+def engine_columns(arg):
+    # PropArg.evaluate() with the bits engine: whole columns at a time.
+    prop_arg = PropArg(arg)
+    if prop_arg.evaluate(engine=BITS) == -1:
+        raise ValueError("Unhandled exception in evaluate_columns()")
+    return Outcome(prop_arg.valid, rows_of(prop_arg.counter_examples,
+                                           prop_arg.psyms))
+
+
+def engine_sat(arg):
+    # PropArg.solve(): the verdict and counter examples, then the models.
+    prop_arg = PropArg(arg)
+    prop_arg.solve()
+    outcome = Outcome(prop_arg.valid,
+                      rows_of(prop_arg.counter_examples, prop_arg.psyms))
+    prop_arg.solve(test=False)
+    outcome.model_rows = rows_of([dict(zip(prop_arg.psyms, row))
+                                  for row in prop_arg.found_rows],
+                                 prop_arg.psyms)
+    # The table is the whole truth table, not just the models.
+    outcome.columns = columns_of([[int(v) for v in row[len(prop_arg.psyms):]]
+                                  for row in prop_arg.get_table_data()[1:]],
+                                 len(arg))
+    return outcome
+
+
+def engine_cache(arg):
+    # Truth values packed for the persistent cache and read back.
+    prop_arg = PropArg(arg)
+    prop_arg.evaluate(test=False, table=True)
+    rows = 2 ** len(prop_arg.psyms)
+    packed = pack_columns(prop_arg.all_truth, len(arg))
+    return Outcome(columns=columns_of(unpack_columns(packed, rows, len(arg)),
+                                      len(arg)))
+
+
+def entailment_outcome(result):
+    # Outcome of an EntailmentResult.
+    return Outcome(result.valid, rows_of(result.counter_examples,
+                                         result.symbols))
+
+
+def engine_entail(arg):
+    # Entailment.query_all() with the premises as a bitset.
+    return entailment_outcome(Entailment(arg[:-1]).query_all(arg[-1:])[0])
+
+
+def engine_entail_sat(arg):
+    # Entailment with the premises held by the solver.
+    entailment = Entailment(arg[:-1])
+    new = [c for c in PropArg(arg).symbols() if c not in entailment.symbols]
+    return entailment_outcome(entailment.query_solver(arg[-1], new, None))
+
+
+def engine_assume(arg):
+    # PropArg.evaluate() under each truth value of the first symbol in turn,
+    # with one PropArg, putting the two halves of the table back together.
+    prop_arg = PropArg(arg)
+    valid = True
+    counter_rows = []
+    all_truth = []
+    for v in (0, 1):
+        if prop_arg.evaluate(table=True, engine=ROWS,
+                             assumptions={prop_arg.symbols()[0]: v}) == -1:
+            raise ValueError("Unhandled exception in evaluate()")
+        valid = valid and prop_arg.valid
+        counter_rows.extend(rows_of(prop_arg.counter_examples,
+                                    prop_arg.psyms))
+        all_truth.extend(prop_arg.all_truth)
+    columns = columns_of(all_truth, len(arg))
+    return Outcome(valid, counter_rows, columns,
+                   models_of(columns, 2 ** len(prop_arg.psyms)))
+
+
+def engine_falsify(arg, seed=0):
+    # PropArg.falsify(): any counter example it finds must be a real one.
+    # Only the counter examples it finds are compared, so this uses the
+    # reference to fill in the rest.
+    prop_arg = PropArg(arg)
+    vals = prop_arg.falsify(FALSIFY_SAMPLES, seed)
+    expected = reference(arg)
+    if vals is None:
+        return Outcome()
+    row = rows_of([vals], prop_arg.symbols())[0]
+    if row in expected.counter_rows:
+        return Outcome(False)
+    return Outcome(False, [row])
+
+
+# Every engine checked against the reference, by name.
+ENGINES = [('default', engine_default),
+           ('compiled', engine_compiled),
+           ('bits', engine_bits),
+           ('compiled-bits', engine_compiled_bits),
+           ('simplify', engine_simplify),
+           ('symmetry', engine_symmetry),
+           ('columns', engine_columns),
+           ('sat', engine_sat),
+           ('cache', engine_cache),
+           ('entail', engine_entail),
+           ('entail-sat', engine_entail_sat),
+           ('assume', engine_assume),
+           ('falsify', engine_falsify)]
+
+
+def generate_expression(rng, symbols, depth, top=True):
+    """Returns a random well-formed expression using the given symbols, at
+    most depth operators deep. Follows the rules of syntax.find_error():
+    every operator but the outermost is bracketed, as is every negation.
+
+    generate_expression(random.Random, list<str>, int, bool) -> str
+    """
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(symbols)
+    if rng.random() < 0.2:
+        return '(' + NOT + generate_expression(rng, symbols, depth - 1,
+                                               False) + ')'
+    expression = generate_expression(rng, symbols, depth - 1, False) + \
+        rng.choice(operators[1:]) + \
+        generate_expression(rng, symbols, depth - 1, False)
+    if top and rng.random() < 0.5:
+        return expression
+    return '(' + expression + ')'
+
+
+def generate_argument(rng, max_symbols=MAX_SYMBOLS, max_depth=MAX_DEPTH,
+                      max_expressions=MAX_EXPRESSIONS):
+    """Returns a random argument: a list of well-formed expressions, the
+    last of which is the conclusion.
+
+    generate_argument(random.Random, int, int, int) -> list<str>
+    """
+    symbols = rng.sample(SYMBOLS, rng.randint(1, max_symbols))
+    while True:
+        arg = [generate_expression(rng, symbols, rng.randint(0, max_depth))
+               for _ in range(rng.randint(1, max_expressions))]
+        if all(find_error(p) is None for p in arg):
+            return arg
+
+
+def smaller(arg):
+    """Yields arguments a step simpler than arg: with an expression left
+    out, an expression replaced by one of its parts, or one symbol renamed
+    to another.
+
+    smaller(list<str>) -> generator<list<str>>
+    """
+    if len(arg) > 1:
+        for k in range(len(arg)):
+            yield arg[:k] + arg[k + 1:]
+    for k, premise in enumerate(arg):
+        nodes = parse(premise)
+        for i in range(len(nodes) - 1):
+            yield arg[:k] + [render(nodes, i)] + arg[k + 1:]
+    symbols = PropArg(arg).symbols()
+    for old in symbols[1:]:
+        for new in symbols[:symbols.index(old)]:
+            yield [p.replace(old, new) for p in arg]
+
+
+def mismatch(engine, arg):
+    """Returns a description of how engine disagrees with the reference on
+    arg, or None if it doesn't.
+
+    mismatch(function, list<str>) -> str or NoneType
+    """
+    expected = reference(arg)
+    try:
+        got = engine(arg)
+    except Exception as e:
+        return "raised %s: %s" % (type(e).__name__, e)
+    differences = got.differences(expected)
+    if differences:
+        return "differs in " + ", ".join(differences)
+    return None
+
+
+def shrink(engine, arg, deadline=None):
+    """Simplifies an argument engine disagrees with the reference on, for as
+    long as it still disagrees, and returns the simplest found.
+
+    shrink(function, list<str>, float) -> list<str>
+    """
+    progress = True
+    while progress:
+        progress = False
+        for candidate in smaller(arg):
+            if deadline is not None and time.monotonic() > deadline:
+                return arg
+            if all(find_error(p) is None for p in candidate) and \
+                    mismatch(engine, candidate) is not None:
+                arg = candidate
+                progress = True
+                break
+    return arg
+
+
+def run(seed=0, count=COUNT, seconds=None, max_symbols=MAX_SYMBOLS,
+        max_depth=MAX_DEPTH, max_expressions=MAX_EXPRESSIONS, engines=ENGINES,
+        out=None):
+    """Checks every engine against the reference on count random arguments
+    from the given seed, shrinking any mismatch to a minimal reproducer.
+    The same seed and count always try the same arguments, so a mismatch
+    can be reproduced from them alone; seconds, if given, only caps the
+    time taken, stopping early if it runs out. Progress and mismatches are
+    written to out, if given. Returns the mismatches found as (engine name,
+    argument, description) tuples, and the number of arguments tried.
+
+    run(int, int, float, int, int, int, list<tuple>, file)
+        -> tuple<list<tuple<str, list<str>, str>>, int>
+    """
+    rng = random.Random(seed)
+    deadline = None
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+    failures = []
+    # Engines that have already failed are not checked again, so one bug
+    # isn't reported many times over.
+    failed = set()
+    tried = 0
+    while tried < count:
+        if deadline is not None and time.monotonic() > deadline:
+            if out is not None:
+                out.write("Out of time\n")
+            break
+        arg = generate_argument(rng, max_symbols, max_depth, max_expressions)
+        tried += 1
+        for name, engine in engines:
+            if name in failed:
+                continue
+            if mismatch(engine, arg) is not None:
+                failed.add(name)
+                # Allow shrinking to go over time a little.
+                small = shrink(engine, arg, None if deadline is None
+                               else deadline + seconds)
+                failure = (name, small, mismatch(engine, small))
+                failures.append(failure)
+                if out is not None:
+                    out.write("MISMATCH %s: %s\n    %s\n" %
+                              (name, failure[2], failure[1]))
+    if out is not None:
+        out.write("%d arguments tried with seed %d, %d mismatches\n" %
+                  (tried, seed, len(failures)))
+    return failures, tried
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check every evaluation engine against convert() and "
+                    "det() on random arguments.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed (default: 0)")
+    parser.add_argument("--count", type=int, default=COUNT,
+                        help="number of arguments to try (default: %d)"
+                             % COUNT)
+    parser.add_argument("--seconds", type=float,
+                        help="stop early after this many seconds")
+    parser.add_argument("--max-symbols", type=int, default=MAX_SYMBOLS)
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--max-expressions", type=int,
+                        default=MAX_EXPRESSIONS)
+    options = parser.parse_args()
+    failures, tried = run(options.seed, options.count, options.seconds,
+                          options.max_symbols, options.max_depth,
+                          options.max_expressions, out=sys.stdout)
+    sys.exit(1 if failures else 0)
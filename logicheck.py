@@ -21,61 +21,97 @@ You should have received a copy of the GNU General Public License
 along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import argparse
+import os
 import sys
 
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import QIcon, QFont
+from PyQt5.QtWidgets import QAction, QActionGroup, QApplication, \
+    QGridLayout, QMainWindow, QTextEdit, QWidget
+from PyQt5.QtGui import QFont
 
 from argument import ArgCheck
-from resource_path import resource_path
+from engines import ENGINES, log_to_stderr
+from resource_path import icon, read_text
 
 
 class Logicheck(QMainWindow):
     """The main window for the application.
     """
 
-    def __init__(self):
+    def __init__(self, cache=None, engine=None):
         """
         Constructor
+
+        __init__(PersistentCache, str)
         """
 
         # Inherit from QMainWindow.
         super().__init__()
 
+        # The manual window, made when first asked for.
+        self.info_window = None
+
         # Top-level config:
-        self.setCentralWidget(ArgCheck(self))
+        widget = ArgCheck(self, cache, engine)
+        self.setCentralWidget(widget)
         # Set relative window position (first two args) and size.
         self.setGeometry(50, 80, 425, 540)
         self.setWindowTitle("Logicheck")
-        self.setWindowIcon(QIcon(resource_path("images/logicheck_icon_3.png")))
+        self.setWindowIcon(icon("images/logicheck_icon_3.png"))
 
         # Create menu.
         # Create a help action which will go in a drop-down menu.
         # The "&" in "&Help" specifies the Alt- shortcut key.
-        helpAction = QAction(QIcon(resource_path("images/logicheck_help_icon.png")),
-                             "&Help", self)
+        helpAction = QAction(icon("images/logicheck_help_icon.png"), "&Help",
+                             self)
         helpAction.setShortcut("Ctrl+H")
         # Connect the selection of the action to displaying the manual
         helpAction.triggered.connect(self.show_info)
         # Create the status bar and the menu bar
         self.statusBar()
         menubar = self.menuBar()
+        # Create a menu to save the session and open it again (see
+        # session.py), with or without its truth table.
+        fileMenu = menubar.addMenu("&File")
+        fileMenu.addAction("&Open session...", widget.open_session_file,
+                           "Ctrl+O")
+        fileMenu.addAction("&Save session...",
+                           lambda: widget.save_session_file(False), "Ctrl+S")
+        fileMenu.addAction("Save session with &truth table...",
+                           lambda: widget.save_session_file(True))
         helpMenu = menubar.addMenu("&Help")
         # Link the menu item to the action.
         helpMenu.addAction(helpAction)
 
+        # Create a menu to choose how arguments are evaluated, one engine at
+        # a time (see engines.py).
+        engineMenu = menubar.addMenu("&Engine")
+        engineGroup = QActionGroup(self)
+        for name in [None] + list(ENGINES):
+            action = QAction("Automatic" if name is None else name, self)
+            action.setCheckable(True)
+            action.setChecked(name == engine)
+            action.setData(name)
+            action.triggered.connect(self.choose_engine)
+            engineGroup.addAction(action)
+            engineMenu.addAction(action)
+
+    def choose_engine(self):
+        # Used wherever the engine can do what is asked.
+        self.centralWidget().engine = self.sender().data()
+
     def show_info(self):
-        # Create window displaying the manual.
-        info_file = open(resource_path("documents/manual.html"))
-        # Get the contents (text).
-        info = info_file.read()
-        self.info_window = ManualWindow(info)
-        font1 = QFont()
-        font1.setPointSize(11)
-        self.info_window.setFont(font1)
-        self.info_window.setWindowIcon(QIcon(resource_path(
-            "images/logicheck_icon_3.png")))
+        # Create window displaying the manual. It is only made the first time
+        # it is asked for, which keeps start-up quick, and then shown again
+        # as it was left.
+        if self.info_window is None:
+            self.info_window = ManualWindow(read_text("documents/manual.html"))
+            font1 = QFont()
+            font1.setPointSize(11)
+            self.info_window.setFont(font1)
         self.info_window.show()
+        self.info_window.raise_()
+        self.info_window.activateWindow()
 
 
 class ManualWindow(QMainWindow):
@@ -102,17 +138,72 @@ class ManualWindow(QMainWindow):
         self.setCentralWidget(info_widget)
         self.setGeometry(80, 110, 425, 540)
         self.setWindowTitle("Logicheck - Manual")
-        self.setWindowIcon(QIcon("images/logicheck_icon_3.png"))
+        self.setWindowIcon(icon("images/logicheck_icon_3.png"))
 
 # Create window.
 # Execute the program only if the file was run directly, not imported.
 if __name__ == "__main__":
+    # Command line options for running without the GUI. Anything not
+    # recognised here is passed on to Qt.
+    parser = argparse.ArgumentParser(prog="logicheck")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the evaluation server instead of the GUI, "
+                             "reading JSON-lines requests from stdin or "
+                             "--socket")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="check the arguments in FILE (\"-\" for stdin), "
+                             "one JSON list of expressions per line, writing "
+                             "JSON-lines results to stdout")
+    parser.add_argument("--op", choices=["validity", "table", "count"],
+                        default="validity",
+                        help="what to calculate for each argument of a "
+                             "--batch (default: validity)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write --batch results as they finish rather "
+                             "than in input order")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="Unix domain socket for the server to listen on")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="number of worker processes for large requests")
+    parser.add_argument("--engine", choices=list(ENGINES),
+                        help="evaluate with this engine instead of the one "
+                             "estimated to be quickest")
+    parser.add_argument("--log-engines", action="store_true",
+                        help="log the engine chosen for each evaluation, "
+                             "and how long it took, to stderr")
+    parser.add_argument("--cache", metavar="PATH",
+                        default=os.environ.get("LOGICHECK_CACHE"),
+                        help="file for a persistent cache of results shared "
+                             "between sessions (default: $LOGICHECK_CACHE)")
+    options, qt_args = parser.parse_known_args()
+    if options.log_engines:
+        log_to_stderr()
+    if options.serve:
+        from server import serve
+        sys.exit(serve(options.socket, options.workers, options.cache,
+                       options.engine))
+    if options.batch:
+        from batch import run_batch
+        if options.batch == "-":
+            sys.exit(run_batch(sys.stdin, sys.stdout, options.op,
+                               options.workers, not options.unordered,
+                               options.cache, options.engine))
+        with open(options.batch, encoding="utf-8") as batch_file:
+            sys.exit(run_batch(batch_file, sys.stdout, options.op,
+                               options.workers, not options.unordered,
+                               options.cache, options.engine))
+    cache = None
+    if options.cache:
+        # Only imported when used, which keeps start-up quick.
+        from cache import PersistentCache
+        cache = PersistentCache(options.cache)
+
     # Create application object.
     # "sys.argv" is a list of args from the command line.
     # This allows controlled startup from the shell.
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     # Initialise main window and display it.
-    window = Logicheck()
+    window = Logicheck(cache, options.engine)
     window.show()
     # Enter the mainloop, which exits if exit() is called or the main widget
     # is destroyed. This gives a clean exit, with exit code.
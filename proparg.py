@@ -0,0 +1,1026 @@
+#!/usr/bin/env python
+
+"""
+proparg.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from copy import deepcopy
+from itertools import islice, product
+
+from budget import Undecided
+from cost import MATERIALISE, estimate_table
+import engines
+from engines import ROWS
+from expression import operators, is_symbol, assumed_bits, \
+    compile_expressions
+# The solver, the simplifier, the symmetry search and random sampling
+# (sat.py, simplify.py, symmetry.py, random) are only imported once they are
+# used, which keeps start-up quick.
+
+# Version of the evaluation engine. Increase this whenever a change could
+# alter the results of PropArg.evaluate(), so that results stored in a
+# persistent cache by an older version are no longer used.
+ENGINE_VERSION = 1
+
+# Number of sets of truth values tried together in one bit-parallel pass of
+# PropArg.falsify().
+SAMPLE_WIDTH = 256
+# Probabilities of a symbol being true used when sampling truth values. Some
+# counter examples need most symbols to be true (or false), which uniform
+# sampling rarely hits, so the passes of PropArg.falsify() alternate between
+# giving all symbols the same one of these and picking one for each symbol.
+SAMPLE_BIASES = [(1, 2), (7, 8), (1, 8), (3, 4), (1, 4)]
+
+# Rows evaluated together by PropArg.evaluate_columns() when it has a
+# deadline to keep to, which is looked at between blocks.
+COLUMN_BLOCK = 2 ** 16
+
+
+def headings(premises, conc=True):
+    """Formats logical expressions as column headings: numbered, with a
+    "therefore" symbol before the conclusion if conc == True.
+
+    headings(list<str>, bool) -> list<str>
+    """
+    l = len(premises)
+    premises2 = []
+    for i in range(l):
+        if i == l - 1 and conc:
+            # Prepend a "therefore" symbol to the conclusion.
+            premises2.append("".join([u'\u2234', "    ", premises[-1]]))
+        else:
+            # Prepend a number to the expression.
+            premises2.append("".join([str(i+1), ".    ", premises[i]]))
+    return premises2
+
+
+class TruthTable(object):
+    """Handles the display of truth tables and the associated data.
+    """
+
+    def __init__(self, symbols, premises, symbol_truth, premise_truth,
+                 conc=True):
+        """
+        Constructor
+
+        __init__(list<str>, list<str>, list<str>, list<list<int>>, bool)
+        """
+
+        self.symbols = symbols
+        self.premises = premises
+        self.symbol_truth = symbol_truth
+        self.premise_truth = premise_truth
+        self.conc = conc
+
+        self.generate_table_data()
+
+    def generate_table_data(self):
+        """Processes the data for the table and sorts it into a list mirroring
+        the table structure.
+        """
+
+        # Format logical expressions for column headings in a new list.
+        premises2 = headings(self.premises, self.conc)
+
+        # First row of table data - symbols then premises as column headings.
+        self.table_data = [self.symbols]
+        self.table_data[0].extend(premises2)
+
+        # Create the remaining rows of truth values, i.e. 1's and 0's.
+        for i in range(len(self.symbol_truth)):
+            self.table_row = []
+            for j in range(len(self.symbol_truth[i])):
+                self.table_row.append(str(self.symbol_truth[i][j]))
+            # Convert elements of premise_truth from int to str.
+            self.table_row.extend(str(v) for v in self.premise_truth[i])
+            self.table_data.append(self.table_row)
+
+        # E.g.
+        # symbol_truth = [(0, 0, 1), ...]
+        # premise_truth = [[1, 0, 1], ...]
+        # table = [ ['A', 'B', 'C', 'A->B', 'C+A', 'B'],
+        # ['0', '0', '1', '1', '0', '1'], ...]
+
+    def get_table_data(self):
+        """Returns the table data, as produced by generate_table_data().
+        """
+        return self.table_data
+
+
+class PropArg(object):
+    """Stores and determines the validity of propositional arguments.
+    """
+
+    def __init__(self, arg, prepared=None):
+        """
+        Constructor
+
+        prepared may give the work already done on the same expressions by
+        another PropArg, as kept in its _prepared, to share it rather than
+        do it again (see compiled.CompiledArgument).
+
+        __init__(list<str>, dict)
+        """
+
+        # Store the list of premises/expressions, and conclusion if provided.
+        self._arg = arg
+        # E.g. self._arg = ['Sv((P^Q)->R)', '-S', 'Q'].
+        # Store all symbols representing propositions, as they occur.
+        self._pin = [c for p in arg for c in p if is_symbol(c)]
+        # Whether the premises can all be true, once known.
+        self._consistent = None
+        # The rows found by the last call to solve(), if any.
+        self.found_rows = None
+        # Truth values assumed for some of the symbols (see assume()).
+        self.assumptions = {}
+        # Work done on the expressions that doesn't depend on the truth
+        # values, kept so that it is only done once: the expressions as
+        # simplified by simplify() under each set of assumptions, as
+        # compiled by compile() with and without cuts, and the results of
+        # symmetry(). E.g. ('simplify', (('P', 1),)): Simplification.
+        self._prepared = {} if prepared is None else prepared
+
+    def assume(self, assumptions):
+        """Fixes the truth values of some symbols, given as a dictionary of
+        0's and 1's by symbol, for the evaluations that follow. They then
+        only go through the sets of truth values of the other symbols: the
+        part of the truth table where the assumptions hold. An empty
+        dictionary assumes nothing. Raises ValueError if a symbol isn't in
+        the argument or a truth value isn't 0 or 1.
+
+        The compiled expressions are kept, so trying one set of assumptions
+        after another only costs evaluating the rows each one leaves.
+
+        assume(dict) -> NoneType
+        """
+        psyms = self.symbols()
+        for c, v in assumptions.items():
+            if c not in psyms:
+                raise ValueError("Unknown symbol: " + str(c))
+            if v not in (0, 1):
+                raise ValueError("Truth value of %s must be 0 or 1" % c)
+        assumptions = {c: int(v) for c, v in assumptions.items()}
+        if assumptions != self.assumptions:
+            self.assumptions = assumptions
+            # Results under other assumptions no longer apply.
+            self._consistent = None
+            self.all_truth = None
+            self._table_data = None
+            self.models = None
+
+    def free_symbols(self):
+        """Returns the symbols whose truth values aren't assumed, in the
+        order they first occur.
+
+        free_symbols() -> list<str>
+        """
+        return [c for c in self.symbols() if c not in self.assumptions]
+
+    def rows(self):
+        """Returns an iterator over the sets of truth values of
+        self.symbols() that agree with the assumptions, in truth table
+        order.
+
+        rows() -> iterator<tuple<int>>
+        """
+        return product(*[(self.assumptions[c],) if c in self.assumptions
+                         else (0, 1) for c in self.symbols()])
+
+    def evaluate(self, test=True, cache=None, falsify=0, budget=None,
+                 table=None, engine=None, assumptions=None):
+        """Calculates the truth values of the set of logical expressions
+        stored in self._arg. Generates a TruthTable object used to display
+        the truth values.
+
+        If test == True, returns a string stating if a propositional argument
+        is valid or invalid. If invalid, counter examples are listed in the
+        string.
+
+        If a PersistentCache is given, a result stored there is used instead
+        of evaluating again, and new results are written to it.
+
+        If falsify > 0 and test == True, that many random sets of truth values
+        are tried first (see falsify()). If one of them is a counter example,
+        the argument is reported invalid with just that counter example,
+        without calculating the full truth table.
+
+        If a Budget is given and runs out before every set of truth values
+        has been tried, returns an Undecided object holding the progress so
+        far and any counter examples already found. The truth table then
+        only has the rows that were evaluated.
+
+        If table == False, the truth values are not kept and no TruthTable is
+        made, which saves memory when only the verdict is wanted. If None,
+        they are kept if estimate_table() says the table is small enough.
+
+        The quickest way to get the result is chosen from those in
+        engines.py, unless engine gives the name of one to use. Arguments
+        small enough (see engines.small()) are evaluated with convert() and
+        det() without choosing, which costs less than the choice. Only the
+        "rows" engine, which goes through the truth table a row at a time,
+        makes a truth table or stops part way through for a budget. Without
+        a table, it evaluates only one of each set of rows that are the same
+        but for swapping interchangeable symbols (see symmetry()).
+
+        If assumptions are given, they are passed to assume() first, and
+        only the rows where they hold are evaluated; otherwise any made
+        before still apply. The counter examples and truth table then cover
+        just those rows.
+
+        evaluate(bool, PersistentCache, int, Budget, bool, str, dict)
+            -> NoneType or str or Undecided
+        """
+
+        self._test = test
+        if assumptions is not None:
+            self.assume(assumptions)
+        if cache is not None:
+            entry = cache.get(self.cache_key(test), ENGINE_VERSION)
+            if entry is not None:
+                return self.restore(entry, test)
+
+        if test and falsify > 0:
+            vals = self.falsify(falsify)
+            if vals is not None:
+                self.psyms = self.symbols()
+                self.valid = False
+                self.counter_examples = [vals]
+                # The truth table is only calculated if it is asked for.
+                self.all_truth = None
+                self._table_data = None
+                self.models = None
+                return self.message()
+
+        # Unless the expressions are already compiled, the smallest
+        # arguments are quicker to go through with convert() and det() than
+        # to choose an engine for, simplify and compile.
+        interpret = False
+        if engine is None and ('compile', True) not in self._prepared and \
+                engines.small(self._arg, 2 ** len(self.free_symbols())):
+            engine = ROWS
+            interpret = True
+            engines.logger.info("%s: evaluated without compiling, %d "
+                                "symbols", engines.query_of(test, table),
+                                len(self.free_symbols()))
+        if table is None and not test:
+            # The truth values are what is wanted, if they fit.
+            table = self.estimate_table(budget).strategy == MATERIALISE
+        if engine != ROWS:
+            return engines.run(self, test, table, cache, budget, engine)
+        if table is None:
+            table = self.estimate_table(budget).strategy == MATERIALISE
+
+        # Assume the argument is valid and prove invalid by contradiction.
+        valid = True
+        all_truth = []
+        # Number of sets of truth values that make every expression true.
+        models = 0
+        all_true = len(self._arg) * [1]
+
+        # Generate list of all unique proposition symbols contained in arg.
+        psyms = self.symbols()
+        # E.g. psyms = ['S', '5', '2', 'R'].
+        n = len(psyms)
+        # Create all permutations of 0's and 1's of length n,
+        # i.e. every possible set of truth values.
+        # This line of code is where the project started!
+        # They are generated as they are needed, so that a budget can stop
+        # the evaluation before they take up all the memory. Symbols with
+        # assumed truth values keep them in every row.
+        perm = []
+        total = 2 ** len(self.free_symbols())
+        # Columns of the truth table, for estimating its memory use. None if
+        # the table isn't kept, so it doesn't count towards the budget.
+        columns = n + len(self._arg) if table else None
+        undecided = None
+        # Compile the expressions once rather than substituting and
+        # re-reading them for every set of truth values, with small
+        # sub-expressions looked up in tables.
+        compiled = None if interpret else self.compile(cuts=True)
+        # Without a table, sets of truth values that are rearrangements of
+        # each other by swapping interchangeable symbols give the same
+        # result, so only one of each orbit is evaluated (see symmetry.py),
+        # counting for all of them.
+        symmetry = None
+        if not table and compiled is not None:
+            symmetry = self.symmetry(test)
+        if symmetry is not None:
+            rows = symmetry.representatives()
+        else:
+            rows = ((row, 1) for row in self.rows())
+        # Counter examples found, as sets of truth values, and the number of
+        # rows accounted for so far.
+        bad_perm = []
+        done = 0
+        reason = None
+
+        # Evaluate the argument for every set of truth values.
+        for i, (row, size) in enumerate(rows):
+            if budget is not None:
+                reason = budget.exceeded(i + 1, columns)
+                if reason is not None:
+                    break
+            if compiled is not None:
+                truth = list(compiled(row))
+            else:
+                # Assign truth values to the symbols.
+                vals = dict(zip(psyms, row))
+                # E.g. vals = {'S':0, '5':1 '2':0, 'R':1}.
+                # Convert the symbols in self._arg to the truth values.
+                arg = self.convert(psyms, vals)
+                # Determine truth value of the premises.
+                truth = [self.det(premise) for premise in arg]
+                if -1 in truth:  # Unhandled exception - abort
+                    return -1
+            if table:
+                # Add this set of truth values to the list of all sets.
+                perm.append(row)
+                all_truth.append(truth)
+            done += size
+            if truth == all_true:
+                models += size
+            # Condition for invalidity: all premises are true (=1) and the
+            # conclusion is false (=0).
+            if test and truth[-1] == 0 and truth[:-1] == all_true[1:]:
+                valid = False
+                bad_perm.append(row)
+            else:
+                # The current set of truth values is not a counter example to
+                # argument - move on and test the next set.
+                continue
+
+        if symmetry is not None:
+            # Every rearrangement of a counter example is one too.
+            bad_perm = sorted(r for row in bad_perm
+                              for r in symmetry.expand(row))
+        # Construct list of counter examples for the output message.
+        bad_vals = [dict(zip(psyms, row)) for row in bad_perm]
+        # Numbered as in the whole truth table.
+        bad_rows = [sum(v << (n - 1 - j) for j, v in enumerate(row))
+                    for row in bad_perm]
+        if reason is not None:
+            undecided = Undecided(reason, done, total, psyms, bad_vals)
+
+        # Keep the results on the object so that callers other than the GUI
+        # (e.g. the evaluation server) can use them without parsing the
+        # output message.
+        self.psyms = psyms
+        self.counter_examples = bad_vals
+        self.valid = valid if test else None
+        self.models = models
+        if undecided is not None:
+            self.valid = undecided.valid
+            self.models = None
+
+        if table:
+            self.all_truth = all_truth
+            self.make_table(perm, test)
+        else:
+            # The truth values are calculated again if they are asked for.
+            self.all_truth = None
+            self._table_data = None
+
+        if undecided is not None:
+            # Incomplete results are not cached.
+            return undecided
+
+        if cache is not None:
+            # Write the result through to the cache. The truth values are
+            # left out for very large tables, and for part of a table.
+            from cache import MAX_COLUMN_ROWS, pack_columns
+            columns = None
+            if table and len(perm) <= MAX_COLUMN_ROWS and \
+                    not self.assumptions:
+                columns = pack_columns(all_truth, len(self._arg))
+            cache.put(self.cache_key(test), ENGINE_VERSION, psyms, self.valid,
+                      bad_rows, columns)
+
+        # Return a statement about the validity of the argument if requested.
+        if test:
+            return self.message()
+
+        # Otherwise return with nothing.
+        return
+
+    def evaluate_columns(self, test=True, budget=None):
+        """Like evaluate() without a truth table, but evaluates each
+        expression over the whole truth table at once, with one bit per
+        row, as for expression.compile_expressions().
+
+        Only the rows where the assumptions (see assume()) hold are
+        evaluated. If a Budget with a deadline is given, they are evaluated
+        COLUMN_BLOCK rows at a time, and if the deadline passes between two
+        blocks, returns an Undecided object with the counter examples found
+        so far.
+
+        evaluate_columns(bool, Budget) -> NoneType or str or Undecided
+        """
+        self._test = test
+        compiled = self.compile()
+        if compiled is None:
+            return self.evaluate(test, budget=budget, table=False,
+                                 engine=ROWS)
+        psyms = self.symbols()
+        free = self.free_symbols()
+        k = len(free)
+        # Only the rows where the assumptions hold, in order.
+        rows = 2 ** k
+        block = rows
+        if budget is not None and budget.deadline is not None:
+            block = min(rows, COLUMN_BLOCK)
+        models = 0
+        bad_vals = []
+        done = 0
+        reason = None
+        for start in range(0, rows, block):
+            if budget is not None:
+                reason = budget.expired()
+                if reason is not None:
+                    break
+            width = min(block, rows - start)
+            mask = (1 << width) - 1
+            truth = compiled(assumed_bits(psyms, self.assumptions, start,
+                                          width), mask)
+            all_true = mask
+            for column in truth:
+                all_true &= column
+            models += bin(all_true).count('1')
+            done += width
+            if not test:
+                continue
+            # Rows where every premise is true and the conclusion false.
+            bad = mask ^ truth[-1]
+            for column in truth[:-1]:
+                bad &= column
+            while bad:
+                # Take the lowest set bit, i.e. the earliest row.
+                low = bad & -bad
+                i = start + low.bit_length() - 1
+                vals = dict(self.assumptions)
+                vals.update((c, (i >> (k - 1 - j)) & 1)
+                            for j, c in enumerate(free))
+                bad_vals.append({c: vals[c] for c in psyms})
+                bad ^= low
+        self.psyms = psyms
+        self.counter_examples = bad_vals
+        self.valid = not bad_vals if test else None
+        self.models = models
+        self.all_truth = None
+        self._table_data = None
+        if reason is not None:
+            undecided = Undecided(reason, done, rows, psyms,
+                                  bad_vals if test else [])
+            self.valid = undecided.valid
+            self.models = None
+            return undecided
+        if test:
+            return self.message()
+        return
+
+    def store(self, cache, test):
+        """Writes the results of an engine other than evaluate()'s own to a
+        persistent cache, if one is given, as evaluate() does.
+
+        store(PersistentCache, bool) -> NoneType
+        """
+        if cache is None:
+            return
+        if self.compile() is None:
+            # The engine went through evaluate(), which stored the results.
+            return
+        n = len(self.psyms)
+        bad_rows = [sum(v[c] << (n - 1 - j) for j, c in enumerate(self.psyms))
+                    for v in self.counter_examples]
+        cache.put(self.cache_key(test), ENGINE_VERSION, self.psyms,
+                  self.valid, bad_rows, None)
+
+    def compile(self, cuts=False):
+        """Returns the expressions compiled into one function of the truth
+        values of self.symbols(), in order (see
+        expression.compile_expressions(), which is also what cuts is for),
+        or None if they can only be evaluated by convert() and det(). The
+        function is made once and kept, from the expressions as simplified
+        by simplify.simplify_argument().
+
+        compile(bool) -> function or NoneType
+        """
+        key = ('compile', cuts)
+        if key in self._prepared:
+            return self._prepared[key]
+        psyms = self.symbols()
+        compiled = None
+        # convert() mixes the symbols '0' and '1' up with the truth values
+        # substituted for other symbols. Leave them to convert() and det()
+        # so that the results are the same either way.
+        if '0' not in psyms and '1' not in psyms:
+            try:
+                # Simplified first, so that every row costs fewer
+                # operators. Not under the assumptions, as the compiled
+                # expressions are kept for every set of them.
+                simplification = self.simplification({})
+                compiled = compile_expressions(simplification.expressions,
+                                               psyms, cuts)
+            except ValueError:
+                # Leave the error to det().
+                pass
+            else:
+                if ('compile', not cuts) not in self._prepared:
+                    engines.logger.info("%s", simplification)
+        self._prepared[key] = compiled
+        return compiled
+
+    def simplify(self):
+        """Returns the expressions simplified, with the symbols whose truth
+        values are assumed (see assume()) replaced by them, and how much
+        smaller they are. See simplify.simplify_argument(). Raises
+        ValueError if an expression can't be parsed.
+
+        simplify() -> Simplification
+        """
+        return self.simplification(self.assumptions)
+
+    def simplification(self, assumptions):
+        """Returns the expressions simplified under the given assumptions,
+        as for simplify(). Each is only simplified once, and kept for
+        compile(), solve(), symmetry() and the engine estimates, which all
+        start from it.
+
+        simplification(dict) -> Simplification
+        """
+        key = ('simplify', tuple(sorted(assumptions.items())))
+        if key not in self._prepared:
+            from simplify import simplify_argument
+            self._prepared[key] = simplify_argument(self._arg, assumptions)
+        return self._prepared[key]
+
+    def symmetry(self, test=True):
+        """Returns the classes of symbols whose truth values can be swapped
+        without changing the argument (or, if test == False, the set of
+        expressions), or None if there are none worth using. Symbols whose
+        truth values are assumed (see assume()) are left as they are. See
+        symmetry.find_symmetry().
+
+        symmetry(bool) -> Symmetry or NoneType
+        """
+        key = ('symmetry', test, tuple(sorted(self.assumptions.items())))
+        if key not in self._prepared:
+            from symmetry import SYMMETRY_SYMBOLS, find_symmetry
+            symmetry = None
+            if len(self.free_symbols()) >= SYMMETRY_SYMBOLS and \
+                    self.compile() is not None:
+                symmetry = find_symmetry(self.simplify().expressions,
+                                         self.symbols(), self.assumptions,
+                                         test)
+            self._prepared[key] = symmetry
+        return self._prepared[key]
+
+    def falsify(self, samples, seed=None):
+        """Looks for a counter example to the argument among samples random
+        sets of truth values. Returns the first counter example found, or
+        None if there is none among them (which does not mean the argument
+        is valid).
+
+        The sets are tested SAMPLE_WIDTH at a time, with one bit of an
+        integer per set, so a whole batch costs one pass over each
+        expression. Symbols with assumed truth values (see assume()) keep
+        them.
+
+        falsify(int, int) -> dict or NoneType
+        """
+        compiled = self.compile()
+        if compiled is None:
+            # Leave any error to be reported by the full evaluation.
+            return None
+        psyms = self.symbols()
+        import random
+        rng = random.Random(seed)
+
+        tried = 0
+        passes = 0
+        while tried < samples:
+            width = min(SAMPLE_WIDTH, samples - tried)
+            mask = (1 << width) - 1
+            values = []
+            shared = SAMPLE_BIASES[(passes // 2) % len(SAMPLE_BIASES)]
+            for c in psyms:
+                if c in self.assumptions:
+                    values.append(mask if self.assumptions[c] else 0)
+                    continue
+                if passes % 2:
+                    num, den = rng.choice(SAMPLE_BIASES)
+                else:
+                    num, den = shared
+                # Combine random bits to get the chosen probability of a 1,
+                # e.g. x & y is 1 with probability 1/4.
+                bits = 0
+                for k in range(den.bit_length() - 1):
+                    r = rng.getrandbits(width)
+                    bits = (bits | r) if (num >> k) & 1 else (bits & r)
+                values.append(bits)
+            # A set of truth values is a counter example if every premise is
+            # true and the conclusion is false.
+            truth = compiled(values, mask)
+            bad = mask ^ truth[-1]
+            for t in truth[:-1]:
+                bad &= t
+            if bad:
+                # Take the lowest set bit.
+                k = (bad & -bad).bit_length() - 1
+                return {c: (v >> k) & 1 for c, v in zip(psyms, values)}
+            tried += width
+            passes += 1
+        return None
+
+    def solve(self, test=True, limit=None, budget=None):
+        """Like evaluate(), but finds the counter examples with the solver
+        in sat.py instead of going through the whole truth table, so the
+        work done grows with the number of counter examples rather than
+        with 2**n. If test == False, finds the sets of truth values that
+        make every expression true instead.
+
+        The rows found are kept in self.found_rows, in truth table order,
+        as sets of truth values in the order of self.symbols(). No truth
+        table is made, as they are only part of one; get_table_data() makes
+        the whole table if it is asked for. If limit is given, at most that many are found; the verdict is
+        still exact, but there may be more counter examples than are
+        listed. If a Budget is given and its deadline passes, returns an
+        Undecided object with the rows found so far. As with evaluate(),
+        only rows where the assumptions (see assume()) hold are found.
+
+        solve(bool, int, Budget) -> NoneType or str or Undecided
+        """
+        self._test = test
+        compiled = self.compile()
+        if compiled is None:
+            # The solver can't handle these expressions the same way as
+            # det() does, so go through the truth table instead.
+            return self.evaluate(test, budget=budget, engine=ROWS)
+        psyms = self.symbols()
+        # Counter examples make the premises true and the conclusion false.
+        truth = len(self._arg) * [1]
+        if test:
+            truth[-1] = 0
+        from sat import AllSolutions
+        search = AllSolutions(self.simplify().expressions, psyms, truth,
+                              budget, self.assumptions)
+        rows = sorted(islice(search, limit))
+        found = [dict(zip(psyms, row)) for row in rows]
+        complete = search.complete and (limit is None or len(rows) < limit)
+
+        self.psyms = psyms
+        if test:
+            self.counter_examples = found
+            self.valid = not found
+            self.models = None
+        else:
+            self.counter_examples = []
+            self.valid = None
+            self.models = len(rows) if complete else None
+        self.found_rows = rows
+        # The rows found aren't the whole truth table, which is calculated
+        # if it is asked for.
+        self.all_truth = None
+        self._table_data = None
+
+        if not search.complete:
+            undecided = Undecided(search.reason, None,
+                                  2 ** len(self.free_symbols()), psyms,
+                                  found if test else [])
+            self.valid = undecided.valid
+            return undecided
+        if test:
+            return self.message()
+        return
+
+    def make_table(self, perm, test):
+        """Creates the TruthTable object for the truth values found by
+        evaluate().
+
+        make_table(list<tuple<int>>, bool) -> NoneType
+        """
+        # Send all of the information obtained about the set of expressions
+        # to the TruthTable class, which will allow the generation and display
+        # of a truth table.
+        # deepcopy prevents the source objects being modified in the process.
+        self.truth_table = TruthTable(deepcopy(self.psyms),
+                                      deepcopy(self._arg),
+                                      deepcopy(perm),
+                                      deepcopy(self.all_truth), conc=test)
+        self._table_data = self.truth_table.get_table_data()
+
+    def message(self):
+        """Returns the statement about the validity of the argument found by
+        evaluate(), listing the counter examples if it is invalid. Any
+        assumptions it was found under are stated first.
+
+        message() -> str
+        """
+        # E.g. 'Assuming P = 1  R = 0, the'.
+        start = 'The'
+        if self.assumptions:
+            start = 'Assuming ' + '  '.join(
+                str(c) + ' = ' + str(self.assumptions[c])
+                for c in self.symbols() if c in self.assumptions) + ', the'
+        if self.valid:
+            output = '\n' + start + ' argument is valid.\n'
+            if len(self._arg) > 1 and self.premises_consistent() is False:
+                # Any conclusion would be valid - say so.
+                if self.assumptions:
+                    output += '\nHowever, the premises can\'t all be true ' \
+                              'under these assumptions, so any conclusion ' \
+                              'follows from them.'
+                else:
+                    output += '\nHowever, the premises are inconsistent: ' \
+                              'they can\'t all be true at once, so any ' \
+                              'conclusion follows from them.'
+                core = self.unsatisfiable_core()
+                if core is not None and self.assumptions:
+                    output += ' Premises ' + \
+                              ', '.join(str(k + 1) for k in core) + \
+                              ' can\'t all be true when they hold.'
+                elif core is not None:
+                    output += ' Premises ' + \
+                              ', '.join(str(k + 1) for k in core) + \
+                              ' contradict each other.'
+                output += '\n'
+        else:
+            output = '\n' + start + ' argument is invalid. Counter examples:\n'
+            # List the counter examples.
+            for v in self.counter_examples:
+                output += '\n'
+                for k in self.psyms:
+                    output += str(k) + ' = ' + str(v[k]) + '  '
+                output += '\n'
+            output += '\n'
+            # E.g.
+            # The argument is invalid. Counter examples:
+            #
+            # S = 0,  5 = 1,  2 = 1,  R = 0
+            # S = 0,  5 = 0,  2 = 0,  R = 1
+        return output
+
+    def premises_consistent(self):
+        """Returns True if some set of truth values makes every premise (all
+        but the last expression) true, False if none does, or None if it
+        can't be told (see compile()). Only sets of truth values agreeing
+        with the assumptions (see assume()) count.
+
+        If evaluate() has been through the whole truth table, the answer
+        follows from its results; otherwise the solver in sat.py is used.
+
+        premises_consistent() -> bool or NoneType
+        """
+        if self._consistent is None:
+            if getattr(self, 'valid', None) is False:
+                # A counter example makes every premise true.
+                self._consistent = True
+            elif getattr(self, 'valid', None) and \
+                    getattr(self, 'models', None) is not None:
+                # In a valid argument, any set of truth values making the
+                # premises true makes every expression true.
+                self._consistent = self.models > 0
+            elif self.compile() is not None:
+                from sat import guarded
+                expressions = self.simplify().expressions
+                solver, selectors, _ = guarded(expressions[:-1],
+                                               self.symbols())
+                fixed = solver.literals(self.assumptions)
+                self._consistent = \
+                    solver.solve(selectors + fixed) is not None
+        return self._consistent
+
+    def unsatisfiable_core(self):
+        """Returns the positions in self._arg of a minimal set of premises
+        that can't all be true at once: leaving out any one of them would
+        make the rest consistent. Returns None if the premises are
+        consistent, or if it can't be told (see compile()). The premises are
+        taken together with any assumptions (see assume()).
+
+        unsatisfiable_core() -> list<int> or NoneType
+        """
+        if self.compile() is None:
+            return None
+        from sat import guarded, minimal_core
+        expressions = self.simplify().expressions
+        solver, selectors, _ = guarded(expressions[:-1], self.symbols())
+        return minimal_core(solver, selectors,
+                            solver.literals(self.assumptions))
+
+    def relevant_premises(self):
+        """Returns the positions in self._arg of a minimal set of premises
+        from which the conclusion (the last expression) follows: leaving out
+        any one of them would make the argument invalid. Returns None if the
+        argument is invalid, or if it can't be told (see compile()). The
+        premises are taken together with any assumptions (see assume()).
+
+        relevant_premises() -> list<int> or NoneType
+        """
+        if self.compile() is None:
+            return None
+        from sat import guarded, minimal_core
+        solver, selectors, roots = guarded(self.simplify().expressions,
+                                           self.symbols())
+        # The argument is valid with a set of premises if they can't be true
+        # while the conclusion is false.
+        return minimal_core(solver, selectors[:-1],
+                            [-roots[-1]] + solver.literals(self.assumptions))
+
+    def cache_key(self, test):
+        """Returns the canonical text of the argument, used to look it up in
+        a persistent cache. Whitespace is ignored, and arguments are kept
+        apart from plain sets of expressions. Any assumptions (see assume())
+        are part of the key.
+
+        cache_key(bool) -> str
+        """
+        prefix = 'argument' if test else 'expressions'
+        if self.assumptions:
+            # E.g. 'argument assuming P=1 R=0'.
+            prefix += ' assuming ' + ' '.join(
+                '%s=%d' % (c, v) for c, v in sorted(self.assumptions.items()))
+        return '\n'.join([prefix] + [''.join(p.split()) for p in self._arg])
+
+    def restore(self, entry, test):
+        """Takes the results of evaluate() from a persistent cache entry
+        rather than calculating them.
+
+        restore(CacheEntry, bool) -> NoneType or str
+        """
+        psyms = entry.symbols
+        n = len(psyms)
+        self.psyms = psyms
+        self.valid = entry.valid
+        # Row i of the truth table gives symbol j the value of bit n-1-j of i.
+        self.counter_examples = [{psyms[j]: (i >> (n - 1 - j)) & 1
+                                  for j in range(n)}
+                                 for i in entry.counter_rows]
+        if entry.columns is not None:
+            from cache import unpack_columns
+            self.all_truth = unpack_columns(entry.columns, 2 ** n,
+                                            len(self._arg))
+            self.make_table(list(product((0, 1), repeat=n)), test)
+            all_true = len(self._arg) * [1]
+            self.models = sum(1 for truth in self.all_truth
+                              if truth == all_true)
+        else:
+            # The truth values weren't stored - they are calculated again if
+            # they are asked for.
+            self.all_truth = None
+            self._table_data = None
+            self.models = None
+        if test:
+            return self.message()
+        return
+
+    def count_models(self):
+        """Returns the number of sets of truth values for which every
+        expression in self._arg is true. Only available after evaluate().
+
+        count_models() -> int
+        """
+        if self.models is None:
+            # Not every engine counts models along the way.
+            engine = engines.choose(self, engines.COUNT)
+            self.evaluate(self._test, table=False, engine=engine.name)
+        return self.models
+
+    def symbols(self):
+        """Returns the unique proposition symbols in the argument, in the
+        order they first occur.
+
+        symbols() -> list<str>
+        """
+        # Dictionary keys keep the order they were added in.
+        return list(dict.fromkeys(self._pin))
+        # E.g. ['S', '5', '2', 'R'].
+
+    def estimate_table(self, budget=None):
+        """Estimates the size of the argument's truth table without
+        calculating any of it, leaving out the rows where the assumptions
+        (see assume()) don't hold. See cost.estimate_table().
+
+        estimate_table(Budget) -> TableEstimate
+        """
+        return estimate_table(self._arg, budget, len(self.assumptions))
+
+    def convert(self, psyms, vals):
+        """Converts the propositions (denoted as letters or numbers) in psyms
+        to their corresponding truth values from vals.
+
+        convert(list<str>, dict) -> list<str>
+        """
+
+        # E.g. psyms = ['S', '5', '2', 'R'],
+        # vals = {'S':0, '5':1 '2':0, 'R':1}.
+        # FIXME: allow use of '1' or '0' as a symbol.
+        # E.g. psyms = ['a', '0'], vals = {'a':0, '0':1}.
+        #      The a's have already been replaced with '0' - these then get
+        #      replaced with 1's on the second iteration.
+        # NOTE: could remove digit compatibility entirely. Statements like
+        # "5 = 1" are confusing.
+
+        argx = []
+        for premise in self._arg:
+            for c in psyms:
+                premise = premise.replace(c, str(vals[c]))
+            argx.append(premise)
+        return argx
+        # E.g. argx = ['0->((1^0)v1)', '~0', '0'].
+
+    def det(self, premise):
+        """Determines the truth value of premise, in which every symbol has
+        been replaced by its truth value (see convert()).
+
+        Each bracketed sub-expression is reduced to its truth value as soon
+        as its close bracket is reached, with the unfinished ones kept on a
+        stack, so this takes time in proportion to the length of premise
+        however deeply it is nested. Returns -1 if an operator is not
+        handled or the brackets do not match.
+
+        det(str) -> int
+        """
+
+        # Characters of each bracket level not yet reduced, outermost first.
+        # E.g. for '(1∧(0∨1' the stack is [[], ['1', '∧'], ['0', '∨', '1']].
+        stack = [[]]
+        for c in premise:
+            if c == '(':
+                stack.append([])
+            elif c == ')':
+                if len(stack) == 1:
+                    return -1  # Close bracket without an open bracket.
+                # Replace the nested expression with its truth value.
+                v = self.det_level(''.join(stack.pop()))
+                if v == -1:
+                    return -1
+                stack[-1].append(str(v))
+            else:
+                stack[-1].append(c)
+        if len(stack) != 1:
+            return -1  # Open bracket without a close bracket.
+        return self.det_level(''.join(stack[0]))
+
+    @staticmethod
+    def det_level(premise):
+        """Determines the truth value of an expression with no brackets: at
+        most one operator and at least one truth value (0 or 1).
+
+        det_level(str) -> int
+        """
+
+        # Initialise q as a precaution.
+        q = 0
+        digits = [c for c in premise if c.isdigit()]
+        # Removing the digits should leave the operator.
+        op = premise.strip(''.join(digits))
+        # Store the truth value(s) as integer(s).
+        props = [int(c) for c in digits]
+        p = props[0]
+        if len(props) > 1:
+            q = props[1]
+
+        # Perform logical operation according to operator.
+        if op == '':  # No operator - leave as is.
+            v = p
+        elif op == operators[0]:  # NOT
+            v = int(not p)
+        elif op == operators[1]:  # AND
+            v = (p and q)
+        elif op == operators[2]:  # OR
+            v = (p or q)
+        elif op == operators[3]:  # XOR
+            v = int(p != q)
+        elif op == operators[4]:  # IFF
+            v = int(p == q)
+        elif op == operators[5]:  # IF
+            v = int(not (p == 1 and q == 0))
+        else:
+            return -1  # Something went wrong - unhandled exception.
+        # v is the overall truth value, the result required.
+        return v
+
+    def get_table_data(self):
+        """Retrieve the table data created in evaluate().
+
+        get_table_data() -> list
+        """
+        if self._table_data is None:
+            self.evaluate(self._test, table=True)
+        return self._table_data
@@ -23,6 +23,9 @@ along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
 import os
+from functools import lru_cache
+
+from PyQt5.QtGui import QIcon
 
 
 # PyInstaller fix - credit http://bit.ly/2h1apd6
@@ -35,3 +38,26 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
 
     return os.path.join(base_path, relative_path)
+
+
+# Icons and text files are loaded once each and then shared, so opening a
+# window again doesn't go back to the disk.
+@lru_cache(maxsize=None)
+def icon(relative_path):
+    """Returns the icon in the image file at relative_path (see
+    resource_path()).
+
+    icon(str) -> QIcon
+    """
+    return QIcon(resource_path(relative_path))
+
+
+@lru_cache(maxsize=None)
+def read_text(relative_path):
+    """Returns the contents of the text file at relative_path (see
+    resource_path()).
+
+    read_text(str) -> str
+    """
+    with open(resource_path(relative_path), encoding="utf-8") as text_file:
+        return text_file.read()
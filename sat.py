@@ -0,0 +1,459 @@
+#!/usr/bin/env python
+
+"""
+sat.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from budget import CHECK_EVERY
+from expression import NOT, AND, OR, XOR, IFF, IF, SYMBOL, parse
+
+# Variables are numbered from 1, and a literal is a variable (true) or its
+# negative (false), as in the DIMACS format.
+
+
+class Solver(object):
+    """A DPLL satisfiability solver for clauses in conjunctive normal form,
+    with unit propagation by two watched literals. Clauses can be added
+    between calls to solve(), which is what all_solutions() uses to block
+    solutions it has already found.
+
+    The search is iterative, so it is not limited by the recursion limit
+    however many variables there are.
+    """
+
+    def __init__(self, variables=0):
+        """
+        Constructor
+
+        __init__(int)
+        """
+        self.variables = variables
+        self.clauses = []
+        # Clauses watching each literal, by literal. A clause watches its
+        # first two literals.
+        self.watches = {}
+        # Literals of clauses with only one literal, which must be true.
+        self.units = []
+        # True once an empty clause has been added.
+        self.unsat = False
+        # Order in which variables are chosen when searching. Defaults to
+        # 1, 2, 3, ...
+        self.order = None
+        self.assign = []
+        self.trail = []
+        # Why the last call to solve() gave up, if it ran out of budget.
+        self.reason = None
+        # Variable of each symbol, filled in by encode().
+        self.symbol_variables = {}
+
+    def new_variable(self):
+        """Adds a variable, returning its number.
+
+        new_variable() -> int
+        """
+        self.variables += 1
+        return self.variables
+
+    def add_clause(self, literals):
+        """Adds a clause: a list of literals, at least one of which must be
+        true.
+
+        add_clause(list<int>) -> NoneType
+        """
+        clause = []
+        for lit in literals:
+            if -lit in clause:
+                # Always true, so it can be left out.
+                return
+            if lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.units.append(clause[0])
+        else:
+            self.clauses.append(clause)
+            self.watches.setdefault(clause[0], []).append(clause)
+            self.watches.setdefault(clause[1], []).append(clause)
+
+    def checkpoint(self):
+        """Returns the variables and clauses the solver has now, so that any
+        added afterwards can be taken out again with rollback().
+
+        checkpoint() -> tuple
+        """
+        return (self.variables, len(self.clauses), len(self.units),
+                self.unsat, dict(self.symbol_variables))
+
+    def rollback(self, checkpoint):
+        """Takes out every variable and clause added since checkpoint, as
+        returned by checkpoint(), was made, leaving the solver as it was
+        then. Clauses are never added by solve() itself, so the ones left
+        are exactly those there were.
+
+        rollback(tuple) -> NoneType
+        """
+        variables, clauses, units, unsat, symbol_variables = checkpoint
+        added = set(id(clause) for clause in self.clauses[clauses:])
+        del self.clauses[clauses:]
+        del self.units[units:]
+        for lit in list(self.watches):
+            if abs(lit) > variables:
+                del self.watches[lit]
+            elif added:
+                self.watches[lit] = [clause for clause in self.watches[lit]
+                                     if id(clause) not in added]
+        self.variables = variables
+        self.unsat = unsat
+        self.symbol_variables = symbol_variables
+
+    def literals(self, values):
+        """Returns the literals that give symbols the truth values in values,
+        a dictionary of 0's and 1's by symbol, e.g. to pass to solve() as
+        assumptions. The symbols must have variables (see encode()).
+
+        literals(dict) -> list<int>
+        """
+        return [self.symbol_variables[c] if v else -self.symbol_variables[c]
+                for c, v in values.items()]
+
+    def value(self, lit):
+        """Returns 1 if lit is true in the current assignment, 0 if it is
+        false, or None if its variable is unassigned.
+
+        value(int) -> int or NoneType
+        """
+        v = self.assign[abs(lit)]
+        if v is None or lit > 0:
+            return v
+        return 1 - v
+
+    def _enqueue(self, lit):
+        # Makes lit true. Returns False if it is already false.
+        v = self.value(lit)
+        if v is not None:
+            return v == 1
+        self.assign[abs(lit)] = 1 if lit > 0 else 0
+        self.trail.append(lit)
+        return True
+
+    def _propagate(self, head):
+        # Assigns every literal forced by a clause with all but one literal
+        # false, starting from trail position head. Returns False if a
+        # clause has every literal false.
+        while head < len(self.trail):
+            false_lit = -self.trail[head]
+            head += 1
+            watching = self.watches.get(false_lit, [])
+            kept = []
+            for i, clause in enumerate(watching):
+                # Keep the false literal in the second place.
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    # Already satisfied.
+                    kept.append(clause)
+                    continue
+                # Look for another literal to watch that isn't false.
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) != 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if not self._enqueue(clause[0]):
+                        # Conflict - leave the remaining watches as they
+                        # were.
+                        kept.extend(watching[i + 1:])
+                        self.watches[false_lit] = kept
+                        return False
+            self.watches[false_lit] = kept
+        return True
+
+    def _undo(self, size):
+        # Unassigns everything after trail position size.
+        while len(self.trail) > size:
+            self.assign[abs(self.trail.pop())] = None
+
+    def solve(self, assumptions=(), budget=None):
+        """Looks for an assignment that makes every clause true, with every
+        literal in assumptions true. Returns the assignment as a list
+        indexed by variable (index 0 is unused), or None if there is none.
+
+        If a Budget is given and its deadline passes, gives up and returns
+        None with the reason in self.reason.
+
+        solve(iterable<int>, Budget) -> list<int> or NoneType
+        """
+        self.reason = None
+        if self.unsat:
+            return None
+        self.assign = [None] * (self.variables + 1)
+        self.trail = []
+        for lit in self.units:
+            if not self._enqueue(lit):
+                return None
+        if not self._propagate(0):
+            return None
+        for lit in assumptions:
+            size = len(self.trail)
+            if not self._enqueue(lit) or not self._propagate(size):
+                return None
+        order = self.order or range(1, self.variables + 1)
+        # Decisions made, as (trail size before, literal, tried both ways,
+        # position of the variable in order).
+        decisions = []
+        # Position in order from which to look for an unassigned variable.
+        position = 0
+        steps = 0
+        while True:
+            steps += 1
+            if budget is not None and steps % CHECK_EVERY == 0:
+                self.reason = budget.expired()
+                if self.reason is not None:
+                    return None
+            # Choose the next unassigned variable.
+            while position < len(order) and \
+                    self.assign[order[position]] is not None:
+                position += 1
+            if position == len(order):
+                return list(self.assign)
+            lit = -order[position]
+            decisions.append((len(self.trail), lit, False, position))
+            self._enqueue(lit)
+            ok = self._propagate(len(self.trail) - 1)
+            while not ok:
+                # Undo decisions until one can be tried the other way.
+                while decisions and decisions[-1][2]:
+                    decisions.pop()
+                if not decisions:
+                    return None
+                size, lit, _, position = decisions.pop()
+                self._undo(size)
+                decisions.append((size, -lit, True, position))
+                self._enqueue(-lit)
+                ok = self._propagate(len(self.trail) - 1)
+
+
+def encode(premises, symbols, solver=None):
+    """Encodes logical expressions as clauses (the Tseitin encoding), adding
+    them to solver, or a new Solver if none is given. In a new Solver, the
+    j'th symbol is variable j + 1; symbols new to a given solver get new
+    variables. Either way, solver.symbol_variables maps each symbol to its
+    variable. Each operator gets a variable of its own, made equal to its
+    value by the clauses. Sub-expressions shared between the expressions
+    are only encoded once.
+
+    An expression may also be given as 0 or 1, for one that is always false
+    or always true (see simplify.py); its literal is a new variable fixed
+    by a clause of its own.
+
+    Returns the solver and, for each expression, the literal that is true
+    exactly when the expression is. Raises ValueError if an expression can't
+    be parsed (see expression.parse()) or uses a symbol not in symbols.
+
+    encode(list<str or int>, list<str>, Solver) -> tuple<Solver, list<int>>
+    """
+    if solver is None:
+        solver = Solver(len(symbols))
+        solver.symbol_variables = {c: k + 1 for k, c in enumerate(symbols)}
+    for c in symbols:
+        if c not in solver.symbol_variables:
+            solver.symbol_variables[c] = solver.new_variable()
+    position = solver.symbol_variables
+    known = set(symbols)
+    # Literal of each distinct node, keyed by the node with its operands
+    # given as literals.
+    literals = {}
+    roots = []
+    for premise in premises:
+        if premise in (0, 1):
+            x = solver.new_variable()
+            solver.add_clause([x])
+            roots.append(x if premise else -x)
+            continue
+        local = []
+        for node in parse(premise):
+            op = node[0]
+            if op == SYMBOL:
+                if node[1] not in known:
+                    raise ValueError("Unknown symbol: " + node[1])
+                local.append(position[node[1]])
+                continue
+            key = (op,) + tuple(local[k] for k in node[1:])
+            if key not in literals:
+                literals[key] = gate(solver, key)
+            local.append(literals[key])
+        roots.append(local[-1])
+    return solver, roots
+
+
+def gate(solver, key):
+    """Adds the clauses for one operator to solver, given the operator and
+    the literals of its operands, and returns the literal equal to it.
+
+    gate(Solver, tuple) -> int
+    """
+    op = key[0]
+    if op == NOT:
+        return -key[1]
+    p, q = key[1], key[2]
+    if op == IF:
+        # p => q is (not p) or q.
+        op, p = OR, -p
+    x = solver.new_variable()
+    if op == AND:
+        clauses = [[-x, p], [-x, q], [x, -p, -q]]
+    elif op == OR:
+        clauses = [[x, -p], [x, -q], [-x, p, q]]
+    else:  # XOR or IFF
+        clauses = [[-x, p, q], [-x, -p, -q], [x, -p, q], [x, p, -q]]
+    for clause in clauses:
+        solver.add_clause(clause)
+    # IFF is the negation of XOR.
+    return -x if op == IFF else x
+
+
+class AllSolutions(object):
+    """Finds every set of truth values of symbols for which each expression
+    in premises has the truth value given for it in truth (1 or 0, or None
+    for either). Iterating yields them one at a time, each as a tuple of 0's
+    and 1's in the same order as symbols, in no particular order.
+
+    Each one found is blocked with a clause before looking for the next, so
+    the work done grows with the number of solutions rather than with the
+    2**n sets of truth values.
+
+    If a Budget is given and runs out, iteration stops early, and
+    self.complete is False with the reason in self.reason. If fixed is
+    given, it maps symbols to the truth values they are assumed to have,
+    and only sets of truth values agreeing with it are found.
+    """
+
+    def __init__(self, premises, symbols, truth, budget=None, fixed=None):
+        """
+        Constructor
+
+        Raises ValueError as for encode().
+
+        __init__(list<str>, list<str>, list<int>, Budget, dict)
+        """
+        self.symbols = symbols
+        self.budget = budget
+        self.complete = True
+        self.reason = None
+        self.solver, self.roots = encode(premises, symbols)
+        for root, value in zip(self.roots, truth):
+            if value is not None:
+                self.solver.add_clause([root if value else -root])
+        for lit in self.solver.literals(fixed or {}):
+            self.solver.add_clause([lit])
+
+    def __iter__(self):
+        solver = self.solver
+        n = len(self.symbols)
+        while True:
+            # Each search may be too short for solve() to look at the
+            # deadline, so it is also checked between them.
+            if self.budget is not None:
+                self.reason = self.budget.expired()
+                if self.reason is not None:
+                    self.complete = False
+                    return
+            model = solver.solve(budget=self.budget)
+            if model is None:
+                if solver.reason is not None:
+                    self.complete = False
+                    self.reason = solver.reason
+                return
+            values = tuple(model[1:n + 1])
+            yield values
+            if n == 0:
+                return
+            # Rule out this set of truth values from now on. The values of
+            # the other variables follow from the symbols.
+            solver.add_clause([-(j + 1) if values[j] else j + 1
+                               for j in range(n)])
+
+
+def all_solutions(premises, symbols, truth):
+    """Yields every set of truth values of symbols for which each expression
+    in premises has the truth value given for it in truth. See
+    AllSolutions.
+
+    all_solutions(list<str>, list<str>, list<int>) -> generator<tuple<int>>
+    """
+    return iter(AllSolutions(premises, symbols, truth))
+
+
+def guarded(premises, symbols):
+    """Encodes logical expressions as for encode(), but with each one only
+    required to be true while a selector variable of its own is assumed true
+    (see Solver.solve()). Returns the solver, the selector variables and the
+    literal of each expression.
+
+    guarded(list<str>, list<str>) -> tuple<Solver, list<int>, list<int>>
+    """
+    solver, roots = encode(premises, symbols)
+    selectors = []
+    for root in roots:
+        selector = solver.new_variable()
+        solver.add_clause([-selector, root])
+        selectors.append(selector)
+    return solver, selectors, roots
+
+
+def minimal_core(solver, selectors, fixed=()):
+    """Finds a minimal set of the selectors which, assumed true along with
+    the literals in fixed, leave the solver with no solution: leaving out
+    any one of them would allow a solution. Returns their positions in
+    selectors, or None if there is a solution with all of them.
+
+    Selectors are left out a chunk at a time, starting with halves, and a
+    chunk is kept out if there is still no solution without it. Each set
+    tried is only solved once.
+
+    minimal_core(Solver, list<int>, list<int>) -> list<int> or NoneType
+    """
+    results = {}
+
+    def unsatisfiable(subset):
+        key = frozenset(subset)
+        if key not in results:
+            assumptions = list(fixed) + [selectors[i] for i in subset]
+            results[key] = solver.solve(assumptions) is None
+        return results[key]
+
+    core = list(range(len(selectors)))
+    if not unsatisfiable(core):
+        return None
+    size = max(1, len(core) // 2)
+    while True:
+        start = 0
+        while start < len(core):
+            trial = core[:start] + core[start + size:]
+            if unsatisfiable(trial):
+                core = trial
+            else:
+                start += size
+        if size == 1:
+            return core
+        size = max(1, size // 2)
@@ -0,0 +1,439 @@
+#!/usr/bin/env python
+
+"""
+server.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from budget import Budget, Undecided
+from cache import PersistentCache
+from compiled import compile_argument
+import engines
+from engines import ENGINES, log_to_stderr, logger
+from expression import is_symbol
+from syntax import find_error
+
+# Requests the server understands, mapped to whether the last expression is
+# treated as the conclusion of an argument.
+OPS = {'validity': True, 'table': False, 'count': False}
+# Arguments with at most this many distinct symbols (not counting those
+# with assumed truth values) are cheap enough to evaluate in a thread of the
+# server process, or on the event loop itself if they are too small for a
+# thread to be worth it (see engines.small()). Anything larger goes to the
+# pool of worker processes.
+INLINE_SYMBOLS = 10
+# Number of results kept in memory between requests.
+CACHE_SIZE = 4096
+
+# Persistent caches opened by this process, by path.
+_persistent = {}
+
+
+def run_request(op, arg, cache_path=None, falsify=0, limits=None,
+                engine=None, assumptions=None, default_engine=None):
+    """Evaluates a single request and returns the result as a dictionary
+    ready to be encoded as JSON. Runs either in the server process or in a
+    worker of the process pool, so it must not rely on any server state.
+
+    If cache_path is given, the persistent cache there is read from and
+    written to. falsify is passed on to PropArg.evaluate(), as is a Budget
+    made from limits (a dictionary of its keyword arguments), if given, and
+    the name of the engine to use, if given (see engines.py), and any
+    truth values to assume for symbols (see PropArg.assume()).
+
+    If no engine is given, default_engine, the engine chosen for the whole
+    process, is used where it can answer the request, as in the GUI (see
+    engines.preferred()); otherwise the quickest is chosen.
+
+    run_request(str, tuple<str>, str, int, dict, str, dict, str) -> dict
+    """
+
+    cache = None
+    if cache_path:
+        if cache_path not in _persistent:
+            _persistent[cache_path] = PersistentCache(cache_path)
+        cache = _persistent[cache_path]
+    budget = None
+    if limits:
+        budget = Budget(**limits)
+    # Arguments asked about again are not compiled again.
+    compiled = compile_argument(arg, cache)
+    if engine is None and default_engine is not None:
+        prop_arg = compiled.prop_arg()
+        if assumptions:
+            prop_arg.assume(assumptions)
+        engine = engines.preferred(prop_arg,
+                                   engines.query_of(OPS[op], op == 'table'),
+                                   default_engine, budget)
+    # Only a table request needs the truth values kept.
+    result = compiled.query(OPS[op], op == 'table', assumptions, budget,
+                            engine, falsify)
+    output = result.output
+    if isinstance(output, Undecided):
+        return {'undecided': True,
+                'reason': output.reason,
+                'rows_done': output.rows_done,
+                'rows_total': output.rows_total,
+                'valid': output.valid,
+                'symbols': output.symbols,
+                'counter_examples': output.counter_examples}
+
+    if op == 'validity':
+        return {'valid': result.valid,
+                'symbols': result.symbols,
+                'counter_examples': result.counter_examples}
+    elif op == 'table':
+        return {'table': result.table_data}
+    else:
+        # Only the rows where the assumptions hold are counted.
+        return {'models': result.models, 'rows': result.rows}
+
+
+def worker_context():
+    """Returns the multiprocessing context used to start worker processes.
+
+    Forked workers would inherit whatever files and connections the parent
+    has open, e.g. client connections of the server, which then never see
+    EOF when the parent closes them. Workers are started from a clean
+    process instead where possible.
+
+    worker_context() -> multiprocessing.context.BaseContext
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class ResultCache(object):
+    """A least-recently-used store of request results, so that repeated
+    checks are answered without evaluating the argument again.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """
+        Constructor
+
+        __init__(int)
+        """
+        self.size = size
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached result for key, or None if there isn't one.
+
+        get(tuple) -> dict or NoneType
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """Stores result under key, discarding the least recently used
+        result if the cache is full.
+
+        put(tuple, dict) -> NoneType
+        """
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+
+class EvalServer(object):
+    """Answers JSON-lines requests for the validity, truth table or model
+    count of a set of expressions. Requests are read one per line, e.g.
+
+        {"id": 1, "op": "validity", "argument": ["P⇒Q", "P", "Q"]}
+
+    A validity request may also give "falsify": N to try N random sets of
+    truth values before the full check, in which case an invalid argument
+    may be reported with a single counter example.
+
+    Any request may give "budget": {"seconds": S, "max_rows": R,
+    "max_bytes": B} to limit the work done. If the budget runs out, the
+    result has "undecided": true, with the progress made and any counter
+    examples found.
+
+    Any request may also give "engine": "rows", "bits" or "sat" to choose
+    how it is evaluated (see engines.py), instead of the engine estimated
+    to be quickest, and "assume": {"P": 1, ...} to fix the truth values of
+    some symbols, so that only the rows where they hold are checked,
+    counted or shown. An engine named in a request is always used, so the
+    request fails if that engine can't answer it (e.g. "bits" for a table).
+    The server's default engine, given when it is started, is only a
+    preference: requests it can't answer are evaluated by the quickest
+    engine that can.
+
+    Each response is written on its own line with the same id, e.g.
+
+        {"id": 1, "ok": true, "result": {"valid": true, ...}}
+
+    Responses are written as soon as they are ready, so they may arrive in a
+    different order to the requests. Small requests are answered on the
+    event loop, others in a thread or a worker process, so a slow request
+    doesn't hold up the rest.
+
+    Complete results are kept in memory and reused for a request that is
+    the same in every respect: op, expressions, assumptions, whether to
+    falsify, engine and budget.
+    """
+
+    def __init__(self, workers=None, cache_size=CACHE_SIZE, cache_path=None,
+                 engine=None):
+        """
+        Constructor
+
+        __init__(int, int, str, str)
+        """
+        self.workers = workers
+        # Engine used for requests that don't name one, if not chosen for
+        # each request.
+        self.engine = engine
+        self.cache = ResultCache(cache_size)
+        # Persistent cache behind the in-memory one, if any.
+        self.cache_path = cache_path
+        # The pool is only started once a request needs it, which keeps
+        # startup quick for clients that only send small checks.
+        self._pool = None
+
+    def pool(self):
+        """Returns the process pool used for expensive requests, creating it
+        on first use.
+
+        pool() -> ProcessPoolExecutor
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers, worker_context(), initializer=log_to_stderr,
+                initargs=(logger.getEffectiveLevel(),))
+        return self._pool
+
+    def close(self):
+        """Shuts down the process pool, if it was started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def decode(line):
+        """Decodes a request line. Raises ValueError if it is not a JSON
+        object.
+
+        decode(str) -> dict
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            raise ValueError("Request is not valid JSON")
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        return request
+
+    @staticmethod
+    def parse_request(request):
+        """Validates a decoded request.
+
+        Returns the operation, the argument (with whitespace removed from
+        each expression), the number of random samples to try, the budget
+        limits, the name of the engine to use (or None) and the truth values
+        to assume for symbols. Raises ValueError if the request is malformed
+        or an expression has a syntax error.
+
+        parse_request(dict) -> tuple<str, tuple<str>, int, dict, str, dict>
+        """
+        op = request.get('op', 'validity')
+        if op not in OPS:
+            raise ValueError("Unknown op: " + str(op))
+        arg = request.get('argument')
+        if not isinstance(arg, list) or \
+                not all(isinstance(p, str) for p in arg):
+            raise ValueError("argument must be a list of expressions")
+        # Spaces are not handled by PropArg.evaluate() so remove.
+        arg = tuple(p.replace(' ', '') for p in arg)
+        if '' in arg or not arg:
+            raise ValueError("argument must not contain empty expressions")
+        if OPS[op] and len(arg) < 2:
+            raise ValueError("Argument must have at least one premise and "
+                             "one conclusion")
+        for premise in arg:
+            # Checked as in the GUI (see ArgCheck.check_premise()).
+            error = find_error(premise)
+            if error is not None:
+                raise ValueError(error[0])
+        falsify = request.get('falsify', 0)
+        if not isinstance(falsify, int) or falsify < 0:
+            raise ValueError("falsify must be a non-negative integer")
+        limits = request.get('budget') or {}
+        if not isinstance(limits, dict) or \
+                not set(limits) <= {'seconds', 'max_rows', 'max_bytes'} or \
+                not all(isinstance(v, (int, float)) and v >= 0
+                        for v in limits.values()):
+            raise ValueError("budget must map seconds, max_rows or max_bytes "
+                             "to non-negative numbers")
+        engine = request.get('engine')
+        if engine is not None and engine not in ENGINES:
+            raise ValueError("engine must be one of: " + ', '.join(ENGINES))
+        assumptions = request.get('assume') or {}
+        if not isinstance(assumptions, dict) or \
+                not all(v in (0, 1) and not isinstance(v, float)
+                        for v in assumptions.values()):
+            raise ValueError("assume must map symbols to 0 or 1")
+        return op, arg, falsify, limits, engine, assumptions
+
+    async def handle(self, line):
+        """Produces the response line for a request line.
+
+        handle(str) -> str
+        """
+        req_id = None
+        try:
+            request = self.decode(line)
+            req_id = request.get('id')
+            op, arg, falsify, limits, engine, assumptions = \
+                self.parse_request(request)
+            # Results of the random pass may be missing counter examples,
+            # so are kept apart from full results. So are results of each
+            # engine and budget asked for, so that a request naming an
+            # engine always has its result from that engine.
+            key = (op, arg, falsify > 0, tuple(sorted(assumptions.items())),
+                   engine, tuple(sorted(limits.items())))
+            result = self.cache.get(key)
+            if result is None:
+                args = (op, arg, self.cache_path, falsify, limits, engine,
+                        assumptions, self.engine)
+                n = len(set(c for p in arg for c in p if is_symbol(c))) - \
+                    len(assumptions)
+                loop = asyncio.get_running_loop()
+                if engines.small(arg, 2 ** n):
+                    # Quicker than handing it to a thread.
+                    result = run_request(*args)
+                elif n <= INLINE_SYMBOLS:
+                    # In a thread, so that other connections are answered
+                    # in the meantime.
+                    result = await loop.run_in_executor(None, run_request,
+                                                        *args)
+                else:
+                    result = await loop.run_in_executor(self.pool(),
+                                                        run_request, *args)
+                if not result.get('undecided'):
+                    self.cache.put(key, result)
+            response = {'id': req_id, 'ok': True, 'result': result}
+        except Exception as e:
+            response = {'id': req_id, 'ok': False, 'error': str(e)}
+        return json.dumps(response, ensure_ascii=False)
+
+    async def serve_stream(self, reader, writer):
+        """Serves requests from one client connection until it closes.
+
+        serve_stream(asyncio.StreamReader, asyncio.StreamWriter)
+        """
+        tasks = set()
+
+        async def respond(line):
+            writer.write((await self.handle(line) + '\n').encode('utf-8'))
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode('utf-8').strip()
+                if line:
+                    task = asyncio.ensure_future(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        """Listens on the Unix domain socket at path until cancelled. Only
+        processes on this machine can connect.
+
+        serve_unix(str)
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.serve_stream, path=path)
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+            os.remove(path)
+
+    async def serve_stdio(self):
+        """Serves requests read from stdin, writing responses to stdout,
+        until stdin is closed.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = set()
+
+        async def respond(line):
+            sys.stdout.write(await self.handle(line) + '\n')
+            sys.stdout.flush()
+
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+
+def serve(socket_path=None, workers=None, cache_path=None, engine=None):
+    """Runs the evaluation server on the Unix domain socket at socket_path,
+    or on stdin/stdout if no path is given. Results are also kept in the
+    persistent cache at cache_path, if given. Requests that don't name an
+    engine use engine, if given.
+
+    serve(str, int, str, str) -> int
+    """
+    server = EvalServer(workers, cache_path=cache_path, engine=engine)
+    try:
+        if socket_path:
+            asyncio.run(server.serve_unix(socket_path))
+        else:
+            asyncio.run(server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
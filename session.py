@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+"""
+session.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from expression import assumed_bits, compile_expressions
+
+# Start of every session file.
+MAGIC = b'LGCS'
+# Version of the format written. Files of a later version are refused, as
+# they may hold what this one doesn't know how to read.
+VERSION = 1
+# After the magic number: the version, and the length of the description
+# that follows, in bytes.
+HEADER = struct.Struct('<4sHI')
+# The truth columns start on a boundary of this many bytes.
+ALIGNMENT = 8
+# File name extension used by the GUI.
+EXTENSION = '.lcs'
+
+
+class Session(object):
+    """The state of an ArgCheck widget, as saved in a session file: the
+    expressions as they were typed, whether the last one is a conclusion,
+    and the verdict. Optionally, the truth table as well, as one column of
+    bits per symbol and expression, each with a bit per row as for
+    cache.pack_columns(). The table only has the rows where the
+    assumptions hold.
+
+    A session read by open_session() keeps its columns in the file, mapped
+    into memory, so only the parts of the table that are looked at are
+    read.
+    """
+
+    def __init__(self, premises, conc=False, output=None, valid=None,
+                 counter_examples=None, symbols=None, assumptions=None):
+        """
+        Constructor
+
+        __init__(list<str>, bool, str, bool, list<dict>, list<str>, dict)
+        """
+        # As typed, spaces included.
+        self.premises = premises
+        self.conc = conc
+        # The message shown after the conclusion, and what it says.
+        self.output = output
+        self.valid = valid
+        self.counter_examples = counter_examples or []
+        self.symbols = symbols or []
+        self.assumptions = assumptions or {}
+        # The truth columns, one after another, each column_size bytes.
+        self.rows = 0
+        self.column_count = 0
+        self.column_size = 0
+        self._columns = None
+
+    def set_columns(self, columns, rows):
+        """Keeps the truth columns of the table, as integers with a bit per
+        row, to be saved with the session. There are rows rows.
+
+        set_columns(list<int>, int) -> NoneType
+        """
+        self.rows = rows
+        self.column_count = len(columns)
+        self.column_size = (rows + 7) // 8
+        self._columns = columns
+
+    def has_columns(self):
+        """Returns True if the session holds its truth table.
+
+        has_columns() -> bool
+        """
+        return self._columns is not None
+
+    def column(self, k):
+        """Returns truth column k as bytes, or as a view of the file if the
+        session was read from one.
+
+        column(int) -> bytes or memoryview
+        """
+        if isinstance(self._columns, list):
+            return self._columns[k].to_bytes(self.column_size, 'little')
+        start = k * self.column_size
+        return self._columns[start:start + self.column_size]
+
+    def column_bits(self, k):
+        """Returns truth column k as an integer whose bit i is the truth
+        value in row i.
+
+        column_bits(int) -> int
+        """
+        if isinstance(self._columns, list):
+            return self._columns[k]
+        return int.from_bytes(self.column(k), 'little')
+
+    def value(self, row, k):
+        """Returns the truth value in a row of column k, reading only the
+        byte it is in.
+
+        value(int, int) -> int
+        """
+        if isinstance(self._columns, list):
+            return (self._columns[k] >> row) & 1
+        byte = self._columns[k * self.column_size + (row >> 3)]
+        return (byte >> (row & 7)) & 1
+
+    def expressions(self):
+        """Returns the expressions as PropArg takes them, without spaces.
+
+        expressions() -> list<str>
+        """
+        return [p.replace(' ', '') for p in self.premises]
+
+    def description(self):
+        """Returns everything but the truth columns, as saved at the start
+        of a session file.
+
+        description() -> dict
+        """
+        return {'premises': self.premises, 'conc': self.conc,
+                'output': self.output, 'valid': self.valid,
+                'counter_examples': self.counter_examples,
+                'symbols': self.symbols, 'assumptions': self.assumptions,
+                'rows': self.rows, 'columns': self.column_count}
+
+
+def table_columns(symbols, expressions, assumptions=None):
+    """Returns the truth columns of the table of expressions, symbols
+    first, as integers with a bit per row, for the rows where the
+    assumptions hold. Every column is worked out in one bit-parallel pass,
+    as for truth_table.LazyTruthTableModel.column_bits(). Raises ValueError
+    if an expression can't be parsed.
+
+    table_columns(list<str>, list<str>, dict) -> tuple<list<int>, int>
+    """
+    assumptions = assumptions or {}
+    rows = 2 ** (len(symbols) - len(assumptions))
+    evaluate = compile_expressions(expressions, symbols)
+    columns = assumed_bits(symbols, assumptions, 0, rows)
+    columns.extend(evaluate(columns, (1 << rows) - 1))
+    return columns, rows
+
+
+def padding(position):
+    # Bytes needed after position to reach the next ALIGNMENT boundary.
+    return -position % ALIGNMENT
+
+
+def save_session(path, session):
+    """Writes session to a file at path: the header, the description as
+    UTF-8 JSON, then the truth columns, if any, one after another. The file
+    is written under another name and then renamed, so a failed save
+    leaves any earlier file as it was, and nothing else behind.
+
+    save_session(str, Session) -> NoneType
+    """
+    description = json.dumps(session.description(),
+                              ensure_ascii=False).encode('utf-8')
+    temporary = path + '.tmp'
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(description)))
+            f.write(description)
+            f.write(b'\0' * padding(HEADER.size + len(description)))
+            # One column at a time, so the table is never held twice.
+            for k in range(session.column_count):
+                f.write(session.column(k))
+        os.replace(temporary, path)
+    except BaseException:
+        # Nothing is left behind under the other name.
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def check_description(info):
+    # Raises ValueError unless info, as read from a session file, has every
+    # field of Session.description(), of the right types, and columns that
+    # fit the expressions.
+    fields = {'premises': list, 'conc': bool, 'output': (str, type(None)),
+              'valid': (bool, type(None)), 'counter_examples': list,
+              'symbols': list, 'assumptions': dict, 'rows': int,
+              'columns': int}
+    if not isinstance(info, dict):
+        raise ValueError("no description")
+    for name, kind in fields.items():
+        if not isinstance(info.get(name), kind):
+            raise ValueError("missing or invalid " + name)
+    if not all(isinstance(p, str) for p in info['premises']) or \
+            not all(isinstance(c, str) for c in info['symbols']):
+        raise ValueError("invalid expressions")
+    if not all(v in (0, 1) and isinstance(v, int)
+               for v in info['assumptions'].values()):
+        raise ValueError("invalid assumptions")
+    if info['columns']:
+        free = len(info['symbols']) - len(info['assumptions'])
+        if info['columns'] != len(info['symbols']) + len(info['premises']) \
+                or free < 0 or info['rows'] != 2 ** free:
+            raise ValueError("truth table doesn't fit the expressions")
+
+
+def open_session(path):
+    """Reads the session saved in the file at path. Only the header and
+    description are read; the truth columns are mapped into memory. Raises
+    ValueError if the file isn't a session file this version can read, its
+    description is missing a field or doesn't fit its truth table, or it is
+    cut short, and OSError if it can't be opened.
+
+    open_session(str) -> Session
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError("Not a Logicheck session file: " + path)
+        magic, version, length = HEADER.unpack(header)
+        if version > VERSION:
+            raise ValueError("Session file is from a later version of "
+                             "Logicheck: " + path)
+        try:
+            info = json.loads(f.read(length).decode('utf-8'))
+        except ValueError:
+            # Not UTF-8, or not JSON.
+            info = None
+        try:
+            check_description(info)
+        except ValueError as e:
+            raise ValueError("Not a Logicheck session file (%s): %s" %
+                             (e, path))
+        session = Session(info['premises'], info['conc'], info['output'],
+                          info['valid'], info['counter_examples'],
+                          info['symbols'], info['assumptions'])
+        if not info['columns']:
+            return session
+        session.rows = info['rows']
+        session.column_count = info['columns']
+        session.column_size = (session.rows + 7) // 8
+        start = HEADER.size + length
+        start += padding(start)
+        end = start + session.column_count * session.column_size
+        if os.fstat(f.fileno()).st_size < end:
+            raise ValueError("Session file is cut short: " + path)
+        # Mapped only once every check has passed, so nothing is left open
+        # if one fails. The mapping stays open after the file is closed, and
+        # pages of it are only read when they are used.
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    session._columns = memoryview(mapped)[start:end]
+    return session
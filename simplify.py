@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+"""
+simplify.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from expression import SYMBOL, NOT, AND, OR, XOR, IFF, IF, operators, \
+    parse, render
+
+# Node kind for a truth value that doesn't depend on any symbol. Only used
+# while simplifying: every constant is folded into the nodes around it, so
+# one can only be left as a whole expression.
+CONSTANT = 'c'
+
+# Operators whose operands can be swapped without changing their value.
+SYMMETRIC = (AND, OR, XOR, IFF)
+
+
+def size(expression):
+    """Returns the number of operators in an expression, or 0 for a
+    constant.
+
+    size(str or int) -> int
+    """
+    if expression in (0, 1):
+        return 0
+    return sum(expression.count(op) for op in operators)
+
+
+class Simplification(object):
+    """The expressions of an argument as rewritten by simplify_argument(),
+    in the same order, and how much smaller they are. Each is either an
+    expression with the same truth values as the original, or 0 or 1 if it
+    is always false or always true.
+    """
+
+    def __init__(self, expressions, before):
+        """
+        Constructor
+
+        __init__(list<str or int>, int)
+        """
+        self.expressions = expressions
+        # Number of operators in the original expressions and now.
+        self.before = before
+        self.after = sum(size(p) for p in expressions)
+
+    def tautologies(self):
+        """Returns the positions of the expressions that are always true.
+
+        tautologies() -> list<int>
+        """
+        return [k for k, p in enumerate(self.expressions) if p == 1]
+
+    def contradictions(self):
+        """Returns the positions of the expressions that are always false.
+
+        contradictions() -> list<int>
+        """
+        return [k for k, p in enumerate(self.expressions) if p == 0]
+
+    def __str__(self):
+        # E.g. 'Simplified from 12 operators to 7. Always true: 2.'
+        text = 'Simplified from %d operators to %d.' % (self.before,
+                                                        self.after)
+        for name, positions in (('Always true', self.tautologies()),
+                                ('Always false', self.contradictions())):
+            if positions:
+                text += ' %s: %s.' % (name, ', '.join(str(k + 1)
+                                                      for k in positions))
+        return text
+
+
+class Simplifier(object):
+    """Rewrites parsed expressions (see expression.parse()) into ones with
+    the same truth values and no more operators: constants are folded,
+    double negations removed, idempotent, absorbed and complementary
+    operands reduced, and negated operands of ⇒, ⇔ and ⨁ taken into the
+    operator.
+
+    Nodes are kept in one list, as for parse(), and shared between the
+    expressions simplified, so each distinct sub-expression is only
+    simplified once. Symbols with truth values in assumptions are replaced
+    by them.
+    """
+
+    def __init__(self, assumptions=None):
+        """
+        Constructor
+
+        __init__(dict)
+        """
+        self.assumptions = assumptions or {}
+        self.nodes = []
+        # Index of each distinct node.
+        self._index = {}
+        self.false = self._add((CONSTANT, 0))
+        self.true = self._add((CONSTANT, 1))
+
+    def simplify(self, premise):
+        """Returns premise simplified, as an expression with every operator
+        but the outermost bracketed, or as 0 or 1 if it is always false or
+        always true. Raises ValueError if premise can't be parsed.
+
+        simplify(str) -> str or int
+        """
+        # Index of the simplified node for each node of premise.
+        local = []
+        for node in parse(premise):
+            op = node[0]
+            if op == SYMBOL:
+                if node[1] in self.assumptions:
+                    k = self.true if self.assumptions[node[1]] else self.false
+                else:
+                    k = self._add(node)
+            elif op == NOT:
+                k = self._not(local[node[1]])
+            else:
+                k = self._binary(op, local[node[1]], local[node[2]])
+            local.append(k)
+        root = local[-1]
+        if self.nodes[root][0] == CONSTANT:
+            return self.nodes[root][1]
+        return render(self.nodes, root)
+
+    def _add(self, node):
+        if node not in self._index:
+            self._index[node] = len(self.nodes)
+            self.nodes.append(node)
+        return self._index[node]
+
+    def _negated(self, k):
+        # The node that node k is the negation of, or None.
+        node = self.nodes[k]
+        return node[1] if node[0] == NOT else None
+
+    def _complementary(self, a, b):
+        # Whether one node is the negation of the other.
+        return self._negated(a) == b or self._negated(b) == a
+
+    def _has_operand(self, k, op, a):
+        # Whether node k is an op node with a as one of its operands.
+        node = self.nodes[k]
+        return node[0] == op and a in node[1:]
+
+    def _not(self, a):
+        if a == self.false:
+            return self.true
+        if a == self.true:
+            return self.false
+        node = self.nodes[a]
+        if node[0] == NOT:
+            return node[1]
+        # ¬(p ⨁ q) is p ⇔ q, and the other way round.
+        if node[0] == XOR:
+            return self._add((IFF,) + node[1:])
+        if node[0] == IFF:
+            return self._add((XOR,) + node[1:])
+        return self._add((NOT, a))
+
+    def _binary(self, op, a, b):
+        false, true = self.false, self.true
+        if op == AND:
+            if a == false or b == false or self._complementary(a, b):
+                return false
+            if a == true:
+                return b
+            if b == true or a == b:
+                return a
+            # Absorption: p ∧ (p ∨ q) is p.
+            if self._has_operand(b, OR, a):
+                return a
+            if self._has_operand(a, OR, b):
+                return b
+        elif op == OR:
+            if a == true or b == true or self._complementary(a, b):
+                return true
+            if a == false:
+                return b
+            if b == false or a == b:
+                return a
+            # Absorption: p ∨ (p ∧ q) is p.
+            if self._has_operand(b, AND, a):
+                return a
+            if self._has_operand(a, AND, b):
+                return b
+        elif op == IF:
+            if a == false or b == true or a == b:
+                return true
+            if a == true:
+                return b
+            if b == false:
+                return self._not(a)
+            if self._complementary(a, b):
+                # (¬p) ⇒ p is p, and p ⇒ (¬p) is ¬p.
+                return b
+            # p ⇒ (p ∨ q) and (p ∧ q) ⇒ p are always true.
+            if self._has_operand(b, OR, a) or self._has_operand(a, AND, b):
+                return true
+            if self._negated(a) is not None:
+                # (¬p) ⇒ q is p ∨ q, without the negation.
+                return self._binary(OR, self._negated(a), b)
+        else:  # XOR or IFF
+            # p ⇔ q is true when p ⨁ q is false.
+            same = true if op == IFF else false
+            if a == b:
+                return same
+            if self._complementary(a, b):
+                return self._not(same)
+            if a == same:
+                return b
+            if b == same:
+                return a
+            if a == self._not(same):
+                return self._not(b)
+            if b == self._not(same):
+                return self._not(a)
+            p, q = self._negated(a), self._negated(b)
+            if p is not None and q is not None:
+                # (¬p) ⇔ (¬q) is p ⇔ q.
+                return self._binary(op, p, q)
+            if p is not None or q is not None:
+                # (¬p) ⇔ q is p ⨁ q.
+                other = XOR if op == IFF else IFF
+                return self._binary(other, a if p is None else p,
+                                    b if q is None else q)
+        if op in SYMMETRIC and b < a:
+            # The same operands in either order share a node.
+            a, b = b, a
+        return self._add((op, a, b))
+
+
+def simplify_argument(arg, assumptions=None):
+    """Simplifies each of the expressions in arg, taking any symbols in
+    assumptions to have the truth values given there. Raises ValueError if
+    an expression can't be parsed (see expression.parse()).
+
+    simplify_argument(list<str>, dict) -> Simplification
+    """
+    simplifier = Simplifier(assumptions)
+    expressions = [simplifier.simplify(p) for p in arg]
+    return Simplification(expressions, sum(size(p) for p in arg))
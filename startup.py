@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+startup.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+# Default number of fresh interpreters started.
+RUNS = 10
+# Phases of start-up, in the order they happen.
+PHASES = ["import Qt", "import logicheck", "QApplication", "window",
+          "first paint"]
+
+
+def measure():
+    """Starts the GUI as logicheck.py does and returns the time in seconds
+    taken by each of PHASES, ending once the event loop has drawn the
+    window. Only meaningful in a fresh interpreter, since modules that are
+    already imported cost nothing.
+
+    measure() -> dict<str, float>
+    """
+    times = [time.perf_counter()]
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    times.append(time.perf_counter())
+    from logicheck import Logicheck
+    times.append(time.perf_counter())
+    app = QApplication(sys.argv[:1])
+    times.append(time.perf_counter())
+    window = Logicheck()
+    times.append(time.perf_counter())
+    window.show()
+    # The timer only fires once the events queued by show() are handled.
+    QTimer.singleShot(0, app.quit)
+    app.exec_()
+    times.append(time.perf_counter())
+    return {phase: times[k + 1] - times[k] for k, phase in enumerate(PHASES)}
+
+
+def run(runs=RUNS, out=None):
+    """Starts the GUI in runs fresh interpreters, one after another, and
+    returns the time in seconds each phase took in each run, with "total"
+    for the time from starting the interpreter to it exiting. Progress is
+    written to out, if given.
+
+    run(int, file) -> list<dict<str, float>>
+    """
+    results = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    for k in range(runs):
+        start = time.perf_counter()
+        child = subprocess.run([sys.executable, os.path.abspath(__file__),
+                                "--child"], cwd=here, stdout=subprocess.PIPE,
+                               universal_newlines=True, check=True)
+        times = json.loads(child.stdout.splitlines()[-1])
+        times["total"] = time.perf_counter() - start
+        results.append(times)
+        if out is not None:
+            out.write("run %d: %.1f ms\n" % (k + 1, 1000 * times["total"]))
+    return results
+
+
+def report(results, out):
+    """Writes the median and least time of each phase in results, as
+    returned by run(), to out.
+
+    report(list<dict<str, float>>, file)
+    """
+    out.write("%-18s %10s %10s\n" % ("phase", "median ms", "min ms"))
+    for phase in PHASES + ["total"]:
+        times = [times[phase] for times in results]
+        out.write("%-18s %10.1f %10.1f\n" % (phase, 1000 * median(times),
+                                            1000 * min(times)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time how long the Logicheck GUI takes to start, in "
+                    "fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=RUNS,
+                        help="number of times to start it (default: %d)"
+                             % RUNS)
+    # Used by run() to time one start-up.
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.child:
+        print(json.dumps(measure()))
+        sys.exit(0)
+    report(run(options.runs, sys.stdout), sys.stdout)
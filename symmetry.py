@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+"""
+symmetry.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from itertools import combinations, product
+from math import comb
+
+from expression import SYMBOL, NOT, AND, OR, XOR, IFF, parse
+
+# Fewest free symbols worth looking for symmetry in: below this the truth
+# table is quicker to go through than the search.
+SYMMETRY_SYMBOLS = 8
+# Most swaps of two symbols tried before the search gives up. Symmetry only
+# saves work, so missing some of it is safe.
+MAX_SWAPS = 256
+
+# Operators whose operands can be swapped without changing their value.
+SYMMETRIC = (AND, OR, XOR, IFF)
+
+
+class Symmetry(object):
+    """Classes of interchangeable symbols: any rearrangement of the truth
+    values of the symbols in a class leaves the argument as it was, so it
+    is true or false, valid or not, in the same way. Only the number of
+    1's in each class matters, and each set of truth values stands for its
+    orbit - the sets it can be rearranged into - which has
+    comb(len(class), ones) members per class.
+    """
+
+    def __init__(self, symbols, classes, assumptions=None):
+        """
+        Constructor
+
+        __init__(list<str>, list<list<str>>, dict)
+        """
+        # All the symbols, in truth table order, and the truth values
+        # assumed for some of them, which are the same in every row.
+        self.symbols = symbols
+        self.assumptions = assumptions or {}
+        # Each class in the order of symbols, with at least two members.
+        self.classes = classes
+        position = {c: j for j, c in enumerate(symbols)}
+        self._positions = [[position[c] for c in members]
+                           for members in classes]
+        grouped = set(c for members in classes for c in members)
+        self._others = [position[c] for c in symbols
+                        if c not in grouped and c not in self.assumptions]
+
+    def orbits(self):
+        """Returns the number of orbits, i.e. the number of rows
+        representatives() goes through.
+
+        orbits() -> int
+        """
+        n = 2 ** len(self._others)
+        for members in self.classes:
+            n *= len(members) + 1
+        return n
+
+    def representatives(self):
+        """Yields one set of truth values from each orbit where the
+        assumptions hold, as a tuple in the order of self.symbols, along
+        with the size of its orbit. Each is the first of its orbit in truth
+        table order: the 1's of each class go to its last symbols.
+
+        representatives() -> generator<tuple<tuple<int>, int>>
+        """
+        row = [self.assumptions.get(c, 0) for c in self.symbols]
+        counts = [range(len(members) + 1) for members in self.classes]
+        for ones in product(*counts):
+            size = 1
+            for positions, k in zip(self._positions, ones):
+                size *= comb(len(positions), k)
+                cut = len(positions) - k
+                for j in positions[:cut]:
+                    row[j] = 0
+                for j in positions[cut:]:
+                    row[j] = 1
+            for values in product((0, 1), repeat=len(self._others)):
+                for j, v in zip(self._others, values):
+                    row[j] = v
+                yield tuple(row), size
+
+    def expand(self, row):
+        """Returns every set of truth values in the orbit of row, in truth
+        table order.
+
+        expand(tuple<int>) -> list<tuple<int>>
+        """
+        # The ways of placing each class's 1's.
+        choices = []
+        for positions in self._positions:
+            ones = sum(row[j] for j in positions)
+            choices.append([(positions, set(chosen)) for chosen in
+                            combinations(positions, ones)])
+        rows = []
+        for placing in product(*choices):
+            values = list(row)
+            for positions, chosen in placing:
+                for j in positions:
+                    values[j] = 1 if j in chosen else 0
+            rows.append(tuple(values))
+        # The first symbol changes slowest.
+        rows.sort()
+        return rows
+
+
+class SymmetryFinder(object):
+    """Finds interchangeable symbols by swapping two at a time and checking
+    whether the argument is left the same, as for the search for the
+    automorphisms of a graph. The nodes of the expressions are numbered so
+    that equal sub-expressions get the same number, with the operands of
+    ∧, ∨, ⨁ and ⇔ in either order, which makes comparing a whole argument
+    a matter of comparing a number per expression.
+
+    Only swaps that are symmetries are looked for, not every rearrangement,
+    but together they give all of each class of interchangeable symbols:
+    if swapping a and b, and swapping b and c, leave the argument the
+    same, so does swapping a and c.
+    """
+
+    def __init__(self, expressions, test=True):
+        """
+        Constructor
+
+        expressions are as given by simplify.simplify_argument(). If test
+        == True, the last one is a conclusion, so can only be swapped with
+        itself; otherwise, any expressions can be swapped.
+
+        __init__(list<str or int>, bool)
+        """
+        self.test = test
+        self._parsed = [p if p in (0, 1) else parse(p) for p in expressions]
+        # Number of each distinct node, keyed by its kind and the numbers
+        # of its operands.
+        self._numbers = {}
+        self._base = [self._number(k, {}) for k in range(len(expressions))]
+        # Expressions each symbol appears in.
+        self._within = {}
+        for k, p in enumerate(expressions):
+            if p in (0, 1):
+                continue
+            for node in self._parsed[k]:
+                if node[0] == SYMBOL:
+                    self._within.setdefault(node[1], set()).add(k)
+        self.swaps = 0
+
+    def _number(self, k, swap):
+        # The number of expression k with the symbols in swap replaced.
+        nodes = self._parsed[k]
+        if nodes in (0, 1):
+            # Constants are numbered like any other node.
+            return self._numbers.setdefault(nodes, len(self._numbers))
+        local = []
+        for node in nodes:
+            op = node[0]
+            if op == SYMBOL:
+                key = (SYMBOL, swap.get(node[1], node[1]))
+            elif op == NOT:
+                key = (NOT, local[node[1]])
+            else:
+                a, b = local[node[1]], local[node[2]]
+                if op in SYMMETRIC and b < a:
+                    a, b = b, a
+                key = (op, a, b)
+            local.append(self._numbers.setdefault(key, len(self._numbers)))
+        return local[-1]
+
+    def _form(self, numbers):
+        # What a swap has to leave the same: the premises in any order, and
+        # the conclusion.
+        if self.test:
+            return sorted(numbers[:-1]), numbers[-1:]
+        return sorted(numbers), []
+
+    def signature(self, c):
+        """Returns what can't change when symbol c is swapped with another
+        that is interchangeable with it, so only symbols with the same
+        signature need to be tried.
+
+        signature(str) -> tuple
+        """
+        within = self._within.get(c, set())
+        conclusion = self.test and len(self._parsed) - 1 in within
+        return len(within), conclusion
+
+    def interchangeable(self, a, b):
+        """Returns True if swapping symbols a and b leaves the argument the
+        same.
+
+        interchangeable(str, str) -> bool
+        """
+        self.swaps += 1
+        swap = {a: b, b: a}
+        numbers = list(self._base)
+        for k in self._within.get(a, set()) | self._within.get(b, set()):
+            numbers[k] = self._number(k, swap)
+        return self._form(numbers) == self._form(self._base)
+
+    def classes(self, symbols):
+        """Returns the classes of interchangeable symbols among symbols,
+        each in the order of symbols, leaving out symbols interchangeable
+        with no other. Stops looking after MAX_SWAPS swaps.
+
+        classes(list<str>) -> list<list<str>>
+        """
+        groups = []
+        # Classes found so far, by signature.
+        found = {}
+        for c in symbols:
+            candidates = found.setdefault(self.signature(c), [])
+            for members in candidates:
+                if self.swaps < MAX_SWAPS and \
+                        self.interchangeable(members[0], c):
+                    members.append(c)
+                    break
+            else:
+                members = [c]
+                candidates.append(members)
+                groups.append(members)
+        return [members for members in groups if len(members) > 1]
+
+
+def find_symmetry(expressions, symbols, assumptions=None, test=True):
+    """Returns the symmetry of an argument, given as its expressions
+    simplified under the assumptions (see simplify.simplify_argument()), its
+    symbols in truth table order and the assumptions. Only the symbols
+    without assumed truth values are rearranged. Returns None if there are
+    too few of them to be worth it, or no two are interchangeable.
+
+    find_symmetry(list<str or int>, list<str>, dict, bool)
+        -> Symmetry or NoneType
+    """
+    assumptions = assumptions or {}
+    free = [c for c in symbols if c not in assumptions]
+    if len(free) < SYMMETRY_SYMBOLS:
+        return None
+    classes = SymmetryFinder(expressions, test).classes(free)
+    if not classes:
+        return None
+    return Symmetry(symbols, classes, assumptions)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+
+"""
+syntax.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+from itertools import accumulate, repeat
+
+from expression import NOT, operators, is_symbol
+
+# Syntax error messages. Errors found at a single position are stored by
+# their number in this list, so 0 means no error.
+MESSAGES = ['',
+            "Syntax error: cannot use 0 or 1 as a symbol",
+            "Syntax error: invalid symbol(s) - must be alphanumeric",
+            "Syntax error: input starts with a closed bracket",
+            "Syntax error: bracket immediately follows first character",
+            "Syntax error: input starts with an operator",
+            "Syntax error: input cannot be 2 characters long",
+            "Syntax error: brackets do not close",
+            "Syntax error: proposition(s) represented by multiple symbols",
+            "Syntax error: incorrect bracket use",
+            "Syntax error: consecutive brackets",
+            "Syntax error: symbol immediately follows close bracket",
+            "Syntax error: adjacent operators",
+            "Syntax error: sub-expression needs brackets",
+            "Syntax error: incorrect bracket position",
+            "Syntax error: negation needs brackets",
+            "Syntax error: no symbol next to operator",
+            "Syntax error: input contains only brackets"]
+(DIGIT, INVALID, STARTS_CLOSED, FIRST_BRACKET, STARTS_OPERATOR, TWO_LONG,
+ UNCLOSED, MULTIPLE, BRACKET_USE, CONSECUTIVE, AFTER_CLOSE, ADJACENT,
+ SUB_EXPRESSION, BRACKET_POSITION, NEGATION, NO_SYMBOL, ONLY_BRACKETS) = \
+    range(1, len(MESSAGES))
+
+# How far the check at one position looks either side of it (see
+# check_position()). An edit is re-checked this far beyond its ends.
+REACH = 3
+
+# Change in the depth of brackets made by each character.
+DEPTHS = {'(': 1, ')': -1}
+
+# The first position that isn't 0 in a bytearray.
+NONZERO = re.compile(b'[^\x00]')
+
+
+def check_position(s, i):
+    """Checks the character at position i of s, which is neither the first
+    nor the last, against its neighbours. This is the part of
+    ArgCheck.check_premise() that is repeated along the expression; it only
+    looks at s[i - 2:i + 3], and whether i is past position 2.
+
+    Returns the number of an error that stops the check (see MESSAGES) or
+    0, whether a sub-expression needs brackets (which doesn't stop the
+    check), and whether the character is a symbol or operator, which means
+    the expression isn't just brackets.
+
+    check_position(str, int) -> tuple<int, bool, bool>
+    """
+    c = s[i]
+    before = s[i - 1]
+    after = s[i + 1]
+    if is_symbol(c):
+        if is_symbol(before) or is_symbol(after):
+            return MULTIPLE, False, True
+        if before == ')' or after == '(':
+            return BRACKET_USE, False, True
+        if before == '(' and after == ')':
+            return BRACKET_USE, False, True
+        return 0, False, True
+    if c == '(' and before == ')':
+        return CONSECUTIVE, False, False
+    if c == ')' and before == '(':
+        return CONSECUTIVE, False, False
+    if c == ')' and is_symbol(after):
+        return AFTER_CLOSE, False, False
+    if c == '(' or c == ')':
+        return 0, False, False
+    # An operator. Any operator before it has been passed, as the check
+    # would have stopped otherwise.
+    if c not in operators:
+        return INVALID, False, False
+    if i > 1 and before in operators:
+        return ADJACENT, False, False
+    sub = i > 2 and s[i - 2] in operators and c != NOT
+    if c == NOT:
+        if before != '(' or after == ')':
+            return BRACKET_POSITION, sub, True
+        # Past the end counts as not a close bracket.
+        if after != '(' and s[i + 2:i + 3] != ')':
+            return NEGATION, sub, True
+    else:
+        if before == '(' or after == ')':
+            return BRACKET_POSITION, sub, True
+        if not is_symbol(before) and not is_symbol(after) and \
+                before != ')' and after != '(':
+            return NO_SYMBOL, sub, True
+    return 0, sub, True
+
+
+def common_prefix(a, b):
+    """Returns the length of the longest common start of a and b, comparing
+    whole slices rather than a character at a time.
+
+    common_prefix(str, str) -> int
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class SyntaxChecker(object):
+    """Checks an expression for syntax errors as it is edited, giving the
+    same errors as ArgCheck.check_premise() along with where they are.
+
+    The result of check_position() is kept for every position, so after an
+    edit only the changed characters and those within REACH of them are
+    checked again. Finding the first error is then a search of the stored
+    results. Spaces are ignored, as when an expression is added.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+
+        __init__()
+        """
+        # The expression without spaces.
+        self.text = ''
+        # The expression as last given to update(), with any spaces.
+        self.raw = ''
+        # Results of check_position(), one byte per position of text:
+        # errors that stop the check, sub-expressions needing brackets,
+        # and symbols or operators.
+        self._stops = bytearray()
+        self._subs = bytearray()
+        self._marks = bytearray()
+        # Number of times each symbol appears.
+        self._symbol_counts = {}
+
+    def update(self, raw):
+        """Brings the checker up to date with the expression raw, checking
+        only the part that changed since the last update.
+
+        update(str) -> NoneType
+        """
+        self.raw = raw
+        new = raw.replace(' ', '')
+        old = self.text
+        if new == old:
+            return
+        # The changed part is old[start:old_end], now new[start:new_end].
+        start = common_prefix(old, new)
+        tail = common_prefix(old[start:][::-1], new[start:][::-1])
+        old_end = len(old) - tail
+        new_end = len(new) - tail
+        self.text = new
+        for c in old[start:old_end]:
+            if is_symbol(c):
+                self._symbol_counts[c] -= 1
+                if not self._symbol_counts[c]:
+                    del self._symbol_counts[c]
+        for c in new[start:new_end]:
+            if is_symbol(c):
+                self._symbol_counts[c] = self._symbol_counts.get(c, 0) + 1
+        # Check again everything close enough to the change to be affected,
+        # including the first and last positions, which aren't checked.
+        low = max(0, start - REACH)
+        n = len(new)
+        high = min(n, new_end + REACH)
+        stops, subs, marks = bytearray(), bytearray(), bytearray()
+        for i in range(low, high):
+            if i == 0 or i == n - 1:
+                stop, sub, mark = 0, False, False
+            else:
+                stop, sub, mark = check_position(new, i)
+            stops.append(stop)
+            subs.append(sub)
+            marks.append(mark)
+        old_high = min(len(old), old_end + REACH)
+        self._stops[low:old_high] = stops
+        self._subs[low:old_high] = subs
+        self._marks[low:old_high] = marks
+
+    def symbols(self):
+        """Returns the symbols in the expression.
+
+        symbols() -> set<str>
+        """
+        return set(self._symbol_counts)
+
+    def error(self):
+        """Returns the syntax error in the expression, as the message that
+        ArgCheck.check_premise() would give and its position (ignoring
+        spaces), or None if there is no error.
+
+        error() -> tuple<str, int> or NoneType
+        """
+        number, position = self._error()
+        if not number:
+            return None
+        return MESSAGES[number], position
+
+    def raw_position(self, position):
+        """Converts a position in the expression without spaces to one in
+        the expression as given, with spaces.
+
+        raw_position(int) -> int
+        """
+        # Go through the runs of characters other than spaces.
+        for run in re.finditer('[^ ]+', self.raw):
+            if position < len(run.group()):
+                return run.start() + position
+            position -= len(run.group())
+        return len(self.raw)
+
+    def _error(self):
+        # Same checks, in the same order, as ArgCheck.check_premise(). The
+        # checks repeated along the expression are the stored results of
+        # check_position(). Returns an error number and position.
+        s = self.text
+        n = len(s)
+        if n == 0:
+            return 0, 0
+        if '0' in s or '1' in s:
+            return DIGIT, min(k for k in (s.find('0'), s.find('1'))
+                              if k != -1)
+        if n == 1:
+            return (0, 0) if is_symbol(s) else (INVALID, 0)
+        if s[0] == ')':
+            return STARTS_CLOSED, 0
+        if is_symbol(s[0]):
+            if s[1] == '(' or s[1] == ')':
+                return FIRST_BRACKET, 1
+        elif s[0] != '(':
+            return STARTS_OPERATOR, 0
+        if n == 2:
+            return TWO_LONG, 1
+        if s.count('(') != s.count(')'):
+            return UNCLOSED, self._unclosed()
+        if not is_symbol(s[-1]) and s[-1] not in operators and \
+                s[-1] != '(' and s[-1] != ')':
+            return INVALID, n - 1
+        stop = NONZERO.search(self._stops)
+        sub = NONZERO.search(self._subs, 0, stop.start() if stop else n)
+        mark = NONZERO.search(self._marks, 0,
+                              stop.start() + 1 if stop else n)
+        # The expression is only brackets if it starts with one and no
+        # symbol or operator is reached before the check stops.
+        if s[0] == '(' and mark is None:
+            return ONLY_BRACKETS, 0
+        if stop is not None:
+            return self._stops[stop.start()], stop.start()
+        if sub is not None:
+            return SUB_EXPRESSION, sub.start()
+        return 0, 0
+
+    def _unclosed(self):
+        # Position of a bracket without a partner: the first close bracket
+        # with no open bracket before it, or else the last open bracket
+        # left open. Works from the depth of brackets after each position,
+        # which only goes up or down by one at a time.
+        depths = list(accumulate(map(DEPTHS.get, self.text, repeat(0))))
+        if min(depths) < 0:
+            return depths.index(-1)
+        # The last open bracket taking the depth up to where it ends.
+        final = depths[-1]
+        if final - 1 not in depths:
+            return 0
+        return len(depths) - depths[::-1].index(final - 1)
+
+
+def find_error(premise):
+    """Checks premise for syntax errors, returning the first error found,
+    as a message and its position, or None. See SyntaxChecker.
+
+    find_error(str) -> tuple<str, int> or NoneType
+    """
+    checker = SyntaxChecker()
+    checker.update(premise)
+    return checker.error()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+test_batch.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+import random
+import unittest
+
+import fuzz
+from batch import check_batch, run_batch
+from proparg import PropArg
+
+SYMBOLS = 'ABCDEFGHPQRSTU'
+
+
+def chain(symbols):
+    # The exclusive ors of pairs of symbols, or'd together, with brackets.
+    first = '(%s⨁%s)' % (symbols[0], symbols[1])
+    if len(symbols) == 2:
+        return first
+    return '%s∨(%s)' % (first, chain(symbols[2:]))
+
+
+# Larger than the rest, so its chunk tends to finish after later ones.
+LARGE = [chain(SYMBOLS), 'A']
+
+
+def arguments(count):
+    # Generated arguments of two or more expressions, with a large one
+    # first and a malformed one half way.
+    rng = random.Random(0)
+    args = []
+    while len(args) < count:
+        arg = fuzz.generate_argument(rng)
+        if len(arg) > 1:
+            args.append(arg)
+    args[0] = LARGE
+    args[count // 2] = ['A', '(A∧']
+    return args
+
+
+class TestOrder(unittest.TestCase):
+
+    def test_ordered(self):
+        args = arguments(40)
+        results = list(check_batch(args, workers=2, chunk_size=1))
+        self.assertEqual([r.index for r in results], list(range(40)))
+        for result, arg in zip(results, args):
+            self.assertEqual(result.argument, arg)
+        self.assertFalse(results[20].ok)
+        self.assertEqual(sum(not r.ok for r in results), 1)
+        # The verdicts are those of the arguments they are given with.
+        for result in results[1:20]:
+            prop_arg = PropArg(list(result.argument))
+            prop_arg.evaluate()
+            self.assertEqual(result.result['valid'], prop_arg.valid)
+
+    def test_unordered(self):
+        args = arguments(40)
+        results = list(check_batch(args, workers=2, chunk_size=3,
+                                   ordered=False))
+        self.assertEqual(sorted(r.index for r in results), list(range(40)))
+        for result in results:
+            self.assertEqual(result.argument, args[result.index])
+
+    def test_line_numbers(self):
+        # Blank lines are skipped but counted.
+        lines = [json.dumps(['A⇒B', 'A']), '', '  ', 'not json',
+                 json.dumps(['A', 'A']), '']
+        out = io.StringIO()
+        status = run_batch(io.StringIO('\n'.join(lines) + '\n'), out,
+                           workers=1)
+        self.assertEqual(status, 1)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['index'] for r in results], [0, 3, 4])
+        self.assertEqual([r['ok'] for r in results], [True, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+"""
+test_budget.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import proparg
+from budget import Budget, Undecided
+from engines import BITS, ROWS, VALIDITY, ENGINES
+from proparg import PropArg
+
+SYMBOLS = 'ABCDEFGHPQRSTUVWX'
+# Seventeen symbols, more than one block of PropArg.evaluate_columns(), and
+# one counter example: the first ten false and the rest true.
+WIDE = ['(¬%s)' % c for c in SYMBOLS[:10]] + \
+    ['(¬%s)∨((¬%s)∨((¬%s)∨((¬%s)∨((¬%s)∨((¬%s)∨(¬%s))))))' %
+     tuple(SYMBOLS[10:])]
+# Eight symbols and 8 counter examples, one for each way of making the
+# premises true with A false.
+PAIRS = ['A⨁B', 'C⨁D', 'E⨁F', 'G⨁H', 'A']
+
+
+def counter_example(prop_arg, vals):
+    # Whether vals makes every premise true and the conclusion false.
+    truth = [prop_arg.det(p) for p in prop_arg.convert(prop_arg.symbols(),
+                                                       vals)]
+    return truth[-1] == 0 and all(truth[:-1])
+
+
+class Blocks(Budget):
+    # A budget whose deadline passes after a given number of blocks.
+
+    def __init__(self, blocks):
+        Budget.__init__(self, seconds=60)
+        self.blocks = blocks
+
+    def expired(self):
+        if self.blocks == 0:
+            return "time limit of 60 seconds reached"
+        self.blocks -= 1
+        return None
+
+
+class TestBitDeadline(unittest.TestCase):
+
+    def test_finishes_within_deadline(self):
+        prop_arg = PropArg(list(WIDE))
+        output = prop_arg.evaluate_columns(budget=Blocks(2))
+        self.assertNotIsInstance(output, Undecided)
+        self.assertFalse(prop_arg.valid)
+        self.assertEqual(len(prop_arg.counter_examples), 1)
+
+    def test_stops_between_blocks(self):
+        for blocks in range(2):
+            prop_arg = PropArg(list(WIDE))
+            output = prop_arg.evaluate_columns(budget=Blocks(blocks))
+            self.assertIsInstance(output, Undecided)
+            self.assertEqual(output.rows_done, blocks * proparg.COLUMN_BLOCK)
+            self.assertEqual(output.rows_total, 2 ** len(SYMBOLS))
+            # Whatever was found is a real counter example.
+            for vals in output.counter_examples:
+                self.assertTrue(counter_example(prop_arg, vals), vals)
+            self.assertEqual(output.valid, prop_arg.valid)
+            self.assertIsNone(prop_arg.models)
+
+    def test_expired_deadline_through_engine(self):
+        prop_arg = PropArg(list(WIDE))
+        output = ENGINES[BITS].run(prop_arg, True, False, None,
+                                   Budget(seconds=0))
+        self.assertIsInstance(output, Undecided)
+        self.assertEqual(output.rows_done, 0)
+
+    def test_not_chosen_for_too_short_a_deadline(self):
+        engine = ENGINES[BITS]
+        self.assertIsNone(engine.cost(20, 100, VALIDITY, Budget(seconds=0)))
+        self.assertIsNotNone(engine.cost(20, 100, VALIDITY,
+                                         Budget(seconds=60)))
+        self.assertIsNotNone(engine.cost(20, 100, VALIDITY))
+
+
+class TestRowLimits(unittest.TestCase):
+
+    def test_row_limit(self):
+        # With a table, so rows alike by symmetry are each evaluated.
+        prop_arg = PropArg(list(PAIRS))
+        output = prop_arg.evaluate(budget=Budget(max_rows=100), table=True,
+                                   engine=ROWS)
+        self.assertIsInstance(output, Undecided)
+        self.assertEqual(output.rows_done, 100)
+        self.assertEqual(output.rows_total, 2 ** 8)
+        # Some, but not all, of the counter examples, and each a real one.
+        self.assertEqual(len(output.counter_examples), 4)
+        for vals in output.counter_examples:
+            self.assertTrue(counter_example(prop_arg, vals), vals)
+        self.assertFalse(output.valid)
+
+    def test_row_limit_with_symmetry(self):
+        # The limit is on rows evaluated. Each may stand for several alike
+        # by symmetry, which are all accounted for.
+        prop_arg = PropArg(list(PAIRS))
+        output = prop_arg.evaluate(budget=Budget(max_rows=50), engine=ROWS)
+        self.assertIsInstance(output, Undecided)
+        self.assertTrue(50 <= output.rows_done < output.rows_total)
+
+    def test_memory_limit(self):
+        prop_arg = PropArg(list(PAIRS))
+        output = prop_arg.evaluate(budget=Budget(max_bytes=1000),
+                                   table=True, engine=ROWS)
+        self.assertIsInstance(output, Undecided)
+        self.assertIn("memory", output.reason)
+        self.assertTrue(output.rows_done < output.rows_total)
+
+    def test_nothing_found_is_undecided(self):
+        # Row 1 makes a premise false, so no counter example is found in it.
+        prop_arg = PropArg(['A⇒B', 'B⇒C', 'A⇒C'])
+        output = prop_arg.evaluate(budget=Budget(max_rows=1), engine=ROWS)
+        self.assertIsInstance(output, Undecided)
+        self.assertIsNone(output.valid)
+        self.assertEqual(output.counter_examples, [])
+
+    def test_within_budget(self):
+        prop_arg = PropArg(list(PAIRS))
+        output = prop_arg.evaluate(budget=Budget(60, 2 ** 8, 10 ** 6),
+                                   table=True, engine=ROWS)
+        self.assertNotIsInstance(output, Undecided)
+        self.assertEqual(len(prop_arg.counter_examples), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
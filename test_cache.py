@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""
+test_cache.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from unittest import mock
+
+from cache import PersistentCache, pack_columns, unpack_columns
+from proparg import PropArg
+from server import worker_context
+
+ARG = ['A⇒B', 'B⇒C', 'C⇒A']
+# Entries written by each process in test_several_processes().
+PER_PROCESS = 50
+
+
+def fill(cache, start):
+    # Puts PER_PROCESS entries in cache, reading each back, and evaluates
+    # ARG through it. Returns the number read back as they were put. Runs in
+    # a worker process.
+    found = 0
+    for k in range(start, start + PER_PROCESS):
+        cache.put('key%d' % k, 1, ['A'], k % 2 == 0, [k])
+        entry = cache.get('key%d' % k, 1)
+        if entry is not None and entry.counter_rows == [k]:
+            found += 1
+    PropArg(list(ARG)).evaluate(cache=cache, table=True)
+    return found
+
+
+def restored():
+    # Patches PropArg.restore() to record being called, for telling a
+    # result read from the cache from one worked out.
+    return mock.patch.object(PropArg, 'restore', autospec=True,
+                             side_effect=PropArg.restore)
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pack_columns(self):
+        rows = [[1, 0, 1], [0, 0, 1], [1, 1, 0], [0, 1, 1], [1, 1, 1]]
+        self.assertEqual(unpack_columns(pack_columns(rows, 3), 5, 3), rows)
+
+    def test_round_trip(self):
+        cache = PersistentCache(self.path)
+        prop_arg = PropArg(list(ARG))
+        prop_arg.evaluate(cache=cache, table=True)
+        self.assertFalse(prop_arg.valid)
+        again = PropArg(list(ARG))
+        with restored() as restore:
+            again.evaluate(cache=cache, table=True)
+            restore.assert_called_once()
+        self.assertEqual(again.valid, prop_arg.valid)
+        self.assertEqual(again.counter_examples, prop_arg.counter_examples)
+        self.assertEqual(again.get_table_data(), prop_arg.get_table_data())
+        # Another engine version doesn't see it.
+        self.assertIsNone(cache.get(prop_arg.cache_key(True), -1))
+        cache.close()
+
+    def test_evicts_least_recently_used(self):
+        # Each entry takes 12 bytes: a four character key, '["A"]' and
+        # '[0]'. Room for three.
+        cache = PersistentCache(self.path, max_bytes=36)
+        clock = count()
+        with mock.patch('cache.time.time', lambda: next(clock)):
+            for k in range(3):
+                cache.put('key%d' % k, 1, ['A'], True, [0])
+            # key0 is used, so key1 is now the least recently used.
+            self.assertIsNotNone(cache.get('key0', 1))
+            cache.put('key3', 1, ['A'], True, [0])
+            self.assertIsNone(cache.get('key1', 1))
+            for k in (0, 2, 3):
+                self.assertIsNotNone(cache.get('key%d' % k, 1), k)
+            # One entry larger than the rest put together pushes them all
+            # out.
+            cache.put('key4', 1, ['A'], True, [0], b'\0' * 30)
+            for k in (0, 2, 3):
+                self.assertIsNone(cache.get('key%d' % k, 1), k)
+        cache.close()
+
+    def test_several_processes(self):
+        cache = PersistentCache(self.path)
+        with ProcessPoolExecutor(4, worker_context()) as pool:
+            results = list(pool.map(fill, [cache] * 4,
+                                    range(0, 4 * PER_PROCESS, PER_PROCESS)))
+        self.assertEqual(results, [PER_PROCESS] * 4)
+        # Every process's entries, and the argument's, are there for this
+        # one.
+        for k in range(4 * PER_PROCESS):
+            entry = cache.get('key%d' % k, 1)
+            self.assertEqual(entry.counter_rows, [k])
+            self.assertEqual(entry.valid, k % 2 == 0)
+        prop_arg = PropArg(list(ARG))
+        with restored() as restore:
+            prop_arg.evaluate(cache=cache, table=True)
+            restore.assert_called_once()
+        self.assertFalse(prop_arg.valid)
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
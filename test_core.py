@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""
+test_core.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+import fuzz
+from engines import ROWS
+from proparg import PropArg
+
+
+def consistent(premises, assumptions=None):
+    # Whether some row of the truth table makes every premise true, found
+    # by going through all of it.
+    prop_arg = PropArg(list(premises) + [premises[0]])
+    prop_arg.evaluate(test=False, table=False, engine=ROWS,
+                      assumptions=assumptions)
+    return prop_arg.models > 0
+
+
+def valid(premises, conclusion, assumptions=None):
+    # Whether conclusion follows from premises, going through the whole
+    # truth table. A conclusion with no premises must always be true.
+    if not premises:
+        if len(conclusion) > 1:
+            conclusion = '(%s)' % conclusion
+        return not consistent(['(¬%s)' % conclusion], assumptions)
+    prop_arg = PropArg(list(premises) + [conclusion])
+    prop_arg.evaluate(table=False, engine=ROWS, assumptions=assumptions)
+    return prop_arg.valid
+
+
+def arguments(seed, count):
+    # Generated arguments with at least two premises.
+    rng = random.Random(seed)
+    found = []
+    while len(found) < count:
+        arg = fuzz.generate_argument(rng)
+        if len(arg) > 2:
+            found.append(arg)
+    return found
+
+
+class TestCore(unittest.TestCase):
+
+    def test_unsatisfiable_core_is_minimal(self):
+        checked = 0
+        for arg in arguments(0, 300):
+            premises = arg[:-1]
+            core = PropArg(list(arg)).unsatisfiable_core()
+            if consistent(premises):
+                self.assertIsNone(core, arg)
+                continue
+            checked += 1
+            chosen = [premises[k] for k in core]
+            self.assertFalse(consistent(chosen), arg)
+            # Leaving out any one makes the rest consistent.
+            for k in range(len(chosen)):
+                rest = chosen[:k] + chosen[k + 1:]
+                self.assertTrue(not rest or consistent(rest), (arg, core))
+        # Enough of the arguments have inconsistent premises to tell.
+        self.assertGreater(checked, 10)
+
+    def test_relevant_premises_are_minimal(self):
+        checked = 0
+        for arg in arguments(1, 300):
+            premises, conclusion = arg[:-1], arg[-1]
+            relevant = PropArg(list(arg)).relevant_premises()
+            if not valid(premises, conclusion):
+                self.assertIsNone(relevant, arg)
+                continue
+            checked += 1
+            chosen = [premises[k] for k in relevant]
+            self.assertTrue(valid(chosen, conclusion), arg)
+            for k in range(len(chosen)):
+                rest = chosen[:k] + chosen[k + 1:]
+                self.assertFalse(valid(rest, conclusion), (arg, relevant))
+        self.assertGreater(checked, 10)
+
+    def test_with_assumptions(self):
+        # A is consistent alone, but not once A is assumed false.
+        arg = ['A', 'B⇒C', '(¬B)∨C', 'C']
+        prop_arg = PropArg(list(arg))
+        self.assertIsNone(prop_arg.unsatisfiable_core())
+        prop_arg.assume({'A': 0})
+        self.assertEqual(prop_arg.unsatisfiable_core(), [0])
+        # With B assumed true, B⇒C alone is enough for C.
+        prop_arg = PropArg(list(arg))
+        prop_arg.assume({'B': 1})
+        self.assertIn(prop_arg.relevant_premises(), ([1], [2]))
+
+    def test_message_names_core(self):
+        prop_arg = PropArg(['A', 'B⇒C', '(¬A)∧B', 'C'])
+        output = prop_arg.evaluate()
+        self.assertTrue(prop_arg.valid)
+        self.assertIn("Premises 1, 3 contradict each other.", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
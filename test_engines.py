@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""
+test_engines.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from unittest import mock
+
+import engines
+from engines import BITS, ROWS, SAT, TABLE, VALIDITY
+from proparg import PropArg
+
+SMALL = ['P⇒Q', 'Q⇒R', 'P⇒R']
+LARGE = ['(A∧B)⇒C', '(C∨D)⇒E', '(E⨁F)∨G', '(¬H)⇒(A∨G)', 'H⇒C']
+
+
+class TestChoice(unittest.TestCase):
+
+    def test_small(self):
+        self.assertTrue(engines.small(SMALL, 2 ** 3))
+        self.assertFalse(engines.small(LARGE, 2 ** 8))
+
+    def test_small_not_compiled(self):
+        # Nothing is chosen, simplified or compiled.
+        prop_arg = PropArg(list(SMALL))
+        with mock.patch.object(engines, 'choose') as choose:
+            prop_arg.evaluate()
+            choose.assert_not_called()
+        self.assertEqual(prop_arg._prepared, {})
+        self.assertTrue(prop_arg.valid)
+        self.assertEqual(prop_arg.models, 4)
+
+    def test_small_already_compiled(self):
+        # Compiled expressions are used once they have been made.
+        prop_arg = PropArg(list(SMALL))
+        compiled = prop_arg.compile(cuts=True)
+        with mock.patch.object(prop_arg, 'det') as det:
+            prop_arg.evaluate()
+            det.assert_not_called()
+        self.assertIs(prop_arg.compile(cuts=True), compiled)
+
+    def test_named_engine_used(self):
+        for name in (ROWS, BITS, SAT):
+            prop_arg = PropArg(list(SMALL))
+            with mock.patch.object(engines.ENGINES[name], 'run',
+                                   wraps=engines.ENGINES[name].run) as run:
+                prop_arg.evaluate(engine=name)
+                if name != ROWS:
+                    run.assert_called_once()
+            self.assertIn(('compile', name == ROWS), prop_arg._prepared)
+
+    def test_same_results(self):
+        # Whichever way it is evaluated.
+        for arg in (SMALL, LARGE, ['P∧(¬P)', 'Q']):
+            results = []
+            for name in (None, ROWS, BITS, SAT):
+                prop_arg = PropArg(list(arg))
+                prop_arg.evaluate(table=False, engine=name)
+                results.append((prop_arg.valid, prop_arg.counter_examples))
+            self.assertEqual(results, 4 * results[:1], arg)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            engines.choose(PropArg(list(SMALL)), VALIDITY, 'nonsense')
+        with self.assertRaises(ValueError):
+            engines.choose(PropArg(list(SMALL)), TABLE, BITS)
+        self.assertIsNone(engines.preferred(PropArg(list(SMALL)), TABLE,
+                                            BITS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""
+test_entail.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+import fuzz
+from engines import BITS
+from entail import BITSET_SYMBOLS, Entailment
+from proparg import PropArg
+
+PREMISES = ['P⇒Q', 'Q⇒R', 'P∨S']
+
+
+def size(solver):
+    # Everything a query could leave behind in the solver.
+    return (solver.variables, len(solver.clauses), len(solver.units),
+            sum(len(w) for w in solver.watches.values()),
+            len(solver.symbol_variables))
+
+
+class TestEntailment(unittest.TestCase):
+
+    def check(self, result, arg):
+        # The result agrees with evaluating the whole argument.
+        prop_arg = PropArg(list(arg))
+        prop_arg.evaluate(table=False, engine=BITS)
+        self.assertEqual(result.valid, prop_arg.valid, arg)
+        self.assertEqual(result.counter_examples, prop_arg.counter_examples,
+                         arg)
+
+    def test_query(self):
+        entailment = Entailment(PREMISES)
+        self.assertTrue(entailment.consistent())
+        for conclusion in ('P⇒R', 'R∨S', 'S', 'T∨R', 'Q∧(¬Q)'):
+            self.check(entailment.query(conclusion), PREMISES + [conclusion])
+
+    def test_query_all(self):
+        entailment = Entailment(PREMISES)
+        conclusions = ['P⇒R', 'T∨R', 'S', 'R∨S']
+        results = entailment.query_all(conclusions)
+        self.assertEqual([r.conclusion for r in results], conclusions)
+        for result in results:
+            self.check(result, PREMISES + [result.conclusion])
+
+    def test_limit(self):
+        result = Entailment(PREMISES).query('S', limit=1)
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.counter_examples), 1)
+
+    def test_solver_matches_bitset(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            arg = fuzz.generate_argument(rng)
+            if len(arg) < 2:
+                continue
+            entailment = Entailment(arg[:-1])
+            new = [c for c in PropArg(arg).symbols()
+                   if c not in entailment.symbols]
+            self.check(entailment.query_solver(arg[-1], new, None), arg)
+
+    def test_solver_does_not_grow(self):
+        # Many conclusions checked against premises held by the solver,
+        # each with symbols of its own and several counter examples, leave
+        # it as it was.
+        symbols = ['%c' % (0x3b1 + k) for k in range(BITSET_SYMBOLS + 2)]
+        premises = [a + '⇒' + b for a, b in zip(symbols, symbols[1:])]
+        entailment = Entailment(premises)
+        self.assertIsNone(entailment.models)
+        solver = entailment.solver()
+        before = size(solver)
+        for k in range(200):
+            conclusion = '%s∨%s' % (symbols[k % 8],
+                                    'ABCDEFGH'[k % 8])
+            result = entailment.query(conclusion, limit=3)
+            self.assertFalse(result.valid)
+            self.assertEqual(len(result.counter_examples), 3)
+            self.assertEqual(size(solver), before)
+        self.assertTrue(entailment.query(symbols[0] + '⇒' +
+                                         symbols[-1]).valid)
+        self.assertEqual(size(solver), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""
+test_fuzz.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+import fuzz
+from syntax import find_error
+
+# Arguments tried by the test, from a fixed seed, so a failure always comes
+# back with the same arguments.
+SEED = 0
+COUNT = 200
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestFuzz(unittest.TestCase):
+
+    def test_engines_agree(self):
+        failures, tried = fuzz.run(seed=SEED, count=COUNT)
+        self.assertEqual(tried, COUNT)
+        self.assertEqual(failures, [])
+
+    def test_same_seed_same_arguments(self):
+        # The arguments depend on the seed and nothing else.
+        first = [fuzz.generate_argument(random.Random(SEED))
+                 for _ in range(20)]
+        second = [fuzz.generate_argument(random.Random(SEED))
+                  for _ in range(20)]
+        self.assertEqual(first, second)
+
+    def test_generated_arguments_are_well_formed(self):
+        rng = random.Random(SEED)
+        for _ in range(100):
+            for p in fuzz.generate_argument(rng):
+                self.assertIsNone(find_error(p), p)
+
+    def test_mismatch_is_shrunk(self):
+        # An engine that is wrong whenever the argument has two or more
+        # expressions is shrunk to an argument of two symbols.
+        def wrong(arg):
+            outcome = fuzz.reference(arg)
+            if len(arg) > 1:
+                outcome.valid = not outcome.valid
+            return outcome
+        failures, _ = fuzz.run(seed=SEED, count=20,
+                               engines=[('wrong', wrong)])
+        self.assertEqual(len(failures), 1)
+        name, small, description = failures[0]
+        self.assertEqual(name, 'wrong')
+        self.assertEqual(len(small), 2)
+        self.assertTrue(all(len(p) == 1 for p in small), small)
+        self.assertEqual(description, "differs in valid")
+
+    def test_without_qt(self):
+        # In a fresh interpreter, since other tests may have imported Qt.
+        code = ("import sys, fuzz; fuzz.run(count=5); "
+                "print([m for m in sys.modules if m.startswith('PyQt5')])")
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=HERE, universal_newlines=True)
+        self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+"""
+test_sat.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+import fuzz
+from budget import Budget, Undecided
+from engines import BITS
+from proparg import PropArg
+from sat import all_solutions
+
+SYMBOLS = 'ABCDEFGHPQRSTUVW'
+# Sixteen symbols and 128 counter examples, one for each way of making the
+# premises true with A false.
+MANY = [a + '⨁' + b for a, b in zip(SYMBOLS[::2], SYMBOLS[1::2])] + ['A']
+
+
+def counter_example(prop_arg, vals):
+    # Whether vals makes every premise true and the conclusion false.
+    truth = [prop_arg.det(p) for p in prop_arg.convert(prop_arg.symbols(),
+                                                       vals)]
+    return truth[-1] == 0 and all(truth[:-1])
+
+
+class TestSolve(unittest.TestCase):
+
+    def test_counts_match_truth_table(self):
+        # Models and counter examples found one at a time by the solver, and
+        # counted over the whole truth table.
+        rng = random.Random(0)
+        for _ in range(100):
+            arg = fuzz.generate_argument(rng)
+            solved = PropArg(list(arg))
+            solved.solve()
+            full = PropArg(list(arg))
+            full.evaluate(table=False, engine=BITS)
+            self.assertEqual(solved.valid, full.valid, arg)
+            self.assertEqual(solved.counter_examples, full.counter_examples,
+                             arg)
+            solved.solve(test=False)
+            self.assertEqual(solved.models, full.models, arg)
+            self.assertEqual(len(solved.found_rows), full.models, arg)
+
+    def test_all_solutions(self):
+        rows = set(all_solutions(['P∨Q', '(¬P)∨R'], ['P', 'Q', 'R'], [1, 1]))
+        self.assertEqual(rows, {(0, 1, 0), (0, 1, 1), (1, 0, 1), (1, 1, 1)})
+        rows = list(all_solutions(['P∧Q'], ['P', 'Q'], [None]))
+        self.assertEqual(len(rows), 4)
+
+    def test_table_is_whole(self):
+        # The rows found are kept apart, and the truth table asked for
+        # afterwards has every row.
+        prop_arg = PropArg(['P∨Q', 'P'])
+        prop_arg.solve()
+        self.assertEqual(prop_arg.found_rows, [(0, 1)])
+        table = prop_arg.get_table_data()
+        self.assertEqual(len(table), 1 + 4)
+        self.assertEqual([row[:2] for row in table[1:]],
+                         [['0', '0'], ['0', '1'], ['1', '0'], ['1', '1']])
+
+    def test_limit(self):
+        prop_arg = PropArg(list(MANY))
+        prop_arg.solve(limit=3)
+        self.assertFalse(prop_arg.valid)
+        self.assertEqual(len(prop_arg.counter_examples), 3)
+        prop_arg.solve(test=False, limit=3)
+        # Not all the models were found, so they aren't counted.
+        self.assertIsNone(prop_arg.models)
+
+    def test_undecided(self):
+        # Out of time part way through: the counter examples found so far
+        # are real ones, and the argument is known to be invalid.
+        prop_arg = PropArg(list(MANY))
+        output = prop_arg.solve(budget=Budget(seconds=0.002))
+        self.assertIsInstance(output, Undecided)
+        self.assertIn('time limit', output.reason)
+        self.assertIsNone(output.rows_done)
+        self.assertLess(len(output.counter_examples), 128)
+        if output.counter_examples:
+            self.assertIs(output.valid, False)
+        else:
+            self.assertIsNone(output.valid)
+        for vals in output.counter_examples:
+            self.assertTrue(counter_example(prop_arg, vals), vals)
+
+    def test_undecided_valid(self):
+        # No counter example found before the time ran out says nothing.
+        prop_arg = PropArg(list(MANY[:-1]) + ['A∨(¬A)'])
+        output = prop_arg.solve(test=False, budget=Budget(seconds=0))
+        self.assertIsInstance(output, Undecided)
+        self.assertIsNone(output.valid)
+        self.assertIsNone(prop_arg.models)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""
+test_server.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import server
+from server import EvalServer
+
+SYMBOLS = 'ABCDEFGHPQ'
+# Ten symbols, with many models for the solver to find one at a time.
+SLOW = [a + '∨' + b for a, b in zip(SYMBOLS, SYMBOLS[1:])] + ['A']
+
+
+def ask(eval_server, **request):
+    # The response to one request.
+    line = json.dumps(request, ensure_ascii=False)
+    return json.loads(asyncio.run(eval_server.handle(line)))
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = EvalServer()
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_ops(self):
+        response = ask(self.server, id=7, argument=['P⇒Q', 'Q', 'P'])
+        self.assertEqual(response['id'], 7)
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['result'],
+                         {'valid': False, 'symbols': ['P', 'Q'],
+                          'counter_examples': [{'P': 0, 'Q': 1}]})
+        table = ask(self.server, op='table', argument=['P∧Q'])['result']
+        self.assertEqual(table['table'][1:],
+                         [['0', '0', '0'], ['0', '1', '0'], ['1', '0', '0'],
+                          ['1', '1', '1']])
+        count = ask(self.server, op='count', argument=['P∨Q', 'R'],
+                    assume={'R': 1})['result']
+        self.assertEqual(count, {'models': 3, 'rows': 4})
+
+    def test_errors(self):
+        for request in ({'argument': ['P⇒']},
+                        {'argument': ['P']},
+                        {'op': 'nonsense', 'argument': ['P', 'P']},
+                        {'argument': ['P', 'P'], 'engine': 'nonsense'},
+                        {'argument': ['P', 'P'], 'assume': {'P': 2}},
+                        {'op': 'table', 'argument': ['P'], 'engine': 'bits'}):
+            response = ask(self.server, **request)
+            self.assertFalse(response['ok'], request)
+            self.assertTrue(response['error'])
+        response = json.loads(asyncio.run(self.server.handle('[')))
+        self.assertEqual(response['error'], "Request is not valid JSON")
+
+    def test_default_engine_preferred(self):
+        # The server's engine is used where it can answer.
+        self.server.engine = 'bits'
+        response = ask(self.server, op='table', argument=['P∧Q'])
+        self.assertTrue(response['ok'])
+
+    def test_cached_by_engine_and_budget(self):
+        with mock.patch.object(server, 'run_request',
+                               wraps=server.run_request) as run:
+            for _ in range(2):
+                for engine in (None, 'rows', 'sat'):
+                    ask(self.server, argument=['P⇒Q', 'P', 'Q'],
+                        engine=engine)
+                ask(self.server, argument=['P⇒Q', 'P', 'Q'],
+                    budget={'max_rows': 100})
+            self.assertEqual(run.call_count, 4)
+            self.assertEqual([c[0][5] for c in run.call_args_list],
+                             [None, 'rows', 'sat', None])
+
+    def test_undecided_not_cached(self):
+        request = {'op': 'count', 'argument': SLOW, 'engine': 'rows',
+                   'budget': {'max_rows': 10}}
+        for _ in range(2):
+            result = ask(self.server, **request)['result']
+            self.assertTrue(result['undecided'])
+            self.assertLessEqual(result['rows_done'], 10)
+            self.assertEqual(result['rows_total'], 2 ** len(SYMBOLS))
+        self.assertEqual(self.server.cache.misses, 2)
+
+    def test_slow_request_does_not_block(self):
+        # A ten-symbol count runs off the event loop, so a small check sent
+        # after it is answered first.
+        finished = []
+
+        async def send(name, request):
+            await self.server.handle(json.dumps(request, ensure_ascii=False))
+            finished.append(name)
+
+        async def both():
+            await asyncio.gather(
+                send('slow', {'op': 'count', 'argument': SLOW,
+                              'engine': 'sat'}),
+                send('small', {'argument': ['P', 'P∨Q']}))
+
+        asyncio.run(both())
+        self.assertEqual(finished, ['small', 'slow'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+"""
+test_session.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import session
+from session import HEADER, MAGIC, VERSION, Session, open_session, \
+    save_session, table_columns
+
+PREMISES = ['A ⇒ B', 'B ⇒ C', 'A ⇒ C']
+SYMBOLS = ['A', 'B', 'C']
+
+
+def saved(assumptions=None):
+    # A session of PREMISES with its truth table.
+    s = Session(PREMISES, True, "The argument is valid.", True, [],
+                SYMBOLS, assumptions)
+    s.set_columns(*table_columns(SYMBOLS, s.expressions(), assumptions))
+    return s
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test' + session.EXTENSION)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_round_trip(self):
+        for assumptions in (None, {'B': 1}):
+            before = saved(assumptions)
+            save_session(self.path, before)
+            after = open_session(self.path)
+            self.assertEqual(after.description(), before.description())
+            for k in range(before.column_count):
+                self.assertEqual(after.column_bits(k), before.column_bits(k))
+                for row in range(before.rows):
+                    self.assertEqual(after.value(row, k),
+                                     before.value(row, k))
+            # Nothing is left behind under another name.
+            self.assertEqual(os.listdir(self.directory),
+                             [os.path.basename(self.path)])
+
+    def test_without_table(self):
+        before = Session(PREMISES[:2], False)
+        save_session(self.path, before)
+        after = open_session(self.path)
+        self.assertFalse(after.has_columns())
+        self.assertEqual(after.premises, PREMISES[:2])
+
+    def test_truncated(self):
+        save_session(self.path, saved())
+        data = self.read()
+        # Cut in the header, the description and the columns.
+        for length in (0, 3, HEADER.size - 1, HEADER.size + 10,
+                       len(data) - 1):
+            self.write(data[:length])
+            with self.assertRaises(ValueError, msg=length):
+                open_session(self.path)
+
+    def test_not_a_session(self):
+        self.write(b'PK\x03\x04' + b'\0' * 100)
+        with self.assertRaisesRegex(ValueError, "Not a Logicheck session"):
+            open_session(self.path)
+
+    def test_later_version(self):
+        save_session(self.path, saved())
+        data = self.read()
+        self.write(HEADER.pack(MAGIC, VERSION + 1, 0) + data[HEADER.size:])
+        with self.assertRaisesRegex(ValueError, "later version"):
+            open_session(self.path)
+
+    def corrupt(self, change):
+        # Saves a session whose description has been changed by change().
+        info = saved().description()
+        change(info)
+        description = json.dumps(info).encode('utf-8')
+        self.write(HEADER.pack(MAGIC, VERSION, len(description)) +
+                   description + b'\0' * 64)
+
+    def test_corrupt_description(self):
+        changes = [
+            lambda info: info.pop('premises'),
+            lambda info: info.update(conc='yes'),
+            lambda info: info.update(symbols=[1, 2, 3]),
+            lambda info: info.update(assumptions={'A': 2}),
+            # Columns that don't fit the expressions.
+            lambda info: info.update(rows=4),
+            lambda info: info.update(columns=2),
+        ]
+        for change in changes:
+            self.corrupt(change)
+            with self.assertRaises(ValueError):
+                open_session(self.path)
+        # Not JSON, and not UTF-8.
+        for description in (b'{"premises": [', b'\xff\xfe'):
+            self.write(HEADER.pack(MAGIC, VERSION, len(description)) +
+                       description)
+            with self.assertRaisesRegex(ValueError, "Not a Logicheck"):
+                open_session(self.path)
+
+    def test_failed_save_keeps_earlier_file(self):
+        save_session(self.path, saved())
+        data = self.read()
+        broken = saved()
+        # A column that can't be written.
+        broken._columns = None
+        with self.assertRaises(Exception):
+            save_session(self.path, broken)
+        self.assertEqual(self.read(), data)
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(self.path)])
+
+
+if __name__ == "__main__":
+    unittest.main()
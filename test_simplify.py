@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""
+test_simplify.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from unittest import mock
+
+import simplify
+from compiled import CompiledArgument
+from proparg import PropArg
+from simplify import simplify_argument
+
+
+class TestSimplify(unittest.TestCase):
+
+    def test_rules(self):
+        simplification = simplify_argument(['((¬(¬P))∧P)', '(Q∨(¬Q))',
+                                            '(R∧(¬R))', 'P⇒Q'])
+        self.assertEqual(simplification.expressions, ['P', 1, 0, 'P⇒Q'])
+        self.assertEqual(simplification.tautologies(), [1])
+        self.assertEqual(simplification.contradictions(), [2])
+        self.assertEqual(simplification.before, 8)
+        self.assertEqual(simplification.after, 1)
+
+    def test_assumptions(self):
+        simplification = simplify_argument(['P∧Q', 'P∨Q'], {'P': 1})
+        self.assertEqual(simplification.expressions, ['Q', 1])
+
+    def test_simplified_once(self):
+        # Compiling, solving, counting and choosing an engine all start from
+        # the same simplification, made once per set of assumptions and
+        # shared by every query of a compiled argument.
+        with mock.patch.object(simplify, 'simplify_argument',
+                               wraps=simplify_argument) as spy:
+            compiled = CompiledArgument(['P⇒Q', 'Q⇒R', 'P⇒R'])
+            for engine in (None, 'rows', 'bits', 'sat'):
+                compiled.query(engine=engine)
+                compiled.query(test=False, engine=engine)
+            self.assertEqual(spy.call_count, 1)
+            compiled.query(assumptions={'P': 1})
+            compiled.query(assumptions={'P': 1}, engine='sat')
+            self.assertEqual(spy.call_count, 2)
+
+    def test_simplify_kept(self):
+        prop_arg = PropArg(['P∧Q', 'P'])
+        self.assertIs(prop_arg.simplify(), prop_arg.simplify())
+        prop_arg.assume({'Q': 0})
+        self.assertEqual(prop_arg.simplify().expressions, [0, 'P'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+test_symmetry.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from math import comb
+from unittest import mock
+
+import engines
+import symmetry
+from engines import BITS, COUNT, ROWS, SAT, TABLE, VALIDITY
+from proparg import PropArg
+from symmetry import Symmetry, find_symmetry
+
+SYMBOLS = 'ABCDEFGH'
+
+
+# Invalid, and any two of SYMBOLS can be swapped in the premises.
+SYMMETRIC = [c + '⇒Z' for c in SYMBOLS] + ['A∧Z']
+
+
+class TestSymmetry(unittest.TestCase):
+
+    def test_orbits(self):
+        found = find_symmetry(SYMMETRIC[:-1], PropArg(SYMMETRIC).symbols(),
+                              test=False)
+        self.assertEqual(found.classes, [list(SYMBOLS)])
+        # One orbit per number of 1's among SYMBOLS, for each value of Z.
+        self.assertEqual(found.orbits(), (len(SYMBOLS) + 1) * 2)
+        representatives = list(found.representatives())
+        self.assertEqual(len(representatives), found.orbits())
+        self.assertEqual(sorted(size for _, size in representatives),
+                         sorted(2 * [comb(len(SYMBOLS), k)
+                                     for k in range(len(SYMBOLS) + 1)]))
+        self.assertEqual(sum(size for _, size in representatives),
+                         2 ** (len(SYMBOLS) + 1))
+
+    def test_conclusion_kept_apart(self):
+        # A can't be swapped with the others, as only it is in the
+        # conclusion.
+        found = find_symmetry(SYMMETRIC, PropArg(SYMMETRIC).symbols())
+        self.assertEqual(found.classes, [list(SYMBOLS[1:])])
+
+    def test_expand_covers_table(self):
+        # Two classes and a symbol on its own.
+        found = Symmetry(list('ABCDE'), [['A', 'B'], ['C', 'D']])
+        self.assertEqual(found.orbits(), 3 * 3 * 2)
+        rows = []
+        for row, size in found.representatives():
+            orbit = found.expand(row)
+            self.assertEqual(len(orbit), size)
+            self.assertEqual(orbit[0], row)
+            rows.extend(orbit)
+        self.assertEqual(sorted(rows), sorted(set(rows)))
+        self.assertEqual(len(rows), 2 ** 5)
+
+    def test_assumptions(self):
+        symbols = PropArg(SYMMETRIC).symbols()
+        found = find_symmetry(SYMMETRIC[:-1], symbols, {'Z': 1}, test=False)
+        self.assertEqual(found.classes, [list(SYMBOLS)])
+        self.assertEqual(found.orbits(), len(SYMBOLS) + 1)
+        z = symbols.index('Z')
+        self.assertTrue(all(row[z] == 1
+                            for row, _ in found.representatives()))
+
+    def test_no_symmetry(self):
+        self.assertIsNone(find_symmetry(['A⇒B', 'B'], ['A', 'B']))
+        symbols = list(SYMBOLS)
+        implications = [a + '⇒' + b for a, b in zip(symbols, symbols[1:])]
+        self.assertIsNone(find_symmetry(implications, symbols))
+
+    def test_same_counter_examples(self):
+        # Evaluated one row per orbit, or every row.
+        collapsed = PropArg(list(SYMMETRIC))
+        collapsed.evaluate(table=False, engine=ROWS)
+        self.assertIsNotNone(collapsed.symmetry())
+        full = PropArg(list(SYMMETRIC))
+        full.evaluate(engine=BITS)
+        self.assertEqual(collapsed.counter_examples, full.counter_examples)
+        self.assertEqual(len(full.counter_examples),
+                         2 ** (len(SYMBOLS) - 1) + 1)
+        self.assertEqual(collapsed.models, full.models)
+
+
+class TestEngineChoice(unittest.TestCase):
+
+    def search(self, prop_arg, query, name=None):
+        # Number of times the symmetry is looked for by engines.choose().
+        with mock.patch.object(symmetry, 'find_symmetry',
+                               wraps=find_symmetry) as spy:
+            engines.choose(prop_arg, query, name)
+            return spy.call_count
+
+    def test_searched_once(self):
+        prop_arg = PropArg(list(SYMMETRIC))
+        self.assertEqual(self.search(prop_arg, VALIDITY), 1)
+        self.assertEqual(self.search(prop_arg, VALIDITY), 0)
+        # Counting models has symmetry of its own.
+        self.assertEqual(self.search(prop_arg, COUNT), 1)
+
+    def test_not_searched_when_named(self):
+        prop_arg = PropArg(list(SYMMETRIC))
+        for name in (ROWS, BITS, SAT):
+            self.assertEqual(self.search(prop_arg, VALIDITY, name), 0)
+
+    def test_not_searched_for_table(self):
+        self.assertEqual(self.search(PropArg(list(SYMMETRIC)), TABLE), 0)
+
+    def test_symmetry_matters(self):
+        self.assertFalse(engines.symmetry_matters(8, 16, TABLE))
+        self.assertTrue(engines.symmetry_matters(16, 16, VALIDITY))
+
+
+if __name__ == "__main__":
+    unittest.main()
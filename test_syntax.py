@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+test_syntax.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+import fuzz
+from expression import operators
+from syntax import SyntaxChecker, find_error
+
+# Characters edits are made with: symbols, operators, brackets, spaces and
+# characters that are never allowed.
+CHARACTERS = 'ABPQ' + ''.join(operators) + '((()))  01<'
+
+
+def edit(rng, text):
+    # Inserts, deletes or replaces a few characters somewhere in text.
+    start = rng.randrange(len(text) + 1)
+    end = min(len(text), start + rng.randrange(4))
+    if rng.random() < 0.3:
+        # Deleted only.
+        return text[:start] + text[end:]
+    inserted = ''.join(rng.choice(CHARACTERS)
+                       for _ in range(rng.randrange(1, 4)))
+    return text[:start] + inserted + text[end:]
+
+
+class TestIncremental(unittest.TestCase):
+
+    def test_edits_match_from_scratch(self):
+        # Each expression is edited many times over by the same checker,
+        # which has to give what a new one would after every edit.
+        rng = random.Random(0)
+        for _ in range(100):
+            text = rng.choice(fuzz.generate_argument(rng))
+            checker = SyntaxChecker()
+            for _ in range(30):
+                text = edit(rng, text)
+                checker.update(text)
+                fresh = SyntaxChecker()
+                fresh.update(text)
+                self.assertEqual(checker.error(), find_error(text), text)
+                self.assertEqual(checker.symbols(), fresh.symbols(), text)
+
+    def test_typed_a_character_at_a_time(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            whole = rng.choice(fuzz.generate_argument(rng))
+            checker = SyntaxChecker()
+            for k in range(len(whole) + 1):
+                checker.update(whole[:k])
+                self.assertEqual(checker.error(), find_error(whole[:k]),
+                                 whole[:k])
+            self.assertIsNone(checker.error(), whole)
+
+    def test_spaces(self):
+        checker = SyntaxChecker()
+        checker.update('( A ∧ < B )')
+        message, position = checker.error()
+        self.assertEqual(position, 3)
+        self.assertEqual(checker.raw_position(position), 6)
+        self.assertEqual(checker.error(), find_error('(A∧<B)'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""
+test_truth_table.py
+
+Copyright 2016 Ben Cottier
+
+This file is part of Logicheck.
+
+Logicheck is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Logicheck is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from budget import Budget
+from proparg import PropArg
+from session import table_columns
+from truth_table import SHOW_ALL, SHOW_COUNTER, SHOW_MODELS, \
+    SHOW_PREMISES, TruthTableModel, TruthTableProxy
+
+ARG = ['A⇒B', 'B⇒C', 'C⨁D', 'A∨D']
+
+
+def table(arg, assumptions=None, budget=None):
+    # The table data of arg and its columns as integers.
+    prop_arg = PropArg(list(arg))
+    prop_arg.evaluate(table=True, assumptions=assumptions, budget=budget)
+    return (prop_arg.get_table_data(),
+            table_columns(prop_arg.symbols(), list(arg), assumptions)[0])
+
+
+class TestColumns(unittest.TestCase):
+
+    def test_read_from_rows(self):
+        for assumptions in ({}, {'B': 1}, {'A': 0, 'D': 1}):
+            data, columns = table(ARG, assumptions)
+            model = TruthTableModel(data, 4, True)
+            self.assertEqual([model.column_bits(c)
+                              for c in range(model.columnCount())], columns)
+
+    def test_given_columns_cut_to_rows(self):
+        # A table cut short by a budget only has its first rows.
+        data, columns = table(ARG, budget=Budget(max_rows=5))
+        self.assertEqual(len(data) - 1, 5)
+        given = TruthTableModel(data, 4, True, columns)
+        read = TruthTableModel(data, 4, True)
+        for c in range(read.columnCount()):
+            self.assertEqual(given.column_bits(c), read.column_bits(c))
+
+    def test_filters(self):
+        data, columns = table(ARG)
+        proxy = TruthTableProxy(TruthTableModel(data, 4, True, columns))
+        counts = {}
+        for shown in (SHOW_ALL, SHOW_MODELS, SHOW_PREMISES, SHOW_COUNTER):
+            proxy.set_shown(shown)
+            counts[shown] = proxy.rowCount()
+            rows = [[proxy.index(r, c).data() for c in range(8)]
+                    for r in range(proxy.rowCount())]
+            for row in rows:
+                if shown != SHOW_ALL:
+                    self.assertEqual(set(row[4:7]), {'1'})
+                if shown == SHOW_MODELS:
+                    self.assertEqual(row[7], '1')
+                if shown == SHOW_COUNTER:
+                    self.assertEqual(row[7], '0')
+        self.assertEqual(counts[SHOW_ALL], 16)
+        self.assertEqual(counts[SHOW_PREMISES],
+                         counts[SHOW_MODELS] + counts[SHOW_COUNTER])
+
+
+if __name__ == "__main__":
+    unittest.main()
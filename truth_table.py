@@ -21,142 +21,524 @@ You should have received a copy of the GNU General Public License
 along with Logicheck.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import QIcon
+from bisect import bisect_right
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QAbstractItemView, QComboBox, QGridLayout, \
+    QHBoxLayout, QHeaderView, QLabel, QLineEdit, QMainWindow, QTableView, \
+    QWidget
+from PyQt5.QtCore import Qt, QAbstractProxyModel, QAbstractTableModel, \
+    QModelIndex
+
+from expression import assumed_bits, compile_expressions
+# TruthTable and headings() live in proparg.py, with PropArg, so that they
+# can be used without Qt.
+from proparg import TruthTable, headings
+from resource_path import icon
+
+# Rows of a LazyTruthTableModel are calculated this many at a time, and this
+# many blocks of them are kept.
+BLOCK_ROWS = 1024
+BLOCKS_KEPT = 64
+# Rows of a RowSelection are counted in blocks of this many, so that finding
+# the n'th selected row only means looking through one block.
+SELECT_BLOCK = 4096
+
+# Number of rows measured when sizing the columns of a table.
+SIZE_ROWS = 16
+
+# Rows shown by a TruthTableProxy.
+SHOW_ALL = 'all'            # Every row.
+SHOW_MODELS = 'models'      # Rows where every expression is true.
+SHOW_PREMISES = 'premises'  # Rows where every premise of an argument is true.
+SHOW_COUNTER = 'counter'    # Counter examples to an argument.
+
+
+class TruthTableModel(QAbstractTableModel):
+    """Presents table data, as produced by TruthTable, to a table view.
+    The first symbol_count columns are symbols, and if conc == True, the
+    last column is the conclusion of an argument.
+    """
 
-from resource_path import resource_path
+    def __init__(self, table_data, symbol_count=0, conc=False, columns=None):
+        """
+        Constructor
 
+        columns may give the columns of the table as integers with a bit per
+        row, as from session.table_columns(), if they are already known.
+        Only the bits of the rows in table_data are used.
 
-class TruthTable(object):
-    """Handles the display of truth tables and the associated data.
+        __init__(list<list<str>>, int, bool, list<int>)
+        """
+        super().__init__()
+        self.table_data = table_data
+        self.symbol_count = symbol_count
+        self.conc = conc
+        # Every column as an integer, one bit per row, made in one pass over
+        # the rows when first asked for unless given, and kept for every
+        # later filter and sort.
+        self._columns = None
+        if columns is not None:
+            mask = (1 << (len(table_data) - 1)) - 1
+            self._columns = [column & mask for column in columns]
+
+    def column_bits(self, column):
+        """Returns a column of the table as an integer whose bit i is the
+        truth value in row i. The first call makes every column at once.
+
+        column_bits(int) -> int
+        """
+        if self._columns is None:
+            # Transpose the rows, last first, and read each column as a
+            # binary string, so that row i ends up as bit i of the integer.
+            rows = self.table_data[:0:-1]
+            if rows:
+                self._columns = [int(''.join(bits), 2)
+                                 for bits in zip(*rows)]
+            else:
+                self._columns = [0] * len(self.table_data[0])
+        return self._columns[column]
+
+    def rowCount(self, parent=None):
+        return len(self.table_data) - 1
+
+    def columnCount(self, parent=None):
+        return len(self.table_data[0])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return self.table_data[index.row() + 1][index.column()]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.table_data[0][section]
+        return super().headerData(section, orientation, role)
+
+
+class LazyTruthTableModel(QAbstractTableModel):
+    """Presents a truth table without calculating it up front. Rows are
+    calculated BLOCK_ROWS at a time when they are first looked at, with one
+    bit-parallel pass over each expression per block, and only the most
+    recently used blocks are kept.
+
+    If assumptions are given, as a dictionary of 0's and 1's by symbol, only
+    the rows where those symbols have those truth values are presented.
     """
 
-    def __init__(self, symbols, premises, symbol_truth, premise_truth,
-                 conc=True):
+    def __init__(self, symbols, premises, conc=True, assumptions=None):
         """
         Constructor
 
-        __init__(list<str>, list<str>, list<str>, list<list<int>>, bool)
-        """
+        Raises ValueError if an expression can't be parsed.
 
+        __init__(list<str>, list<str>, bool, dict)
+        """
+        super().__init__()
         self.symbols = symbols
+        self.symbol_count = len(symbols)
         self.premises = premises
-        self.symbol_truth = symbol_truth
-        self.premise_truth = premise_truth
         self.conc = conc
+        self.compiled = compile_expressions(premises, symbols)
+        self.header = symbols + headings(premises, conc)
+        self.assumptions = assumptions or {}
+        self.rows = 2 ** (len(symbols) - len(self.assumptions))
+        # Calculated blocks of rows, by block number. Each is a list of
+        # integers, one per column, holding a bit per row.
+        self._blocks = OrderedDict()
+        # Every column at once, as for block(), made when first asked for.
+        self._columns = None
+
+    def column_bits(self, column):
+        """Returns a column of the table as an integer whose bit i is the
+        truth value in row i. The first call calculates every column in one
+        bit-parallel pass over the whole table.
+
+        column_bits(int) -> int
+        """
+        if self._columns is None:
+            columns = assumed_bits(self.symbols, self.assumptions, 0,
+                                   self.rows)
+            columns.extend(self.compiled(columns, (1 << self.rows) - 1))
+            self._columns = columns
+        return self._columns[column]
+
+    def block(self, b):
+        """Returns the columns of block b, calculating them if necessary.
+
+        block(int) -> list<int>
+        """
+        if b in self._blocks:
+            self._blocks.move_to_end(b)
+            return self._blocks[b]
+        start = b * BLOCK_ROWS
+        width = min(BLOCK_ROWS, self.rows - start)
+        mask = (1 << width) - 1
+        columns = assumed_bits(self.symbols, self.assumptions, start, width)
+        columns.extend(self.compiled(columns, mask))
+        self._blocks[b] = columns
+        if len(self._blocks) > BLOCKS_KEPT:
+            self._blocks.popitem(last=False)
+        return columns
+
+    def rowCount(self, parent=None):
+        return self.rows
+
+    def columnCount(self, parent=None):
+        return len(self.header)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            b, k = divmod(index.row(), BLOCK_ROWS)
+            return str((self.block(b)[index.column()] >> k) & 1)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.header[section]
+        return super().headerData(section, orientation, role)
+
+
+class SessionTruthTableModel(QAbstractTableModel):
+    """Presents the truth table saved with a session (see session.Session)
+    straight from its columns, so nothing is calculated, and a table read
+    from a file is only read as far as it is looked at.
+    """
+
+    def __init__(self, session):
+        """
+        Constructor
+
+        __init__(Session)
+        """
+        super().__init__()
+        self.session = session
+        self.symbol_count = len(session.symbols)
+        self.conc = session.conc
+        self.header = session.symbols + headings(session.expressions(),
+                                                 session.conc)
 
-        self.generate_table_data()
+    def column_bits(self, column):
+        """Returns a column of the table as an integer whose bit i is the
+        truth value in row i.
 
-    def generate_table_data(self):
-        """Processes the data for the table and sorts it into a list mirroring
-        the table structure.
+        column_bits(int) -> int
         """
+        return self.session.column_bits(column)
 
-        # Convert elements of premise_truth from int to str in a new list.
-        self.conversion = []
-        for i in range(len(self.premise_truth)):
-            self.sub_list = []
-            for j in range(len(self.premise_truth[i])):
-                self.sub_list.append(str(self.premise_truth[i][j]))
-            self.conversion.append(self.sub_list)
+    def rowCount(self, parent=None):
+        return self.session.rows
 
-        l = len(self.premises)
-        premises2 = []
+    def columnCount(self, parent=None):
+        return len(self.header)
 
-        # Format logical expressions for column headings in a new list.
-        for i in range(l):
-            if i == l - 1 and self.conc:
-                # Prepend a "therefore" symbol to the conclusion.
-                premises2.append("".join([u'\u2234', "    ",
-                                          self.premises[-1]]))
-            else:
-                # Prepend a number to the expression.
-                premises2.append("".join([str(i+1), ".    ",
-                                          self.premises[i]]))
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            return str(self.session.value(index.row(), index.column()))
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
 
-        # First row of table data - symbols then premises as column headings.
-        self.table_data = [self.symbols]
-        self.table_data[0].extend(premises2)
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.header[section]
+        return super().headerData(section, orientation, role)
 
-        # Create the remaining rows of truth values, i.e. 1's and 0's.
-        for i in range(len(self.symbol_truth)):
-            self.table_row = []
-            for j in range(len(self.symbol_truth[i])):
-                self.table_row.append(self.symbol_truth[i][j])
-            self.table_row.extend(self.conversion[i])
-            self.table_data.append(self.table_row)
 
-        # E.g.
-        # symbol_truth = [('0', '0', '1'), ...]
-        # premise_truth = [[1, 0, 1], ...]
-        # table = [ ['A', 'B', 'C', 'A->B', 'C+A', 'B'],
-        # ['0', '0', '1', '1', '0', '1'], ...]
+class RowSelection(object):
+    """Rows of a table picked out by bitmasks over its rows, one after
+    another: first the rows set in the first mask, in order, then those set
+    in the second, and so on. Rows are counted SELECT_BLOCK at a time up
+    front, and only looked for in a block when one of them is asked for, so
+    nothing is done per row until it is shown.
+    """
 
-    def get_table_data(self):
-        """Returns the table data, as produced by generate_table_data().
+    def __init__(self, segments, rows):
         """
-        return self.table_data
+        Constructor
 
+        __init__(list<int>, int)
+        """
+        self.rows = rows
+        size = (rows + 7) // 8
+        step = SELECT_BLOCK // 8
+        # Each mask as bytes, with the number of rows selected before each
+        # of its blocks.
+        self.segments = []
+        # Position of the first row of each mask in the selection.
+        self.starts = []
+        self.count = 0
+        for mask in segments:
+            data = mask.to_bytes(size, 'little')
+            counts = [0]
+            for b in range(0, size, step):
+                block = int.from_bytes(data[b:b + step], 'little')
+                counts.append(counts[-1] + block.bit_count())
+            self.segments.append((data, counts))
+            self.starts.append(self.count)
+            self.count += counts[-1]
+        # Row numbers of the most recently used blocks.
+        self._positions = OrderedDict()
+
+    def block(self, s, b):
+        """Returns the integer for block b of mask s.
+
+        block(int, int) -> int
+        """
+        step = SELECT_BLOCK // 8
+        return int.from_bytes(self.segments[s][0][b * step:(b + 1) * step],
+                              'little')
+
+    def positions(self, s, b):
+        """Returns the row numbers selected by block b of mask s.
+
+        positions(int, int) -> list<int>
+        """
+        key = (s, b)
+        if key in self._positions:
+            self._positions.move_to_end(key)
+            return self._positions[key]
+        bits = self.block(s, b)
+        base = b * SELECT_BLOCK
+        rows = []
+        while bits:
+            # Take the lowest set bit.
+            low = bits & -bits
+            rows.append(base + low.bit_length() - 1)
+            bits ^= low
+        self._positions[key] = rows
+        if len(self._positions) > BLOCKS_KEPT:
+            self._positions.popitem(last=False)
+        return rows
+
+    def row(self, k):
+        """Returns the row number of the k'th row of the selection.
+
+        row(int) -> int
+        """
+        s = bisect_right(self.starts, k) - 1
+        k -= self.starts[s]
+        counts = self.segments[s][1]
+        b = bisect_right(counts, k) - 1
+        return self.positions(s, b)[k - counts[b]]
+
+    def index(self, row):
+        """Returns the position of a row number in the selection, or None if
+        it isn't selected.
+
+        index(int) -> int or NoneType
+        """
+        b, k = divmod(row, SELECT_BLOCK)
+        for s, (data, counts) in enumerate(self.segments):
+            bits = self.block(s, b)
+            if (bits >> k) & 1:
+                below = bits & ((1 << k) - 1)
+                return self.starts[s] + counts[b] + below.bit_count()
+        return None
+
+
+class TruthTableProxy(QAbstractProxyModel):
+    """Shows a filtered and sorted view of a truth table model, without
+    copying it. The model must provide column_bits(), symbol_count and
+    conc, as TruthTableModel, LazyTruthTableModel and
+    SessionTruthTableModel do. Filters and sorts are worked out with bitwise
+    operations on whole columns, so they take about the same time for any
+    number of rows.
+    """
+
+    def __init__(self, model):
+        """
+        Constructor
 
-class TruthTableGraphic(QTableWidget):
+        __init__(QAbstractTableModel)
+        """
+        super().__init__()
+        self.setSourceModel(model)
+        self.shown = SHOW_ALL
+        # Column sorted by, if any, and in which order.
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.update_selection()
+
+    def update_selection(self):
+        """Works out which rows are shown, and in what order.
+        """
+        model = self.sourceModel()
+        rows = model.rowCount()
+        mask = (1 << rows) - 1
+        if self.shown != SHOW_ALL:
+            columns = range(model.symbol_count, model.columnCount())
+            if self.shown == SHOW_PREMISES and model.conc:
+                # Whatever the conclusion is.
+                columns = columns[:-1]
+            for c in columns:
+                bits = model.column_bits(c)
+                if self.shown == SHOW_COUNTER and c == columns[-1]:
+                    # The conclusion is false in a counter example.
+                    bits = ~bits
+                mask &= bits
+        if self.sort_column < 0:
+            segments = [mask]
+        else:
+            # Every value is 0 or 1, so sorting by a column splits the rows
+            # in two, keeping their order within each part.
+            bits = model.column_bits(self.sort_column)
+            segments = [mask & ~bits, mask & bits]
+            if self.sort_order == Qt.DescendingOrder:
+                segments.reverse()
+        self.selection = RowSelection(segments, rows)
+
+    def set_shown(self, show):
+        """Changes which rows are shown: SHOW_ALL, SHOW_MODELS,
+        SHOW_PREMISES or SHOW_COUNTER.
+
+        set_shown(str) -> NoneType
+        """
+        self.beginResetModel()
+        self.shown = show
+        self.update_selection()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        self.update_selection()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return self.selection.count
+
+    def columnCount(self, parent=QModelIndex()):
+        if self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.selection.row(index.row()),
+                                        index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        row = self.selection.index(index.row())
+        if row is None:
+            return QModelIndex()
+        return self.createIndex(row, index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if self.sourceModel() is None:
+            # The source model is gone once the window is being torn down,
+            # though the view may still ask for its headings.
+            return None
+        if orientation == Qt.Vertical and role == Qt.DisplayRole:
+            # Number rows as in the full table.
+            return self.selection.row(section) + 1
+        return self.sourceModel().headerData(section, orientation, role)
+
+
+class TruthTableGraphic(QTableView):
     """The widget used as the table to be displayed.
     """
 
-    def __init__(self, table_data):
+    def __init__(self, model):
         """
         Constructor
 
-        __init__(list<list<str>>)
+        __init__(QAbstractTableModel)
         """
 
-        # Inherit from QTableWidget.
+        # Inherit from QTableView.
         super().__init__()
-        self.table_data = table_data
         # Make the table read-only.
         self.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        self.setRowCount(len(self.table_data)-1)
-        self.setColumnCount(len(self.table_data[0]))
-        self.setHorizontalHeaderLabels(self.table_data[0])
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Columns are sized to fit the first few rows; every cell is 0 or 1,
+        # so more wouldn't change anything.
+        self.horizontalHeader().setResizeContentsPrecision(SIZE_ROWS)
+        # Clicking a column heading sorts by that column.
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setSortingEnabled(True)
+        self.set_model(model)
         # Table styling - not yet working.
         # stylesheet = "QHeaderView::section{" \
         #              "background-color:Whitesmoke;" \
         #              "}"
         # self.setStyleSheet(stylesheet)
-
-        # Fill out the rest of the table with truth values.
-        for i in range(1, len(self.table_data)):
-            for j in range(len(self.table_data[i])):
-                item = QTableWidgetItem(self.table_data[i][j])
-                # Centre.
-                item.setTextAlignment(132)
-                # Add table item to table.
-                self.setItem(i-1, j, item)
-
-        self.resizeColumnsToContents()
-        self.resizeRowsToContents()
         # self.resize(self.sizeHint())
         # self.setFixedSize(self.horizontalHeader().length() + 40,
         #                   self.verticalHeader().length() + 50)
 
+    def set_model(self, model):
+        """Shows the table in model, replacing any table already shown.
+
+        set_model(QAbstractTableModel) -> NoneType
+        """
+        # Start the new table unsorted.
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        # The view doesn't delete the selection model of the old table.
+        old_selection = self.selectionModel()
+        self.setModel(model)
+        if old_selection is not None:
+            old_selection.deleteLater()
+        # Only the visible rows are measured, so this stays quick however
+        # many rows there are. All rows have the same height.
+        self.resizeColumnsToContents()
+        if model.rowCount():
+            self.verticalHeader().setDefaultSectionSize(
+                self.sizeHintForRow(0))
+
 
 class TruthTableWindow(QMainWindow):
     """The window that displays the truth table.
     """
 
-    def __init__(self, table_data):
+    def __init__(self, model):
         """
         Constructor
 
-        __init__(list<list<str>>)
+        __init__(QAbstractTableModel)
         """
 
         # Inherit from QMainWindow.
         super().__init__()
         main_layout = QGridLayout()
-        truth_table_graphic = TruthTableGraphic(table_data)
-        # window_width = truth_table_graphic.width()
-        # window_height = truth_table_graphic.height()
-        main_layout.addWidget(truth_table_graphic, 0, 0)
+        # Choice of which rows to show, and how many there are.
+        self.show_box = QComboBox()
+        self.count_label = QLabel()
+        show_layout = QHBoxLayout()
+        show_layout.addWidget(QLabel("Show:"))
+        show_layout.addWidget(self.show_box)
+        show_layout.addStretch(1)
+        show_layout.addWidget(self.count_label)
+        main_layout.addLayout(show_layout, 0, 0)
+        # Truth values to assume for some symbols, limiting the table to the
+        # rows where they hold. Read by the widget that makes the table.
+        self.assume_line = QLineEdit()
+        self.assume_line.setPlaceholderText("e.g. P = 1, R = 0")
+        self.assume_line.setToolTip("Show only the rows where these symbols "
+                                    "have these truth values")
+        assume_layout = QHBoxLayout()
+        assume_layout.addWidget(QLabel("Assume:"))
+        assume_layout.addWidget(self.assume_line)
+        main_layout.addLayout(assume_layout, 1, 0)
+        self.proxy = TruthTableProxy(model)
+        self.graphic = TruthTableGraphic(self.proxy)
+        # window_width = self.graphic.width()
+        # window_height = self.graphic.height()
+        main_layout.addWidget(self.graphic, 2, 0)
         main_widget = QWidget()
         main_widget.setLayout(main_layout)
 
@@ -165,4 +547,49 @@ class TruthTableWindow(QMainWindow):
         # main window.
         self.setGeometry(80, 110, 425, 540)
         self.setWindowTitle("Logicheck - Truth Table")
-        self.setWindowIcon(QIcon(resource_path("images/logicheck_icon_3.png")))
+        self.setWindowIcon(icon("images/logicheck_icon_3.png"))
+        self.update_show_box()
+        self.show_box.currentIndexChanged.connect(self.change_shown)
+
+    def set_model(self, model):
+        """Replaces the table shown in the window, which is kept open. The
+        same rows are shown as before, where possible.
+
+        set_model(QAbstractTableModel) -> NoneType
+        """
+        shown = self.proxy.shown
+        self.proxy = TruthTableProxy(model)
+        if shown not in (SHOW_PREMISES, SHOW_COUNTER) or model.conc:
+            self.proxy.set_shown(shown)
+        self.graphic.set_model(self.proxy)
+        self.show_box.blockSignals(True)
+        self.update_show_box()
+        self.show_box.blockSignals(False)
+
+    def update_show_box(self):
+        """Lists the choices of rows to show for the current table, and
+        shows how many rows there are.
+        """
+        self.show_box.clear()
+        self.show_box.addItem("All rows", SHOW_ALL)
+        self.show_box.addItem("Rows where every expression is true",
+                              SHOW_MODELS)
+        if self.proxy.sourceModel().conc:
+            self.show_box.addItem("Rows where every premise is true",
+                                  SHOW_PREMISES)
+            self.show_box.addItem("Counter examples", SHOW_COUNTER)
+        self.show_box.setCurrentIndex(self.show_box.findData(self.proxy.shown))
+        self.update_count()
+
+    def update_count(self):
+        """Shows how many rows are shown, out of how many.
+        """
+        self.count_label.setText("%d of %d rows" %
+                                 (self.proxy.rowCount(),
+                                  self.proxy.sourceModel().rowCount()))
+
+    def change_shown(self):
+        """Maps to the choice of rows to show.
+        """
+        self.proxy.set_shown(self.show_box.currentData())
+        self.update_count()